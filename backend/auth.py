@@ -1,20 +1,35 @@
 # backend/auth.py
+import os
+
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from database import AsyncSessionLocal, get_async_engine, get_db, get_async_db
+from models import Usuario, Proveedor
+from utils.cache import TTLCache, invalidate_on_commit
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="usuarios/login")
 SECRET_KEY = "tu_clave_secreta_aqui"
 ALGORITHM = "HS256"
 
+# Caché de identidades resueltas: correo (sub del token) -> (modelo, columnas del registro).
+# Evita consultar Usuario/Proveedor en cada request autenticado. Se invalida al hacer commit
+# de cualquier cambio sobre el registro (estado, rol, contraseña, correo...) y el TTL acota
+# la desactualización cuando el cambio ocurre en otro worker.
+_actor_cache = TTLCache(
+    maxsize=int(os.getenv("ACTOR_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("ACTOR_CACHE_TTL", "60")),
+)
+
+# Columna que actúa como `sub` del token para cada tipo de actor
+_SUBJECT_COLUMN = {Usuario: "correo_usuario", Proveedor: "correo_proveedor"}
 
-def get_current_actor(token: str = Depends(oauth2_scheme)):
-    """Decodifica el token y devuelve un Usuario o un Proveedor si existe.
-    Útil para endpoints que aceptan tanto usuarios (admins) como proveedores.
-    """
-    from models import Usuario, Proveedor
-    from database import SessionLocal
 
+def _decode_subject(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         correo = payload.get("sub")
@@ -22,40 +37,148 @@ def get_current_actor(token: str = Depends(oauth2_scheme)):
             raise HTTPException(status_code=401, detail="Token inválido")
     except JWTError:
         raise HTTPException(status_code=401, detail="Token inválido")
+    return correo
+
+
+def _snapshot(obj) -> dict:
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(type(obj)).column_attrs}
+
+
+def _cached_actor(correo: str):
+    """Reconstruye el actor cacheado como instancia detached (lista para `merge(load=False)`)."""
+    cached = _actor_cache.get(correo)
+    if cached is None:
+        return None
+    model, values = cached
+    obj = model(**values)
+    make_transient_to_detached(obj)
+    return obj
+
+
+def _remember(correo: str, obj):
+    _actor_cache.set(correo, (type(obj), _snapshot(obj)))
+
+
+def invalidate_actor(correo: str):
+    """Elimina un actor de la caché (p. ej. tras un UPDATE masivo que no pasa por el ORM)."""
+    _actor_cache.pop(correo)
+
+
+def clear_actor_cache():
+    _actor_cache.clear()
+
+
+def _resolve_actor(db: Session, correo: str, include_proveedor: bool):
+    cached = _cached_actor(correo)
+    if cached is not None:
+        if isinstance(cached, Proveedor) and not include_proveedor:
+            return None
+        # adjuntar a la sesión del request sin emitir SQL
+        return db.merge(cached, load=False)
 
-    db = SessionLocal()
     # buscar en usuarios primero
-    usuario = db.query(Usuario).filter(Usuario.correo_usuario == correo).first()
-    if usuario:
-        db.close()
-        return usuario
+    actor = db.query(Usuario).filter(Usuario.correo_usuario == correo).first()
+    if actor is None and include_proveedor:
+        actor = db.query(Proveedor).filter(Proveedor.correo_proveedor == correo).first()
+    if actor is not None:
+        _remember(correo, actor)
+    return actor
+
 
-    proveedor = db.query(Proveedor).filter(Proveedor.correo_proveedor == correo).first()
-    db.close()
-    if proveedor:
-        return proveedor
+async def _resolve_actor_async(db: AsyncSession, correo: str, include_proveedor: bool):
+    cached = _cached_actor(correo)
+    if cached is not None:
+        if isinstance(cached, Proveedor) and not include_proveedor:
+            return None
+        return await db.merge(cached, load=False)
 
-    raise HTTPException(status_code=404, detail="Actor no encontrado")
+    actor = (await db.execute(select(Usuario).where(Usuario.correo_usuario == correo))).scalars().first()
+    if actor is None and include_proveedor:
+        actor = (await db.execute(select(Proveedor).where(Proveedor.correo_proveedor == correo))).scalars().first()
+    if actor is not None:
+        _remember(correo, actor)
+    return actor
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+def get_current_actor(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """Decodifica el token y devuelve un Usuario o un Proveedor si existe.
+    Útil para endpoints que aceptan tanto usuarios (admins) como proveedores.
+    Usa la misma sesión DB del request.
+    """
+    correo = _decode_subject(token)
+    actor = _resolve_actor(db, correo, include_proveedor=True)
+    if actor is None:
+        raise HTTPException(status_code=404, detail="Actor no encontrado")
+    return actor
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """Compatibilidad hacia atrás: devuelve un Usuario si el token pertenece a un usuario.
     Muchos módulos importaban `get_current_user`; mantenemos esta API para evitar romperlos.
     """
-    from models import Usuario
-    from database import SessionLocal
+    correo = _decode_subject(token)
+    usuario = _resolve_actor(db, correo, include_proveedor=False)
+    if usuario is None:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return usuario
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        correo = payload.get("sub")
-        if correo is None:
-            raise HTTPException(status_code=401, detail="Token inválido")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Token inválido")
 
-    db = SessionLocal()
-    usuario = db.query(Usuario).filter(Usuario.correo_usuario == correo).first()
-    db.close()
-    if not usuario:
+# Variantes para routers `async def`: comparten la caché y usan la AsyncSession del request
+async def get_current_actor_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    correo = _decode_subject(token)
+    actor = await _resolve_actor_async(db, correo, include_proveedor=True)
+    if actor is None:
+        raise HTTPException(status_code=404, detail="Actor no encontrado")
+    return actor
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    correo = _decode_subject(token)
+    usuario = await _resolve_actor_async(db, correo, include_proveedor=False)
+    if usuario is None:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     return usuario
+
+
+def _solo_admin(usuario: Usuario) -> Usuario:
+    if usuario.id_rol != 1:
+        raise HTTPException(status_code=403, detail="Acceso denegado")
+    return usuario
+
+
+def require_admin(current_user: Usuario = Depends(get_current_user)):
+    """Solo administradores (rol 1)."""
+    return _solo_admin(current_user)
+
+
+async def require_admin_async(current_user: Usuario = Depends(get_current_user_async)):
+    """Como `require_admin`, para routers `async def`."""
+    return _solo_admin(current_user)
+
+
+async def get_actor_from_token_async(token: str):
+    """Resuelve el actor de un token con una sesión propia que se cierra enseguida.
+
+    Para conexiones largas (streams SSE) que no deben retener una conexión del pool.
+    """
+    correo = _decode_subject(token)
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        actor = await _resolve_actor_async(db, correo, include_proveedor=True)
+    if actor is None:
+        raise HTTPException(status_code=404, detail="Actor no encontrado")
+    return actor
+
+
+# -------------------- Invalidación de la caché --------------------
+def _correos(obj):
+    # incluye el correo anterior si fue cambiado
+    return [correo for correo in inspect(obj).attrs[_SUBJECT_COLUMN[type(obj)]].history.sum() if correo]
+
+
+def _invalidate_actors(correos):
+    for correo in correos:
+        _actor_cache.pop(correo)
+
+
+invalidate_on_commit(tuple(_SUBJECT_COLUMN), _invalidate_actors, collect=_correos)
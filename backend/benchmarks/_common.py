@@ -0,0 +1,136 @@
+"""Utilidades compartidas por los benchmarks del backend.
+
+Los benchmarks se ejecutan desde la carpeta `backend/` (p. ej. `python -m benchmarks.bench_citas_owner`)
+contra una base SQLite en memoria creada a partir de los modelos, de modo que no necesitan MySQL.
+"""
+import time
+from contextlib import contextmanager
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import RolUsuario, Region, Ciudad, Usuario, Mascota, Servicio, MetodoPago
+
+
+def make_session_factory():
+    """Crea un engine SQLite en memoria con todas las tablas y devuelve (engine, SessionLocal)."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+async def make_async_session_factory():
+    """Igual que `make_session_factory` para los routers async (aiosqlite). Devuelve (engine, AsyncSessionLocal).
+
+    Para sembrar datos con los helpers síncronos: `await db.run_sync(lambda s: seed_reference_data(s))`.
+    Para contar sentencias usar `count_statements(engine.sync_engine)`.
+    """
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+class StatementCounter:
+    """Cuenta las sentencias SQL enviadas al engine mientras está activo."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+@contextmanager
+def count_statements(engine):
+    counter = StatementCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+@contextmanager
+def timed():
+    result = {"elapsed": 0.0}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["elapsed"] = time.perf_counter() - start
+
+
+def seed_reference_data(db):
+    """Roles, una región y una ciudad (ids 1) como en `database.txt`."""
+    for id_rol, nombre in ((1, "Administrador"), (2, "Emprendedor"), (3, "Domiciliario"), (4, "Cliente")):
+        db.add(RolUsuario(id_rol=id_rol, nombre_rol=nombre))
+    db.add(Region(id_region=1, nombre_region="Antioquia"))
+    db.add(Ciudad(id_ciudad=1, nombre_ciudad="Medellín", id_region=1))
+    db.commit()
+
+
+def make_usuario(db, correo, id_rol=4, password="x"):
+    usuario = Usuario(
+        nombre_usuario="Bench",
+        apellido_usuario="User",
+        correo_usuario=correo,
+        telefono_usuario="3000000000",
+        password_usuario=password,
+        id_rol=id_rol,
+        id_region=1,
+        id_ciudad=1,
+        estado_usuario="activo",
+    )
+    db.add(usuario)
+    db.flush()
+    return usuario
+
+
+def seed_citas(db, owner, cliente, n_citas):
+    """Crea un servicio del `owner` y `n_citas` citas de `cliente`, cada una con su mascota."""
+    from models import Cita
+
+    servicio = Servicio(
+        tipo_servicio="Salud",
+        estado_servicio="activo",
+        descripcion_servicio="Consulta",
+        precio_servicio=Decimal("50.00"),
+        id_usuario=owner.id_usuario,
+    )
+    metodo = MetodoPago(tipo_metodo="Efectivo", id_usuario=cliente.id_usuario)
+    db.add_all([servicio, metodo])
+    db.flush()
+    start = date(2025, 1, 1)
+    for i in range(n_citas):
+        mascota = Mascota(
+            nombre_mascota=f"m{i}",
+            peso_mascota=10,
+            especie_mascota="Canino",
+            raza_mascota="criollo",
+            edad_mascota=3,
+            altura_mascota=40,
+            id_usuario=cliente.id_usuario,
+        )
+        db.add(mascota)
+        db.flush()
+        db.add(Cita(
+            fecha_cita=start + timedelta(days=i // 8),
+            hora_cita=dtime(8 + i % 8, 0),
+            metodo_pago="Efectivo",
+            estado_cita="pendiente",
+            id_usuario=cliente.id_usuario,
+            id_mascota=mascota.id_mascota,
+            id_servicio=servicio.id_servicio,
+        ))
+    db.commit()
+    return servicio, metodo
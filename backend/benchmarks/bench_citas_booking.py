@@ -0,0 +1,99 @@
+"""Benchmark de POST /citas: reservas por segundo con varias reservas concurrentes.
+
+Uso (desde backend/):  python -m benchmarks.bench_citas_booking
+
+Compara el flujo anterior (3 SELECT de validación, 4 commits con refresh) con `create_cita`
+(una consulta de validación, un flush y un commit que también guarda la notificación como trabajo
+en segundo plano).
+Usa un archivo SQLite temporal para que cada sesión tenga su propia conexión; con MySQL la
+diferencia es mayor porque cada viaje de ida y vuelta a la base cuesta más.
+"""
+import asyncio
+import functools
+import os
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from benchmarks._common import count_statements, make_usuario, seed_citas, seed_reference_data, timed
+from database import Base
+from models import Cita, Mascota, MetodoPago, Notificacion, Pedido, Recibo, Servicio
+from routes.citas import create_cita
+from schemas import CitaCreate
+
+N_RESERVAS = 400
+
+
+async def _create_cita_anterior(cita: CitaCreate, db, current_user):
+    """Flujo anterior de POST /citas (validaciones y commits por separado), como referencia."""
+    mascota = await db.get(Mascota, cita.id_mascota)
+    servicio = await db.get(Servicio, cita.id_servicio)
+    metodo = await db.get(MetodoPago, cita.id_metodo_pago)
+    assert mascota and servicio and metodo
+    fecha_obj = datetime.strptime(cita.fecha_cita, "%Y-%m-%d").date()
+    hora_obj = datetime.strptime(cita.hora_cita, "%H:%M").time()
+    nueva_cita = Cita(
+        fecha_cita=fecha_obj, hora_cita=hora_obj, metodo_pago=metodo.tipo_metodo, estado_cita="pendiente",
+        id_usuario=current_user.id_usuario, id_mascota=cita.id_mascota, id_servicio=cita.id_servicio,
+    )
+    db.add(nueva_cita)
+    await db.commit()
+    await db.refresh(nueva_cita)
+    pedido = Pedido(total=Decimal(0), id_metodo_pago=cita.id_metodo_pago, estado_pedido="pendiente", id_usuario=current_user.id_usuario)
+    db.add(pedido)
+    await db.commit()
+    await db.refresh(pedido)
+    db.add(Recibo(monto_pagado=Decimal(0), estado_recibo="emitido", id_pedido=pedido.id_pedido))
+    await db.commit()
+    db.add(Notificacion(
+        id_usuario_destino=servicio.id_usuario, titulo="Nueva cita pendiente", mensaje="...",
+        url=f"/citas/{nueva_cita.id_cita}", leida=False, fecha_creacion=datetime.utcnow(), id_cita=nueva_cita.id_cita,
+    ))
+    await db.commit()
+    return nueva_cita
+
+
+def _seed(db):
+    seed_reference_data(db)
+    owner = make_usuario(db, "owner@bench.com", id_rol=2)
+    cliente = make_usuario(db, "cliente@bench.com")
+    servicio, metodo = seed_citas(db, owner, cliente, 1)
+    mascota_id = db.query(Mascota.id_mascota).scalar()
+    return cliente.id_usuario, CitaCreate(
+        fecha_cita="2025-06-01", hora_cita="10:00",
+        id_metodo_pago=metodo.id_metodo_pago, id_mascota=mascota_id, id_servicio=servicio.id_servicio,
+    )
+
+
+async def run(nombre, reservar, concurrencia):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 30})
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    async with SessionLocal() as db:
+        id_cliente, payload = await db.run_sync(_seed)
+    actor = SimpleNamespace(id_usuario=id_cliente)
+    limite = asyncio.Semaphore(concurrencia)
+
+    async def una():
+        async with limite:
+            async with SessionLocal() as db:
+                await reservar(payload, db=db, current_user=actor)
+
+    with count_statements(engine.sync_engine) as counter, timed() as t:
+        await asyncio.gather(*(una() for _ in range(N_RESERVAS)))
+    await engine.dispose()
+    print(f"{nombre:<9} concurrencia={concurrencia:>3}  reservas/s={N_RESERVAS / t['elapsed']:>7.0f}  "
+          f"sentencias/reserva={counter.count / N_RESERVAS:.1f}")
+
+
+if __name__ == "__main__":
+    for concurrencia in (1, 16, 64):
+        asyncio.run(run("anterior", _create_cita_anterior, concurrencia))
+        # llamada directa: el valor por defecto de idempotency_key es el Header() de FastAPI
+        asyncio.run(run("actual", functools.partial(create_cita, idempotency_key=None), concurrencia))
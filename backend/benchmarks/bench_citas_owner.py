@@ -0,0 +1,54 @@
+"""Benchmark de GET /citas/owner: sentencias SQL emitidas por página.
+
+Uso (desde backend/):  python -m benchmarks.bench_citas_owner
+
+La consulta debe mantenerse en O(1) sentencias por página sin importar cuántas citas
+tenga el emprendedor (antes era 1 + 2 por cita).
+"""
+import asyncio
+from types import SimpleNamespace
+
+from fastapi import Response
+
+from benchmarks._common import make_async_session_factory, count_statements, timed, seed_reference_data, make_usuario, seed_citas
+from routes.citas import get_citas_owner
+from utils.pagination import NEXT_CURSOR_HEADER
+
+PAGE_SIZE = 100
+
+
+def _seed(db, n_citas):
+    seed_reference_data(db)
+    owner = make_usuario(db, "owner@bench.com", id_rol=2)
+    cliente = make_usuario(db, "cliente@bench.com")
+    seed_citas(db, owner, cliente, n_citas)
+    return owner.id_usuario
+
+
+async def run(n_citas):
+    engine, AsyncSessionLocal = await make_async_session_factory()
+    async with AsyncSessionLocal() as db:
+        owner_id = await db.run_sync(_seed, n_citas)
+        actor = SimpleNamespace(id_usuario=owner_id)
+
+        pages = 0
+        rows = 0
+        cursor = None
+        with count_statements(engine.sync_engine) as counter, timed() as t:
+            while True:
+                response = Response()
+                page = await get_citas_owner(response, cursor=cursor, limit=PAGE_SIZE, db=db, current_user=actor)
+                pages += 1
+                rows += len(page)
+                cursor = response.headers.get(NEXT_CURSOR_HEADER)
+                if not cursor:
+                    break
+    await engine.dispose()
+    assert rows == n_citas, (rows, n_citas)
+    print(f"citas={n_citas:>6}  páginas={pages:>4}  sentencias={counter.count:>5}  "
+          f"sentencias/página={counter.count / pages:.1f}  tiempo={t['elapsed'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    for n in (10, 100, 1000, 5000):
+        asyncio.run(run(n))
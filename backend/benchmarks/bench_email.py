@@ -0,0 +1,79 @@
+"""Benchmark del envío de códigos por correo contra un SMTP local con handshake lento.
+
+Uso (desde backend/):  python -m benchmarks.bench_email
+
+- "en línea": como antes, el request abre una conexión, hace el handshake y envía (lo que hacía
+  `fastmail.send_message`); el request dura lo que tarda el relay.
+- "en cola": el request solo encola (`services/email_queue.py`); los workers reutilizan sus
+  conexiones y envían por lotes.
+
+Se mide la duración media del request y el tiempo hasta entregar todos los correos.
+"""
+import asyncio
+import time
+from email.message import EmailMessage
+
+import aiosmtplib
+
+from benchmarks.smtp_local import LocalSMTPServer
+from services.email_queue import EmailQueue, SmtpSettings
+
+N_CORREOS = 200
+CONCURRENCIA = 20
+HANDSHAKE = 0.3  # TCP + STARTTLS + login contra un relay remoto
+LATENCIA = 0.005
+
+
+def _mensaje(i: int) -> EmailMessage:
+    m = EmailMessage()
+    m["From"], m["To"], m["Subject"] = "bench@local", f"u{i}@local", "Código"
+    m.set_content("<p>123456</p>", subtype="html")
+    return m
+
+
+async def run(nombre, enviar_request, servidor: LocalSMTPServer, esperar_entrega=None):
+    limite = asyncio.Semaphore(CONCURRENCIA)
+    duraciones = []
+
+    async def request(i):
+        async with limite:
+            t0 = time.perf_counter()
+            await enviar_request(i)
+            duraciones.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(N_CORREOS)))
+    if esperar_entrega is not None:
+        await esperar_entrega()
+    total = time.perf_counter() - t0
+    print(f"{nombre:<9} request medio={1000 * sum(duraciones) / len(duraciones):>8.2f} ms  "
+          f"entregados={len(servidor.mensajes):>4} en {total:>5.2f}s  conexiones={servidor.conexiones}")
+
+
+async def main():
+    servidor = LocalSMTPServer(handshake=HANDSHAKE, latencia=LATENCIA)
+    port = await servidor.start()
+    settings = SmtpSettings("127.0.0.1", port, "bench@local", start_tls=False)
+
+    async def en_linea(i):
+        await aiosmtplib.send(_mensaje(i), hostname="127.0.0.1", port=port, start_tls=False)
+
+    await run("en línea", en_linea, servidor)
+
+    servidor.mensajes.clear()
+    servidor.conexiones = 0
+    cola = EmailQueue(settings, pool_size=4)
+
+    async def encolado(i):
+        cola.enviar(f"u{i}@local", "Código", "<p>123456</p>")
+
+    async def entrega():
+        await cola._queue.join()
+
+    await run("en cola", encolado, servidor, entrega)
+    await cola.stop()
+    await servidor.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
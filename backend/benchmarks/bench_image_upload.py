@@ -0,0 +1,110 @@
+"""Benchmark de PATCH /usuarios/{id}/imagen: tiempo que el event loop queda bloqueado con subidas concurrentes.
+
+Uso (desde backend/):  python -m benchmarks.bench_image_upload [--uploads 16] [--size 3000x2000]
+
+Compara el procesamiento anterior (decodificar + LANCZOS + JPEG dentro del handler) con el pipeline
+actual (original a disco + variantes en el pool de procesos). Un monitor duerme 5 ms en bucle y mide
+cuánto se retrasa cada despertar: ese retraso es tiempo en que ningún otro request pudo avanzar.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+from fastapi import UploadFile
+from PIL import Image
+
+import database
+from benchmarks._common import make_async_session_factory, seed_reference_data, make_usuario
+from routes.usuarios import update_profile_picture
+from services import image_pipeline
+
+TICK = 0.005
+
+
+async def monitor(stats, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lag = time.perf_counter() - start - TICK
+        stats["max"] = max(stats["max"], lag)
+        stats["total"] += max(lag, 0.0)
+
+
+def make_image(width, height) -> bytes:
+    buffer = BytesIO()
+    Image.effect_noise((width, height), 64).convert("RGB").save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def legacy_upload(data: bytes, out_dir: Path, n: int):
+    # procesamiento como estaba antes en el handler (todo en el event loop)
+    img = Image.open(BytesIO(data))
+    img.thumbnail((800, 800), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    img.convert("RGB").save(buffer, format="JPEG", quality=85)
+    with open(out_dir / f"legacy_{n}.jpg", "wb") as f:
+        f.write(buffer.getvalue())
+
+
+async def pipeline_upload(data: bytes, usuario_id: int, n: int):
+    async with database.AsyncSessionLocal() as db:
+        await update_profile_picture(usuario_id, file=UploadFile(BytesIO(data), filename=f"{n}.jpg"), db=db)
+
+
+def _seed(db):
+    seed_reference_data(db)
+    usuario = make_usuario(db, "img@bench.com")
+    db.commit()
+    return usuario.id_usuario
+
+
+async def measure(label, make_calls):
+    stats = {"max": 0.0, "total": 0.0}
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(monitor(stats, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*make_calls())
+    responded = time.perf_counter() - start
+    # esperar también a que terminen las variantes en segundo plano
+    while image_pipeline._pending_tasks:
+        await asyncio.gather(*list(image_pipeline._pending_tasks))
+    finished = time.perf_counter() - start
+    stop.set()
+    await watcher
+    print(f"{label:<9} respuesta={responded * 1000:>8.1f} ms  fin={finished * 1000:>8.1f} ms  "
+          f"bloqueo total={stats['total'] * 1000:>8.1f} ms  bloqueo máx={stats['max'] * 1000:>7.1f} ms")
+
+
+async def main(args):
+    width, height = (int(v) for v in args.size.split("x"))
+    data = make_image(width, height)
+
+    engine, factory = await make_async_session_factory()
+    # el handler usa database.AsyncSessionLocal para actualizar la URL al terminar
+    database.async_engine = engine
+    database.AsyncSessionLocal.configure(bind=engine)
+    async with factory() as db:
+        usuario_id = await db.run_sync(_seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_pipeline.STATIC_DIR = Path(tmp)
+        image_pipeline.PROFILE_DIR = Path(tmp) / "uploads" / "perfiles"
+        # calentar el pool de procesos para no medir el arranque de los workers
+        await pipeline_upload(data, usuario_id, -1)
+        await asyncio.gather(*list(image_pipeline._pending_tasks))
+
+        print(f"{args.uploads} subidas concurrentes de {len(data) / 1024:.0f} KiB ({args.size})")
+        await measure("inline", lambda: [legacy_upload(data, Path(tmp), n) for n in range(args.uploads)])
+        await measure("pipeline", lambda: [pipeline_upload(data, usuario_id, n) for n in range(args.uploads)])
+    image_pipeline.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=16)
+    parser.add_argument("--size", default="3000x2000")
+    asyncio.run(main(parser.parse_args()))
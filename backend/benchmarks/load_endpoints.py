@@ -0,0 +1,72 @@
+"""Benchmark de carga: req/s y latencias (p50/p95/p99) contra un servidor en ejecución.
+
+Uso (desde backend/, con el servidor levantado con `uvicorn main:app`):
+
+    python -m benchmarks.load_endpoints --token $TOKEN --concurrency 64 --requests 4000 \\
+        /citas/owner /pedidos/ /notificaciones/ /productos/
+
+Para comparar antes/después de migrar los routers a async, ejecútalo con la misma base de datos
+y los mismos parámetros sobre cada versión del backend (p. ej. `git checkout <commit>`).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_path(client, path, total, concurrency, headers):
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f"{path:<28} req/s={len(latencies) / elapsed:>8.1f}  "
+        f"p50={percentile(latencies, 50) * 1000:>7.1f} ms  "
+        f"p95={percentile(latencies, 95) * 1000:>7.1f} ms  "
+        f"p99={percentile(latencies, 99) * 1000:>7.1f} ms  "
+        f"media={statistics.fmean(latencies) * 1000:>7.1f} ms  errores={errors}"
+    )
+
+
+async def main(args):
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        for path in args.paths:
+            await run_path(client, path, args.requests, args.concurrency, headers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", default=None, help="JWT Bearer para endpoints protegidos")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000, help="peticiones por endpoint")
+    asyncio.run(main(parser.parse_args()))
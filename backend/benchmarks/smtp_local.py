@@ -0,0 +1,97 @@
+"""Servidor SMTP mínimo en 127.0.0.1 para benchmarks y pruebas del envío de correo.
+
+Acepta cualquier remitente/destinatario y guarda los mensajes en memoria (`mensajes`). Puede
+simular un relay real: `handshake` segundos al abrir cada conexión (TCP + STARTTLS + login) y
+`latencia` segundos por comando. `fallar` hace que los primeros N envíos respondan 451 (error
+temporal) para probar los reintentos.
+
+    server = LocalSMTPServer(handshake=0.3)
+    port = await server.start()
+    ...
+    await server.stop()
+
+También se puede dejar corriendo:  python -m benchmarks.smtp_local 2525
+"""
+import asyncio
+import sys
+
+
+class LocalSMTPServer:
+    def __init__(self, handshake: float = 0.0, latencia: float = 0.0, fallar: int = 0):
+        self.handshake = handshake
+        self.latencia = latencia
+        self.fallar = fallar
+        self.mensajes = []
+        self.conexiones = 0
+        self._server = None
+
+    async def start(self, port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._atender, "127.0.0.1", port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.conexiones += 1
+
+        async def responder(linea: str):
+            if self.latencia:
+                await asyncio.sleep(self.latencia)
+            writer.write(linea.encode() + b"\r\n")
+            await writer.drain()
+
+        try:
+            if self.handshake:
+                await asyncio.sleep(self.handshake)
+            await responder("220 localhost ESMTP local")
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                comando = linea.decode(errors="replace").strip().upper()
+                if comando.startswith(("EHLO", "HELO")):
+                    await responder("250 localhost")
+                elif comando.startswith(("MAIL FROM", "RCPT TO", "RSET", "NOOP")):
+                    await responder("250 OK")
+                elif comando == "DATA":
+                    await responder("354 End data with <CR><LF>.<CR><LF>")
+                    datos = []
+                    while True:
+                        linea = await reader.readline()
+                        if not linea or linea in (b".\r\n", b".\n"):
+                            break
+                        datos.append(linea)
+                    if self.fallar > 0:
+                        self.fallar -= 1
+                        await responder("451 Temporary failure")
+                    else:
+                        self.mensajes.append(b"".join(datos))
+                        await responder("250 OK queued")
+                elif comando == "QUIT":
+                    await responder("221 Bye")
+                    break
+                else:
+                    await responder("502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _main(port: int):
+    server = LocalSMTPServer()
+    print(f"SMTP local en 127.0.0.1:{await server.start(port)}")
+    try:
+        while True:
+            await asyncio.sleep(5)
+            print(f"mensajes recibidos: {len(server.mensajes)}")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(int(sys.argv[1]) if len(sys.argv) > 1 else 2525))
@@ -0,0 +1,44 @@
+import os
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Conexión principal (MySQL). Los valores por defecto corresponden al entorno local de desarrollo.
+DB_USER = os.getenv("DB_USER", "root")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "")
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = os.getenv("DB_PORT", "3306")
+DB_NAME = os.getenv("DB_NAME", "phs_db")
+
+# Driver de SQLAlchemy para MySQL: "mysqlconnector" (por defecto), "mysqldb" (mysqlclient, en C)
+# o "pymysql". Cambiarlo no requiere tocar los routers.
+DB_DRIVER = os.getenv("DB_DRIVER", "mysqlconnector")
+
+# Driver asíncrono para los routers async (AsyncSession): "aiomysql" (por defecto) o "asyncmy"
+DB_ASYNC_DRIVER = os.getenv("DB_ASYNC_DRIVER", "aiomysql")
+
+# URL completa opcional; si se define tiene prioridad sobre los campos anteriores
+DATABASE_URL = os.getenv("DATABASE_URL")
+# Igual para el engine asíncrono (p. ej. mysql+asyncmy://... o sqlite+aiosqlite://...)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Réplica de solo lectura opcional (URL completa). Si no se define, las lecturas usan la principal.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+# Pool de conexiones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Reciclar conexiones antes del wait_timeout de MySQL (8h por defecto) para evitar conexiones muertas
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+
+# Tiempo máximo de ejecución por SELECT en milisegundos (max_execution_time de MySQL). 0 = sin límite.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+DB_ECHO = _env_bool("DB_ECHO", False)
@@ -0,0 +1,23 @@
+import os
+
+# Despacho de pedidos a domiciliarios (services/despacho.py)
+
+# Segundos que un pedido reclamado queda reservado al domiciliario; si no lo recoge antes,
+# vuelve a estar disponible para los demás
+DISPATCH_LEASE_SECONDS = float(os.getenv("DISPATCH_LEASE_SECONDS", "900"))
+
+# Máximo de pedidos por reclamo (y de reservas sin recoger por domiciliario)
+DISPATCH_MAX_CLAIM = int(os.getenv("DISPATCH_MAX_CLAIM", "10"))
+
+# Segundos entre barridos de reservas vencidas (por worker)
+DISPATCH_SWEEP_INTERVAL = float(os.getenv("DISPATCH_SWEEP_INTERVAL", "30"))
+
+# Rutas de entrega (services/rutas.py): domicilios con pedidos disponibles agrupados por ciudad
+# y por los primeros DISPATCH_POSTAL_PREFIX caracteres del código postal, con como mucho
+# DISPATCH_RUN_MAX_STOPS paradas por ruta
+DISPATCH_RUN_MAX_STOPS = int(os.getenv("DISPATCH_RUN_MAX_STOPS", "8"))
+DISPATCH_POSTAL_PREFIX = int(os.getenv("DISPATCH_POSTAL_PREFIX", "3"))
+
+# Segundos entre reconstrucciones completas del índice de rutas (entre medias se actualiza
+# de forma incremental con la tabla `eventos`)
+DISPATCH_RUNS_REBUILD_SECONDS = float(os.getenv("DISPATCH_RUNS_REBUILD_SECONDS", "300"))
@@ -14,4 +14,16 @@ email_conf = ConnectionConfig(
 )
 
 fastmail = FastMail(email_conf)
- 
\ No newline at end of file
+ 
+# Envío en segundo plano (services/email_queue.py): los endpoints encolan y vuelven enseguida;
+# EMAIL_POOL_SIZE workers por proceso, cada uno con su conexión SMTP persistente.
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", "2"))
+# Correos pendientes como máximo; con la cola llena el endpoint responde 503
+EMAIL_QUEUE_SIZE = int(os.getenv("EMAIL_QUEUE_SIZE", "1000"))
+# Correos que un worker envía seguidos por la misma conexión antes de volver a la cola
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+# Reintentos ante errores temporales, con espera EMAIL_RETRY_BACKOFF * 2^intento segundos
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "5"))
+EMAIL_RETRY_BACKOFF = float(os.getenv("EMAIL_RETRY_BACKOFF", "1"))
+# Segundos sin enviar tras los que se cierra la conexión SMTP (se reabre con el siguiente correo)
+EMAIL_IDLE_TIMEOUT = float(os.getenv("EMAIL_IDLE_TIMEOUT", "60"))
@@ -0,0 +1,23 @@
+import os
+
+# Cada cuántos segundos un worker busca eventos nuevos en la tabla `eventos` (solo mientras tenga
+# conexiones SSE abiertas). Es una consulta por worker, no por pestaña abierta.
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "1"))
+
+# Eventos pendientes por conexión. Si un cliente no los consume, se cierra su stream y al
+# reconectar se pone al día desde la tabla con Last-Event-ID.
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+
+# Máximo de eventos que se reenvían al reanudar; si hay más, se envía `reset` para recargar.
+EVENTS_CATCHUP_LIMIT = int(os.getenv("EVENTS_CATCHUP_LIMIT", "500"))
+
+# Comentario de keepalive para que proxies y navegadores no cierren la conexión inactiva
+EVENTS_KEEPALIVE = float(os.getenv("EVENTS_KEEPALIVE", "15"))
+
+# Horas que se conservan los eventos (para reanudar) antes de purgarlos
+EVENTS_RETENTION_HOURS = float(os.getenv("EVENTS_RETENTION_HOURS", "24"))
+
+# Segundos que se sigue esperando un id de evento saltado (commit tardío de otra transacción)
+# antes de darlo por descartado (rollback). Una transacción que tarde más en hacer commit
+# después de insertar su evento lo pierde para los streams ya abiertos.
+EVENTS_GAP_TIMEOUT = float(os.getenv("EVENTS_GAP_TIMEOUT", "30"))
@@ -0,0 +1,12 @@
+import os
+
+# Segundos que se conserva la respuesta de un POST con Idempotency-Key: un reintento con la misma
+# clave dentro de este plazo recibe la respuesta guardada sin volver a ejecutar la operación.
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+
+# Segundos que una clave queda reservada mientras su request está en curso. Si el worker muere a
+# mitad, pasado este plazo otro reintento puede volver a ejecutarla.
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+
+# Respuestas recientes que cada worker guarda en memoria para no consultar la tabla al repetirse
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1000"))
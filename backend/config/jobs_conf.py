@@ -0,0 +1,22 @@
+import os
+
+# Trabajos en segundo plano (tabla `trabajos`, ver services/trabajos.py)
+
+# Segundos entre consultas cuando no hay trabajos pendientes
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "1"))
+
+# Trabajos que un consumidor reclama de una vez
+JOBS_BATCH_SIZE = int(os.getenv("JOBS_BATCH_SIZE", "20"))
+
+# Intentos por trabajo; entre uno y otro se espera JOBS_RETRY_BACKOFF * 2^(intento - 1) segundos
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "5"))
+JOBS_RETRY_BACKOFF = float(os.getenv("JOBS_RETRY_BACKOFF", "5"))
+
+# Segundos que un trabajo reclamado queda reservado; si el consumidor muere, otro lo retoma después
+JOBS_LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS", "300"))
+
+# Horas que se conservan los trabajos completados (para las métricas) antes de purgarlos
+JOBS_RETENTION_HOURS = float(os.getenv("JOBS_RETENTION_HOURS", "24"))
+
+# "1": cada worker de uvicorn también consume trabajos. "0": solo el proceso `python worker.py`.
+JOBS_IN_PROCESS = os.getenv("JOBS_IN_PROCESS", "1") == "1"
@@ -0,0 +1,19 @@
+import os
+
+# Procesos dedicados a decodificar/redimensionar imágenes subidas (fuera del event loop y del GIL)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# Tamaño máximo del archivo subido y de la imagen decodificada (ancho x alto). Se comprueban
+# leyendo solo la cabecera, antes de decodificar los píxeles (evita "bombas" de descompresión).
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(40_000_000)))
+
+# Variantes generadas para la foto de perfil: nombre -> lado máximo en píxeles
+PROFILE_IMAGE_SIZES = {"avatar": 128, "card": 400, "full": 800}
+
+# Variantes generadas para las imágenes de servicios (almacén por contenido, ver services/upload_store.py)
+SERVICIO_IMAGE_SIZES = {"thumb": 320, "card": 640}
+
+# Qué hacer con imágenes embebidas como data URL (base64) en campos JSON como `imagen_usuario`:
+# "offload" las guarda en el almacén y persiste la ruta corta; "reject" responde 400.
+IMAGE_DATA_URL_POLICY = os.getenv("IMAGE_DATA_URL_POLICY", "offload").strip().lower()
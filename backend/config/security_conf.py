@@ -0,0 +1,29 @@
+import os
+
+# Parámetros de argon2id. Los valores por defecto son los de passlib (t=3, m=64 MiB, p=4), así
+# los hashes existentes no cambian. Al modificarlos, cada hash antiguo se regenera de forma
+# transparente en el siguiente login correcto del usuario/proveedor.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+# Hilos dedicados a hashear/verificar contraseñas (argon2 libera el GIL). Limita la CPU y la
+# memoria (m x workers) que puede consumir una ráfaga de logins.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+# Máximo de operaciones pendientes (en ejecución + en cola). Si se supera, la petición espera
+# hasta HASH_QUEUE_TIMEOUT segundos y luego responde 503 en lugar de acumular trabajo.
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", "64"))
+HASH_QUEUE_TIMEOUT = float(os.getenv("HASH_QUEUE_TIMEOUT", "5"))
+
+# Códigos de un solo uso (verificación de correo y recuperación de contraseña), ver
+# services/code_store.py. "memory": en el proceso, solo sirve con un worker de uvicorn.
+# "db": tabla `codigos_verificacion` (migrations/add_codigos_verificacion.sql), compartida entre workers.
+CODE_STORE = os.getenv("CODE_STORE", "memory")
+CODE_TTL_MINUTES = float(os.getenv("CODE_TTL_MINUTES", "15"))
+# Intentos fallidos permitidos por código; al agotarlos hay que pedir uno nuevo
+CODE_MAX_ATTEMPTS = int(os.getenv("CODE_MAX_ATTEMPTS", "5"))
+# Máximo de códigos pendientes en memoria (se descartan los más antiguos) y cada cuántos segundos
+# se eliminan los vencidos
+CODE_STORE_MAX_SIZE = int(os.getenv("CODE_STORE_MAX_SIZE", "10000"))
+CODE_SWEEP_INTERVAL = float(os.getenv("CODE_SWEEP_INTERVAL", "60"))
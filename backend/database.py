@@ -1,43 +1,199 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-USER = "root"
-PASSWORD = ""
-HOST = "localhost"
-PORT = "3306"
-DB_NAME = "phs_db"
+from config import db_conf
 
-DATABASE_URL = f"mysql+mysqlconnector://{USER}:{PASSWORD}@{HOST}:{PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL)
+def build_database_url(driver: str = db_conf.DB_DRIVER, url: str | None = db_conf.DATABASE_URL) -> str:
+    if url:
+        return url
+    return (
+        f"mysql+{driver}://{db_conf.DB_USER}:{db_conf.DB_PASSWORD}"
+        f"@{db_conf.DB_HOST}:{db_conf.DB_PORT}/{db_conf.DB_NAME}"
+    )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+DATABASE_URL = build_database_url()
+ASYNC_DATABASE_URL = build_database_url(db_conf.DB_ASYNC_DRIVER, db_conf.ASYNC_DATABASE_URL)
+
 
+class PoolMetrics:
+    """Estadísticas acumuladas de un pool: esperas al pedir conexión y timeouts."""
 
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
 
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
 
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
 
 
+# métricas por nombre de pool ("primary", "replica")
+pool_metrics = {}
 
 
+class _TimedCheckoutMixin:
+    """Mide cuánto espera cada request para obtener una conexión del pool."""
 
+    def _do_get(self):
+        metrics = pool_metrics.setdefault(self._orig_logging_name or "primary", PoolMetrics())
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        metrics.record(time.perf_counter() - start)
+        return conn
 
 
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
 
 
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
 
 
+def _set_statement_timeout(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"SET SESSION max_execution_time = {int(db_conf.DB_STATEMENT_TIMEOUT_MS)}")
+    finally:
+        cursor.close()
 
 
+def _engine_kwargs(url: str, name: str, poolclass) -> dict:
+    kwargs = {"echo": db_conf.DB_ECHO}
+    if make_url(url).get_backend_name() != "sqlite":
+        kwargs.update(
+            poolclass=poolclass,
+            pool_logging_name=name,
+            pool_size=db_conf.DB_POOL_SIZE,
+            max_overflow=db_conf.DB_MAX_OVERFLOW,
+            pool_timeout=db_conf.DB_POOL_TIMEOUT,
+            pool_recycle=db_conf.DB_POOL_RECYCLE,
+            pool_pre_ping=db_conf.DB_POOL_PRE_PING,
+        )
+    return kwargs
 
 
+def _configure_engine(sync_engine, name: str):
+    pool_metrics.setdefault(name, PoolMetrics())
+    if db_conf.DB_STATEMENT_TIMEOUT_MS and sync_engine.dialect.name == "mysql":
+        event.listen(sync_engine, "connect", _set_statement_timeout)
 
 
+def create_db_engine(url: str, name: str = "primary"):
+    """Crea un engine con el pool configurado desde `config/db_conf.py` (variables de entorno)."""
+    new_engine = create_engine(url, **_engine_kwargs(url, name, TimedQueuePool))
+    _configure_engine(new_engine, name)
+    return new_engine
 
 
+def create_async_db_engine(url: str, name: str = "async"):
+    """Igual que `create_db_engine` pero para un driver asíncrono (aiomysql, asyncmy, aiosqlite)."""
+    new_engine = create_async_engine(url, **_engine_kwargs(url, name, TimedAsyncQueuePool))
+    _configure_engine(new_engine.sync_engine, name)
+    return new_engine
+
+
+engine = create_db_engine(DATABASE_URL)
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Réplica de lectura opcional: si no está configurada, apunta al mismo engine principal
+read_engine = create_db_engine(db_conf.DATABASE_READ_URL, name="replica") if db_conf.DATABASE_READ_URL else engine
 
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Engine asíncrono: se crea la primera vez que se usa, para que el driver async solo sea
+# necesario cuando algún router async lo requiere.
+async_engine = None
+
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def get_async_engine():
+    global async_engine
+    if async_engine is None:
+        async_engine = create_async_db_engine(ASYNC_DATABASE_URL)
+        AsyncSessionLocal.configure(bind=async_engine)
+    return async_engine
+
+
+Base = declarative_base()
 
 
+def pool_status() -> dict:
+    """Estado en vivo de los pools (conexiones en uso, overflow, esperas)."""
+    engines = {"primary": engine}
+    if read_engine is not engine:
+        engines["replica"] = read_engine
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+    status = {}
+    for name, eng in engines.items():
+        pool = eng.pool
+        info = {"driver": eng.dialect.driver, "status": pool.status()}
+        if isinstance(pool, QueuePool):
+            info.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+            )
+        info.update(pool_metrics.get(name, PoolMetrics()).as_dict())
+        status[name] = info
+    return status
+
+
+# Dependencia para la sesión DB. Todos los routers (y auth.get_current_user) usan esta misma
+# función, así FastAPI reutiliza una única sesión por request entre dependencias.
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Sesión contra la réplica de lectura (o la principal si no hay réplica) para endpoints de solo lectura
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Sesión asíncrona para los routers `async def` (no bloquea el event loop mientras espera a MySQL)
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,8 +1,14 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 import os
-from routes import usuarios, mascotas, domicilios, servicios, citas, resultados, tratamientos, proveedores, productos, metodo_pago, pedidos, detalle_pedido, recibos, checkout, ubicaciones, notifications, denuncias
+from routes import usuarios, mascotas, domicilios, servicios, citas, resultados, tratamientos, proveedores, productos, metodo_pago, pedidos, detalle_pedido, recibos, checkout, ubicaciones, notifications, denuncias, internal, cuenta, reportes, eventos, despacho
 from fastapi.middleware.cors import CORSMiddleware
+import logging
+from fastapi.concurrency import run_in_threadpool
+from config import jobs_conf
+from services import image_pipeline, referencias, trabajos
+from services.email_queue import mailer
+from services.event_hub import hub as event_hub
 
 app = FastAPI()
 
@@ -13,6 +19,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # permitir todos los métodos (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # permitir todos los headers
+    # exponer el cursor de paginación (y el total opcional) para que el frontend pueda pedir la siguiente página
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 @app.get("/")
@@ -20,6 +28,38 @@ def root():
     return {"message": "olo wol"}
 
 
+@app.on_event("startup")
+async def start_event_hub():
+    # reparto de eventos a los streams SSE de este worker
+    event_hub.start()
+    # workers de envío de correo (conexiones SMTP persistentes)
+    mailer.start()
+    # consumidor de la cola de trabajos (si no se ejecuta aparte con `python worker.py`)
+    if jobs_conf.JOBS_IN_PROCESS:
+        trabajos.consumidor.start()
+
+
+@app.on_event("startup")
+async def load_referencias():
+    # regiones, ciudades y roles en memoria antes del primer request; si la base no responde
+    # se cargan con el primer uso
+    try:
+        await run_in_threadpool(referencias.get)
+    except Exception:
+        logging.exception("No se pudieron precargar los datos de referencia")
+
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    await event_hub.stop()
+    # entregar los correos aún en cola antes de salir
+    await mailer.stop()
+    # terminar el trabajo en curso; los pendientes siguen en la tabla
+    await trabajos.consumidor.stop()
+    # cerrar el pool de procesos de imágenes
+    image_pipeline.shutdown()
+
+
 # Servir archivos estáticos (imágenes subidas)
 static_dir = os.path.join(os.path.dirname(__file__), "static")
 os.makedirs(os.path.join(static_dir, "uploads"), exist_ok=True)
@@ -42,9 +82,14 @@ app.include_router(proveedores.router)
 app.include_router(productos.router)
 app.include_router(metodo_pago.router)
 app.include_router(pedidos.router)
+app.include_router(despacho.router)
 app.include_router(detalle_pedido.router)
 app.include_router(recibos.router)
 app.include_router(checkout.router)
 app.include_router(ubicaciones.router)
 app.include_router(notifications.router)
 app.include_router(denuncias.router)
+app.include_router(internal.router)
+app.include_router(cuenta.router)
+app.include_router(reportes.router)
+app.include_router(eventos.router)
@@ -0,0 +1,15 @@
+-- Migration: códigos de un solo uso compartidos entre workers (CODE_STORE=db).
+-- Verificación de correo y recuperación de contraseña; se guarda el hash del código, no el código.
+-- Backup your DB before running.
+
+CREATE TABLE IF NOT EXISTS codigos_verificacion (
+  proposito VARCHAR(20) NOT NULL,
+  correo VARCHAR(100) NOT NULL,
+  codigo_hash CHAR(64) NOT NULL,
+  intentos INT NOT NULL DEFAULT 0,
+  fecha_expiracion DATETIME NOT NULL,
+  PRIMARY KEY (proposito, correo)
+) ENGINE=InnoDB;
+
+-- barrido de códigos vencidos
+CREATE INDEX idx_codigos_expiracion ON codigos_verificacion(fecha_expiracion);
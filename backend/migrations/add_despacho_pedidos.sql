@@ -0,0 +1,23 @@
+-- Migration: despacho de pedidos a domiciliarios (POST /despacho/reclamar).
+-- Cada pedido con domicilio tiene un estado de despacho y, una vez reclamado, el domiciliario
+-- asignado y el vencimiento de la reserva. Se reclama con SELECT ... FOR UPDATE SKIP LOCKED (MySQL 8+).
+-- Backup your DB before running.
+
+ALTER TABLE pedidos
+  ADD COLUMN estado_despacho ENUM('disponible', 'reclamado', 'en-ruta', 'entregado') NULL AFTER id_domicilio,
+  ADD COLUMN id_domiciliario INT NULL AFTER estado_despacho,
+  ADD COLUMN reservado_hasta DATETIME NULL AFTER id_domiciliario;
+
+ALTER TABLE pedidos
+  ADD CONSTRAINT fk_pedidos_id_domiciliario FOREIGN KEY (id_domiciliario) REFERENCES usuarios(id_usuario);
+
+-- siguientes disponibles y reservas vencidas
+CREATE INDEX idx_pedidos_despacho ON pedidos(estado_despacho, reservado_hasta);
+-- entregas de cada domiciliario
+CREATE INDEX idx_pedidos_domiciliario ON pedidos(id_domiciliario, estado_despacho);
+
+-- pedidos con domicilio aún sin entregar: disponibles para reclamar
+UPDATE pedidos p
+  JOIN domicilios d ON d.id_domicilio = p.id_domicilio
+SET p.estado_despacho = 'disponible'
+WHERE p.estado_pedido <> 'cancelado' AND d.estado_domicilio = 'Pendiente';
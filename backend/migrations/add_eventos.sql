@@ -0,0 +1,16 @@
+-- Migration: tabla de eventos para los streams en tiempo real (GET /eventos/stream).
+-- Cada worker de uvicorn lee las filas nuevas y las reparte a sus conexiones SSE.
+-- Backup your DB before running.
+
+CREATE TABLE IF NOT EXISTS eventos (
+  id_evento INT AUTO_INCREMENT PRIMARY KEY,
+  canal VARCHAR(50) NOT NULL,
+  tipo VARCHAR(50) NOT NULL,
+  datos TEXT NOT NULL,
+  fecha_creacion DATETIME NOT NULL
+) ENGINE=InnoDB;
+
+-- reanudar un stream por canal desde Last-Event-ID
+CREATE INDEX idx_eventos_canal ON eventos(canal, id_evento);
+-- purga de eventos antiguos
+CREATE INDEX idx_eventos_fecha ON eventos(fecha_creacion);
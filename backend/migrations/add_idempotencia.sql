@@ -0,0 +1,20 @@
+-- Migration: respuestas guardadas por Idempotency-Key (POST /checkout y POST /citas).
+-- Un reintento con la misma clave recibe la respuesta guardada sin crear otro pedido o cita.
+-- Backup your DB before running.
+
+CREATE TABLE IF NOT EXISTS idempotencia (
+  id_idempotencia INT AUTO_INCREMENT PRIMARY KEY,
+  ruta VARCHAR(50) NOT NULL,
+  actor VARCHAR(50) NOT NULL,
+  clave VARCHAR(255) NOT NULL,
+  huella VARCHAR(64) NOT NULL,
+  estado ENUM('en-proceso', 'completado') NOT NULL DEFAULT 'en-proceso',
+  status_code INT NULL,
+  respuesta TEXT NULL,
+  fecha_expiracion DATETIME NOT NULL,
+  -- la reserva de la clave entre workers se apoya en esta restricción
+  CONSTRAINT uq_idempotencia_clave UNIQUE (ruta, actor, clave)
+) ENGINE=InnoDB;
+
+-- purga de claves vencidas
+CREATE INDEX idx_idempotencia_expiracion ON idempotencia(fecha_expiracion);
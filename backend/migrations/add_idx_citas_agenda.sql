@@ -0,0 +1,9 @@
+-- Migration: índice compuesto para la agenda del emprendedor (GET /citas/owner)
+-- Permite recorrer las citas de cada servicio en orden (fecha_cita, hora_cita, id_cita)
+-- y paginar por cursor sin ordenar en memoria.
+-- Backup your DB before running.
+
+CREATE INDEX idx_citas_servicio_agenda ON citas(id_servicio, fecha_cita, hora_cita, id_cita);
+
+-- Índice para filtrar servicios por dueño en el JOIN
+CREATE INDEX idx_servicios_usuario ON servicios(id_usuario);
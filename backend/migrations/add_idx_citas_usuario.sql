@@ -0,0 +1,5 @@
+-- Migration: índice para las citas del cliente (GET /cuenta/)
+-- Recorre las citas de un usuario en orden (fecha_cita, hora_cita, id_cita) para paginar por cursor.
+-- Backup your DB before running.
+
+CREATE INDEX idx_citas_usuario_agenda ON citas(id_usuario, fecha_cita, hora_cita, id_cita);
@@ -0,0 +1,4 @@
+-- Migration: índice para filtrar domicilios por estado/ciudad (GET /domicilios?estado_domicilio=...&id_ciudad=...)
+-- y paginar por id_domicilio. Backup your DB before running.
+
+CREATE INDEX idx_domicilios_estado_ciudad ON domicilios(estado_domicilio, id_ciudad, id_domicilio);
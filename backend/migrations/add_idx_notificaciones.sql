@@ -0,0 +1,6 @@
+-- Migration: índices de la bandeja de notificaciones.
+-- GET /notificaciones/no-leidas cuenta sobre (id_usuario_destino, leida, fecha_creacion) y
+-- GET /notificaciones/ pagina por (id_usuario_destino, id_notificacion). Backup your DB before running.
+
+CREATE INDEX idx_notificaciones_no_leidas ON notificaciones(id_usuario_destino, leida, fecha_creacion);
+CREATE INDEX idx_notificaciones_bandeja ON notificaciones(id_usuario_destino, id_notificacion);
@@ -0,0 +1,23 @@
+-- Migration: cola de trabajos en segundo plano (notificaciones tras un cambio, etc.).
+-- Las filas se insertan en la misma transacción que el cambio y las consume `python worker.py`
+-- (o cada worker de uvicorn con JOBS_IN_PROCESS=1) con SELECT ... FOR UPDATE SKIP LOCKED (MySQL 8+).
+-- Backup your DB before running.
+
+CREATE TABLE IF NOT EXISTS trabajos (
+  id_trabajo INT AUTO_INCREMENT PRIMARY KEY,
+  tipo VARCHAR(50) NOT NULL,
+  datos TEXT NOT NULL,
+  estado ENUM('pendiente', 'en-proceso', 'completado', 'fallido') NOT NULL DEFAULT 'pendiente',
+  intentos INT NOT NULL DEFAULT 0,
+  ultimo_error TEXT NULL,
+  disponible_en DATETIME NOT NULL,
+  bloqueado_hasta DATETIME NULL,
+  fecha_creacion DATETIME NOT NULL,
+  fecha_inicio DATETIME NULL,
+  fecha_fin DATETIME NULL
+) ENGINE=InnoDB;
+
+-- reclamar los siguientes trabajos listos
+CREATE INDEX idx_trabajos_cola ON trabajos(estado, disponible_en);
+-- métricas de latencia y purga de completados
+CREATE INDEX idx_trabajos_fin ON trabajos(fecha_fin);
@@ -0,0 +1,93 @@
+"""Mueve las fotos de perfil guardadas como data URL (base64) en `usuarios.imagen_usuario` al
+almacén de uploads (`static/uploads/cas/`) y reescribe la columna con la ruta corta.
+
+Uso (desde backend/):
+
+    python -m migrations.offload_imagen_usuario [--batch-size 50] [--dry-run]
+
+Es idempotente: solo procesa filas cuyo valor aún empieza por `data:`. Las filas con un data URL
+inválido se dejan como están y se informan al final. Procesa por lotes ordenados por id (keyset),
+con un commit por lote, así puede interrumpirse y relanzarse sin repetir trabajo.
+
+Tras cada lote se invalidan los actores cacheados de esos usuarios en este proceso; los workers
+de uvicorn en marcha los releen al vencer ACTOR_CACHE_TTL (o ejecutarlo con la app detenida).
+"""
+import argparse
+import logging
+
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from auth import invalidate_actor
+from config import media_conf
+from database import SessionLocal
+from models import Usuario
+from services import image_pipeline, upload_store
+
+logger = logging.getLogger("offload_imagen_usuario")
+
+
+def _next_batch(db, after_id: int, batch_size: int):
+    # solo id, correo (clave de la caché de actores) e imagen: las filas con base64 pueden pesar
+    # cientos de KB cada una
+    return (
+        db.query(Usuario.id_usuario, Usuario.correo_usuario, Usuario.imagen_usuario)
+        .filter(Usuario.id_usuario > after_id, Usuario.imagen_usuario.like("data:%"))
+        .order_by(Usuario.id_usuario)
+        .limit(batch_size)
+        .all()
+    )
+
+
+def run(batch_size: int = 50, dry_run: bool = False) -> dict:
+    stats = {"migrated": 0, "failed": [], "bytes_before": 0, "bytes_after": 0}
+    last_id = 0
+    with SessionLocal() as db:
+        while True:
+            rows = _next_batch(db, last_id, batch_size)
+            if not rows:
+                break
+            migrados = []
+            for id_usuario, correo, imagen in rows:
+                last_id = id_usuario
+                stats["bytes_before"] += len(imagen)
+                if dry_run:
+                    stats["migrated"] += 1
+                    continue
+                try:
+                    url = upload_store.store_data_url(imagen, media_conf.PROFILE_IMAGE_SIZES)
+                except HTTPException as e:
+                    stats["failed"].append((id_usuario, e.detail))
+                    continue
+                stats["migrated"] += 1
+                stats["bytes_after"] += len(url)
+                migrados.append(correo)
+                db.execute(
+                    update(Usuario)
+                    .where(Usuario.id_usuario == id_usuario)
+                    .values(imagen_usuario=url)
+                    .execution_options(synchronize_session=False)
+                )
+            if not dry_run:
+                db.commit()
+                # UPDATE masivo: no pasa por los hooks de sesión que invalidan la caché de actores
+                for correo in migrados:
+                    invalidate_actor(correo)
+            logger.info("hasta id_usuario=%s: %s migradas", last_id, stats["migrated"])
+    # esperar a que se generen las variantes antes de salir
+    image_pipeline.shutdown(wait=True)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--dry-run", action="store_true", help="solo contar, sin escribir archivos ni filas")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    result = run(args.batch_size, args.dry_run)
+    print(f"migradas={result['migrated']}  fallidas={len(result['failed'])}  "
+          f"columna: {result['bytes_before'] / 1024:.0f} KiB -> {result['bytes_after'] / 1024:.1f} KiB")
+    for id_usuario, motivo in result["failed"]:
+        print(f"  id_usuario={id_usuario}: {motivo}")
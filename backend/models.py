@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Boolean, DECIMAL, Enum, TIMESTAMP, Date, Time
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Boolean, DECIMAL, Enum, TIMESTAMP, Date, Time, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 import enum
@@ -22,7 +22,8 @@ class Usuario(Base):
     password_usuario = Column(String(255), nullable=False)
     # direccion and codigo_postal moved to Domicilio table in the DB schema
     # (no longer stored directly on Usuario)
-    # Guardamos la imagen como data URL (base64). Usar Text para evitar truncamientos por longitud.
+    # Ruta corta bajo /static/uploads. Los data URL (base64) ya no se guardan aquí: la API los mueve al
+    # almacén de uploads y `migrations/offload_imagen_usuario.py` migra las filas antiguas.
     imagen_usuario = Column(Text)
     id_rol = Column(Integer, ForeignKey("rol_usuarios.id_rol"), nullable=False)
     # now include region and city as FKs
@@ -39,7 +40,7 @@ class Usuario(Base):
     # Nota: no se mantiene aquí relación de domicilios asignados porque la nueva
     # estructura de la BD no registra un `id_domiciliario` en la tabla `domicilios`.
     metodos_pago = relationship("MetodoPago", back_populates="usuario")
-    pedidos = relationship("Pedido", back_populates="usuario")
+    pedidos = relationship("Pedido", back_populates="usuario", foreign_keys="[Pedido.id_usuario]")
     region = relationship("Region")
     ciudad = relationship("Ciudad")
     notificaciones = relationship("Notificacion", back_populates="usuario_destino")
@@ -79,6 +80,11 @@ class Domicilio(Base):
     region = relationship("Region")
     ciudad = relationship("Ciudad")
 
+    # listado filtrado por estado/ciudad y paginado por id_domicilio (GET /domicilios)
+    __table_args__ = (
+        Index("idx_domicilios_estado_ciudad", "estado_domicilio", "id_ciudad", "id_domicilio"),
+    )
+
 
 class Servicio(Base):
     __tablename__ = "servicios"
@@ -112,6 +118,88 @@ class Notificacion(Base):
 
     usuario_destino = relationship("Usuario", back_populates="notificaciones")
 
+    __table_args__ = (
+        # contador de no leídas: COUNT sobre el índice, sin leer filas
+        Index("idx_notificaciones_no_leidas", "id_usuario_destino", "leida", "fecha_creacion"),
+        # bandeja paginada por id (más recientes primero)
+        Index("idx_notificaciones_bandeja", "id_usuario_destino", "id_notificacion"),
+    )
+
+
+class Evento(Base):
+    # Eventos en tiempo real (notificaciones, cambios de pedidos/domicilios) para los streams SSE.
+    # Cada worker lee las filas nuevas y las reparte a sus conexiones (ver services/event_hub.py).
+    __tablename__ = "eventos"
+
+    id_evento = Column(Integer, primary_key=True, autoincrement=True)
+    canal = Column(String(50), nullable=False)  # "usuario:<id>", "rol:<id>", "proveedor:<id>"
+    tipo = Column(String(50), nullable=False)
+    datos = Column(Text, nullable=False)  # JSON
+    fecha_creacion = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_eventos_canal", "canal", "id_evento"),
+        Index("idx_eventos_fecha", "fecha_creacion"),
+    )
+
+
+class Trabajo(Base):
+    # Trabajos en segundo plano (notificaciones tras un cambio, etc.). Se insertan en la misma
+    # transacción que el cambio y los consume `worker.py` (ver services/trabajos.py).
+    __tablename__ = "trabajos"
+
+    id_trabajo = Column(Integer, primary_key=True, autoincrement=True)
+    tipo = Column(String(50), nullable=False)
+    datos = Column(Text, nullable=False)  # JSON
+    estado = Column(Enum("pendiente", "en-proceso", "completado", "fallido"), nullable=False, default="pendiente")
+    intentos = Column(Integer, nullable=False, default=0)
+    ultimo_error = Column(Text)
+    disponible_en = Column(DateTime, nullable=False)  # no se ejecuta antes (reintentos con espera)
+    bloqueado_hasta = Column(DateTime)  # fin de la reserva del consumidor que lo reclamó
+    fecha_creacion = Column(DateTime, nullable=False)
+    fecha_inicio = Column(DateTime)
+    fecha_fin = Column(DateTime)
+
+    __table_args__ = (
+        Index("idx_trabajos_cola", "estado", "disponible_en"),
+        Index("idx_trabajos_fin", "fecha_fin"),
+    )
+
+
+class CodigoVerificacion(Base):
+    # Códigos de un solo uso pendientes (verificación de correo, recuperación de contraseña) cuando
+    # CODE_STORE=db; así cualquier worker puede validarlos (ver services/code_store.py).
+    __tablename__ = "codigos_verificacion"
+
+    proposito = Column(String(20), primary_key=True)  # "verificacion" | "recuperacion"
+    correo = Column(String(100), primary_key=True)
+    codigo_hash = Column(String(64), nullable=False)  # sha256 del código
+    intentos = Column(Integer, nullable=False, default=0)
+    fecha_expiracion = Column(DateTime, nullable=False)
+
+    __table_args__ = (Index("idx_codigos_expiracion", "fecha_expiracion"),)
+
+
+class Idempotencia(Base):
+    # Respuestas de POST /checkout y POST /citas por Idempotency-Key y actor, para que un reintento
+    # reciba la misma respuesta sin repetir la escritura (ver services/idempotencia.py).
+    __tablename__ = "idempotencia"
+
+    id_idempotencia = Column(Integer, primary_key=True, autoincrement=True)
+    ruta = Column(String(50), nullable=False)
+    actor = Column(String(50), nullable=False)  # "usuario:<id>"
+    clave = Column(String(255), nullable=False)
+    huella = Column(String(64), nullable=False)  # sha256 del cuerpo del request
+    estado = Column(Enum("en-proceso", "completado"), nullable=False, default="en-proceso")
+    status_code = Column(Integer)
+    respuesta = Column(Text)  # JSON
+    fecha_expiracion = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("ruta", "actor", "clave", name="uq_idempotencia_clave"),
+        Index("idx_idempotencia_expiracion", "fecha_expiracion"),
+    )
+
 
 class Mensaje(Base):
     __tablename__ = "mensajes"
@@ -185,6 +273,12 @@ class Cita(Base):
     servicio = relationship("Servicio", back_populates="citas")
     resultados = relationship("Resultado", back_populates="cita")
 
+    # agenda del emprendedor: citas de un servicio en orden (fecha, hora, id) para paginar por cursor
+    __table_args__ = (
+        Index("idx_citas_servicio_agenda", "id_servicio", "fecha_cita", "hora_cita", "id_cita"),
+        Index("idx_citas_usuario_agenda", "id_usuario", "fecha_cita", "hora_cita", "id_cita"),
+    )
+
 
 class Resultado(Base):
     __tablename__ = "resultados"
@@ -274,12 +368,26 @@ class Pedido(Base):
     id_metodo_pago = Column(Integer, ForeignKey("metodo_pago.id_metodo_pago"), nullable=False)
     id_domicilio = Column(Integer, ForeignKey("domicilios.id_domicilio"), nullable=True)
 
+    # despacho (services/despacho.py): solo pedidos con domicilio. 'reclamado' vence en
+    # reservado_hasta y vuelve a 'disponible' si el domiciliario no lo recoge a tiempo.
+    estado_despacho = Column(Enum("disponible", "reclamado", "en-ruta", "entregado"), nullable=True)
+    id_domiciliario = Column(Integer, ForeignKey("usuarios.id_usuario"), nullable=True)
+    reservado_hasta = Column(DateTime, nullable=True)
+
     metodo_pago = relationship("MetodoPago", back_populates="pedidos")
-    usuario = relationship("Usuario", back_populates="pedidos")
+    usuario = relationship("Usuario", back_populates="pedidos", foreign_keys=[id_usuario])
+    domiciliario = relationship("Usuario", foreign_keys=[id_domiciliario])
     domicilio = relationship("Domicilio")
     detalle_pedidos = relationship("DetallePedido", back_populates="pedido")
     recibos = relationship("Recibo", back_populates="pedido")
 
+    __table_args__ = (
+        # siguientes disponibles y reservas vencidas
+        Index("idx_pedidos_despacho", "estado_despacho", "reservado_hasta"),
+        # entregas de cada domiciliario
+        Index("idx_pedidos_domiciliario", "id_domiciliario", "estado_despacho"),
+    )
+
 
 class DetallePedido(Base):
     __tablename__ = "detalle_pedido"
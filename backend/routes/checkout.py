@@ -1,31 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Pedido, DetallePedido, Recibo, MetodoPago, Usuario, Domicilio
-from schemas import DomicilioCreate
-from auth import get_current_user
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from models import Pedido, DetallePedido, Producto, Recibo, MetodoPago, Usuario, Domicilio
+from auth import get_current_user_async
+from services import idempotencia, referencias
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict
 from decimal import Decimal
 from sqlalchemy.exc import SQLAlchemyError
-import traceback
 import logging
 
 router = APIRouter(prefix="/checkout", tags=["Checkout"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 class CheckoutItem(BaseModel):
     id_producto: int
     cantidad: int
-    subtotal: Decimal
+    # ignorado: el subtotal se calcula con el precio actual del producto
+    subtotal: Optional[Decimal] = None
 
 
 class CheckoutDomicilio(BaseModel):
@@ -38,132 +31,133 @@ class CheckoutDomicilio(BaseModel):
 
 class CheckoutCreate(BaseModel):
     id_metodo_pago: int
-    total: Decimal
+    # total que vio el cliente; si no coincide con el calculado en el servidor se responde 409
+    total: Optional[Decimal] = None
     items: List[CheckoutItem]
     # opcional: datos para crear un domicilio asociado al pedido
     domicilio: Optional[CheckoutDomicilio] = None
 
 
+CENTAVOS = Decimal("0.01")
+
+
+def _as_dict(obj) -> dict:
+    # solo columnas: pedido y recibo se referencian entre sí por las relaciones
+    return {c.key: getattr(obj, c.key) for c in obj.__table__.columns}
+
+
+async def _precios(db: AsyncSession, items: List[CheckoutItem]) -> Dict[int, Decimal]:
+    """Precio de cada producto del carrito con una sola consulta IN; valida que existan y estén en stock."""
+    ids = {it.id_producto for it in items}
+    rows = (await db.execute(
+        select(Producto.id_producto, Producto.precio_producto, Producto.estado_producto).where(Producto.id_producto.in_(ids))
+    )).all()
+    encontrados = {r.id_producto: r for r in rows}
+    faltantes = sorted(ids - set(encontrados))
+    if faltantes:
+        raise HTTPException(status_code=400, detail=f"Productos no encontrados: {faltantes}")
+    no_disponibles = sorted(r.id_producto for r in rows if r.estado_producto != "en-stock")
+    if no_disponibles:
+        raise HTTPException(status_code=409, detail=f"Productos no disponibles: {no_disponibles}")
+    return {r.id_producto: Decimal(r.precio_producto) for r in rows}
+
+
+async def _domicilio(db: AsyncSession, dom_data: CheckoutDomicilio, current_user: Usuario) -> Domicilio:
+    """Domicilio existente del usuario (actualizando dirección/código postal) o uno nuevo sin guardar aún."""
+    # caso: referencia a domicilio existente
+    if dom_data.id_domicilio:
+        existing = (await db.execute(select(Domicilio).where(
+            Domicilio.id_domicilio == int(dom_data.id_domicilio),
+            Domicilio.id_usuario == current_user.id_usuario,
+        ))).scalars().first()
+        if not existing:
+            raise HTTPException(status_code=400, detail="Domicilio no válido o no pertenece al usuario")
+        # actualizar SOLO direccion_completa y codigo_postal si vienen en el payload
+        if dom_data.direccion_completa:
+            existing.direccion_completa = dom_data.direccion_completa
+        if dom_data.codigo_postal:
+            existing.codigo_postal = dom_data.codigo_postal
+        return existing
+    # crear nuevo domicilio: requiere dirección, región y ciudad
+    if not dom_data.direccion_completa:
+        raise HTTPException(status_code=400, detail="Direccion completa requerida para crear un domicilio")
+    if not dom_data.id_region or not dom_data.id_ciudad:
+        raise HTTPException(status_code=400, detail="Region y ciudad son requeridas para crear un domicilio")
+    referencias.validar_ubicacion(await referencias.get_async(), dom_data.id_region, dom_data.id_ciudad)
+    return Domicilio(
+        direccion_completa=dom_data.direccion_completa,
+        codigo_postal=dom_data.codigo_postal,
+        id_region=dom_data.id_region,
+        id_ciudad=dom_data.id_ciudad,
+        id_usuario=current_user.id_usuario,
+    )
+
+
+# Checkout atómico: precios y totales calculados en el servidor, líneas insertadas con un solo
+# executemany y domicilio + pedido + detalles + recibo confirmados en una única transacción.
+# Con la cabecera Idempotency-Key, un reintento recibe la respuesta original sin crear otro pedido.
 @router.post("/")
-def process_checkout(
-    payload: CheckoutCreate, 
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+async def process_checkout(
+    payload: CheckoutCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Usuario = Depends(get_current_user_async)
 ):
+    return await idempotencia.ejecutar(
+        idempotency_key, f"usuario:{current_user.id_usuario}", "checkout", payload,
+        lambda: _checkout(payload, db, current_user),
+    )
+
+
+async def _checkout(payload: CheckoutCreate, db: AsyncSession, current_user: Usuario):
+    # Basic payload validation to avoid server 500s
+    if not payload.items:
+        raise HTTPException(status_code=400, detail="El pedido debe contener al menos un item")
+    if any(it.cantidad <= 0 for it in payload.items):
+        raise HTTPException(status_code=400, detail="La cantidad de cada item debe ser mayor que 0")
+
+    # Validar que el método de pago pertenece al usuario
+    metodo_pago = (await db.execute(select(MetodoPago.id_metodo_pago).where(
+        MetodoPago.id_metodo_pago == payload.id_metodo_pago,
+        MetodoPago.id_usuario == current_user.id_usuario
+    ))).first()
+    if not metodo_pago:
+        raise HTTPException(
+            status_code=400,
+            detail="Método de pago no válido o no pertenece al usuario"
+        )
+
+    precios = await _precios(db, payload.items)
+    lineas = [
+        {"id_producto": it.id_producto, "cantidad": it.cantidad, "subtotal": (precios[it.id_producto] * it.cantidad).quantize(CENTAVOS)}
+        for it in payload.items
+    ]
+    total = sum((l["subtotal"] for l in lineas), Decimal(0))
+    if payload.total is not None and Decimal(payload.total).quantize(CENTAVOS) != total:
+        raise HTTPException(status_code=409, detail={"mensaje": "El total cambió, revisa el carrito", "total": str(total)})
+
+    domicilio = await _domicilio(db, payload.domicilio, current_user) if payload.domicilio else None
+
     try:
-        print(f"Procesando checkout para usuario {current_user.id_usuario}")
-        print(f"Método de pago seleccionado: {payload.id_metodo_pago}")
-        
-        # Validar que el método de pago pertenece al usuario
-        metodo_pago = db.query(MetodoPago).filter(
-            MetodoPago.id_metodo_pago == payload.id_metodo_pago,
-            MetodoPago.id_usuario == current_user.id_usuario
-        ).first()
-        
-        print(f"Método de pago encontrado: {metodo_pago}")
-        
-        if not metodo_pago:
-            raise HTTPException(
-                status_code=400,
-                detail="Método de pago no válido o no pertenece al usuario"
-            )
-
-        # Basic payload validation to avoid server 500s
-        if not payload.items or len(payload.items) == 0:
-            raise HTTPException(status_code=400, detail="El pedido debe contener al menos un item")
-
-        # Validate domicilio data when provided and not referencing existing domicilio
-        if payload.domicilio:
-            dom_data = payload.domicilio
-            # If creating a new domicilio (no id_domicilio), require direccion, region and ciudad
-            if not getattr(dom_data, "id_domicilio", None):
-                if not getattr(dom_data, "direccion_completa", None):
-                    raise HTTPException(status_code=400, detail="Direccion completa requerida para crear un domicilio")
-                if not getattr(dom_data, "id_region", None) or not getattr(dom_data, "id_ciudad", None):
-                    raise HTTPException(status_code=400, detail="Region y ciudad son requeridas para crear un domicilio")
-
-        # Si se enviaron datos de domicilio:
-        # - si contienen 'id_domicilio' reutilizar domicilio existente (y opcionalmente actualizar campos)
-        # - si no, crear un nuevo domicilio con la estructura esperada
-        id_domicilio = None
-        if payload.domicilio:
-            dom_data = payload.domicilio
-            # caso: referencia a domicilio existente
-            if getattr(dom_data, "id_domicilio", None):
-                existing_id = int(dom_data.id_domicilio)
-                existing = db.query(Domicilio).filter(
-                    Domicilio.id_domicilio == existing_id,
-                    Domicilio.id_usuario == current_user.id_usuario,
-                ).first()
-                if not existing:
-                    raise HTTPException(status_code=400, detail="Domicilio no válido o no pertenece al usuario")
-                # actualizar SOLO direccion_completa y codigo_postal si vienen en el payload
-                if getattr(dom_data, "direccion_completa", None):
-                    existing.direccion_completa = dom_data.direccion_completa
-                if getattr(dom_data, "codigo_postal", None):
-                    existing.codigo_postal = dom_data.codigo_postal
-                db.add(existing)
-                db.commit()
-                db.refresh(existing)
-                id_domicilio = existing.id_domicilio
-            else:
-                # crear nuevo domicilio siguiendo el esquema CheckoutDomicilio (debe incluir region/ciudad)
-                nuevo_dom = Domicilio(
-                    direccion_completa=dom_data.direccion_completa,
-                    codigo_postal=dom_data.codigo_postal,
-                    id_region=dom_data.id_region,
-                    id_ciudad=dom_data.id_ciudad,
-                    id_usuario=current_user.id_usuario,
-                )
-                db.add(nuevo_dom)
-                db.commit()
-                db.refresh(nuevo_dom)
-                id_domicilio = nuevo_dom.id_domicilio
-
-        # 1) Crear pedido con estado 'pagado'
         pedido = Pedido(
-            total=Decimal(payload.total),
+            total=total,
             id_metodo_pago=payload.id_metodo_pago,
             estado_pedido="pagado",
-            id_usuario=current_user.id_usuario,  # Añadimos el id_usuario
-            id_domicilio=id_domicilio,
-        )
-        db.add(pedido)
-        db.commit()
-        db.refresh(pedido)
-
-        # 2) Crear detalle_pedido para cada item
-        for it in payload.items:
-            detalle = DetallePedido(
-                id_pedido=pedido.id_pedido,
-                id_producto=it.id_producto,
-                cantidad=it.cantidad,
-                subtotal=Decimal(it.subtotal),
-            )
-            db.add(detalle)
-
-        db.commit()
-
-        # 3) Crear recibo con estado 'pagado'
-        nuevo_recibo = Recibo(
-            monto_pagado=Decimal(payload.total),
-            estado_recibo="pagado",
-            id_pedido=pedido.id_pedido,
+            id_usuario=current_user.id_usuario,
+            domicilio=domicilio,
+            # con domicilio entra a la cola de despacho (POST /despacho/reclamar)
+            estado_despacho="disponible" if domicilio else None,
         )
-        db.add(nuevo_recibo)
-        db.commit()
-        db.refresh(nuevo_recibo)
-
-        return {"pedido": pedido, "recibo": nuevo_recibo}
-    except SQLAlchemyError as e:
-        db.rollback()
-        tb = traceback.format_exc()
-        logging.error(tb)
-        # Return SQLAlchemy error plus stack for local debugging
-        raise HTTPException(status_code=500, detail=str(e) + "\n" + tb)
-    except Exception as e:
-        db.rollback()
-        tb = traceback.format_exc()
-        logging.error(tb)
-        # Return generic exception plus stack for local debugging
-        raise HTTPException(status_code=500, detail=str(e) + "\n" + tb)
+        nuevo_recibo = Recibo(monto_pagado=total, estado_recibo="pagado", pedido=pedido)
+        db.add_all([pedido, nuevo_recibo])
+        # un flush para domicilio, pedido y recibo (los ids se asignan sin releer filas)
+        await db.flush()
+        # todas las líneas del pedido en un solo executemany
+        await db.execute(insert(DetallePedido), [dict(l, id_pedido=pedido.id_pedido) for l in lineas])
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        logging.exception("Error procesando checkout")
+        raise HTTPException(status_code=500, detail="No se pudo procesar el pedido")
+
+    return {"pedido": _as_dict(pedido), "recibo": _as_dict(nuevo_recibo), "detalles": lineas}
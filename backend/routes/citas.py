@@ -1,81 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from models import Cita, Mascota, Servicio, Usuario, MetodoPago, Notificacion, Pedido, Recibo, Mensaje, Bloqueo, Denuncia
 from decimal import Decimal
 from schemas import CitaCreate, CitaUpdateEstado
-from auth import get_current_user
+from auth import get_current_user_async
+from services import idempotencia, notificaciones
 from datetime import datetime, date, time
 from pydantic import BaseModel
+from typing import Optional
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate_keyset_async, set_next_cursor
+from utils.listing import ListParams, ListSpec, list_page_async
 
 router = APIRouter(prefix="/citas", tags=["Citas"])
 
-# Dependencia para la sesión DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Listado paginado: filtros, orden y campos permitidos (ver utils/listing.py)
+CITAS = ListSpec(
+    Cita,
+    filters=("id_usuario", "id_servicio", "id_mascota", "estado_cita", "fecha_cita"),
+    sortable=("fecha_cita",),
+)
 
 # Listar todas las citas
 @router.get("/")
-def get_citas(db: Session = Depends(get_db)):
-    return db.query(Cita).all()
+async def get_citas(response: Response, params: ListParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+    return await list_page_async(db, CITAS, params, response)
 
 
 # Listar citas para los servicios del emprendedor autenticado
 @router.get("/owner")
-def get_citas_owner(db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    # Unir Cita con Servicio y filtrar por el dueño del servicio.
-    # Además incluimos datos básicos de la mascota para que el emprendedor pueda verlos.
-    results = []
-    citas = db.query(Cita).join(Servicio, Cita.id_servicio == Servicio.id_servicio).filter(Servicio.id_usuario == current_user.id_usuario).all()
-    for c in citas:
-        servicio = db.query(Servicio).filter(Servicio.id_servicio == c.id_servicio).first()
-        mascota = db.query(Mascota).filter(Mascota.id_mascota == c.id_mascota).first()
-        results.append({
-            "id_cita": c.id_cita,
-            "id_servicio": c.id_servicio,
-            "tipo_servicio": servicio.tipo_servicio if servicio else None,
-            "id_usuario": c.id_usuario,
-            "fecha_cita": str(c.fecha_cita),
-            "hora_cita": str(c.hora_cita),
-            "estado_cita": c.estado_cita,
-            "id_mascota": c.id_mascota,
+async def get_citas_owner(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Usuario = Depends(get_current_user_async),
+):
+    # Una sola consulta: Cita + Servicio (dueño) + Mascota, proyectando solo las columnas
+    # que usa el panel del emprendedor. Paginación por (fecha_cita, hora_cita, id_cita);
+    # el cursor de la siguiente página se devuelve en la cabecera X-Next-Cursor.
+    query = (
+        select(
+            Cita.id_cita,
+            Cita.id_servicio,
+            Servicio.tipo_servicio,
+            Cita.id_usuario,
+            Cita.fecha_cita,
+            Cita.hora_cita,
+            Cita.estado_cita,
+            Cita.id_mascota,
+            Mascota.nombre_mascota,
+            Mascota.edad_mascota,
+            Mascota.peso_mascota,
+            Mascota.altura_mascota,
+            Mascota.especie_mascota,
+        )
+        .join(Servicio, Cita.id_servicio == Servicio.id_servicio)
+        .outerjoin(Mascota, Cita.id_mascota == Mascota.id_mascota)
+        .where(Servicio.id_usuario == current_user.id_usuario)
+    )
+    rows, next_cursor = await paginate_keyset_async(db, query, [Cita.fecha_cita, Cita.hora_cita, Cita.id_cita], cursor, limit)
+    set_next_cursor(response, next_cursor)
+
+    return [
+        {
+            "id_cita": r.id_cita,
+            "id_servicio": r.id_servicio,
+            "tipo_servicio": r.tipo_servicio,
+            "id_usuario": r.id_usuario,
+            "fecha_cita": str(r.fecha_cita),
+            "hora_cita": str(r.hora_cita),
+            "estado_cita": r.estado_cita,
+            "id_mascota": r.id_mascota,
             "mascota": {
-                "nombre": mascota.nombre_mascota if mascota else None,
-                "edad": mascota.edad_mascota if mascota else None,
-                "peso": mascota.peso_mascota if mascota else None,
-                "altura": mascota.altura_mascota if mascota else None,
-                "especie": mascota.especie_mascota if mascota else None,
-            } if mascota else None
-        })
-    return results
+                "nombre": r.nombre_mascota,
+                "edad": r.edad_mascota,
+                "peso": r.peso_mascota,
+                "altura": r.altura_mascota,
+                "especie": r.especie_mascota,
+            } if r.nombre_mascota is not None else None
+        }
+        for r in rows
+    ]
 
 # Crear una nueva cita (propietario = usuario autenticado)
-@router.post("/")
-def create_cita(cita: CitaCreate, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    # validar mascota pertenece al usuario
-    mascota = db.query(Mascota).filter(Mascota.id_mascota == cita.id_mascota).first()
-    if not mascota:
-        raise HTTPException(status_code=400, detail="Mascota no encontrada")
-    if mascota.id_usuario != current_user.id_usuario:
-        raise HTTPException(status_code=403, detail="La mascota no pertenece al usuario autenticado")
-
-    # validar servicio existe
-    servicio = db.query(Servicio).filter(Servicio.id_servicio == cita.id_servicio).first()
-    if not servicio:
-        raise HTTPException(status_code=400, detail="Servicio no encontrado")
-
-    # validar método de pago por id y que pertenezca al usuario autenticado
-    metodo = db.query(MetodoPago).filter(MetodoPago.id_metodo_pago == cita.id_metodo_pago).first()
-    if not metodo:
-        raise HTTPException(status_code=400, detail="Método de pago no encontrado")
-    if metodo.id_usuario != current_user.id_usuario:
-        raise HTTPException(status_code=403, detail="El método de pago no pertenece al usuario autenticado")
-
-    # parsear fecha/hora
+def _parse_fecha_hora(cita: CitaCreate):
     try:
         fecha_obj = datetime.strptime(cita.fecha_cita, "%Y-%m-%d").date()
     except Exception:
@@ -88,93 +98,123 @@ def create_cita(cita: CitaCreate, db: Session = Depends(get_db), current_user: U
             hora_obj = datetime.strptime(cita.hora_cita, "%H:%M:%S").time()
         except Exception:
             raise HTTPException(status_code=400, detail="Formato de hora inválido. Use HH:MM")
-            
-    # la cita siempre inicia como pendiente (el usuario podrá confirmarla después)
-    estado_inicial = "pendiente"
+    return fecha_obj, hora_obj
+
+
+def _validacion_reserva(cita: CitaCreate):
+    """Dueño de la mascota, servicio y método de pago en una sola consulta (NULL = no existe)."""
+    def col(stmt, name):
+        return stmt.scalar_subquery().label(name)
+
+    return select(
+        col(select(Mascota.id_usuario).where(Mascota.id_mascota == cita.id_mascota), "mascota_usuario"),
+        col(select(Servicio.id_usuario).where(Servicio.id_servicio == cita.id_servicio), "servicio_usuario"),
+        col(select(Servicio.tipo_servicio).where(Servicio.id_servicio == cita.id_servicio), "tipo_servicio"),
+        col(select(MetodoPago.id_usuario).where(MetodoPago.id_metodo_pago == cita.id_metodo_pago), "metodo_usuario"),
+        col(select(MetodoPago.tipo_metodo).where(MetodoPago.id_metodo_pago == cita.id_metodo_pago), "tipo_metodo"),
+    )
+
+
+# Reservar una cita: una consulta de validación, un solo flush (cita + pedido + recibo) y un commit.
+# La notificación al emprendedor se envía después del commit, sin retrasar la respuesta.
+@router.post("/")
+async def create_cita(
+    cita: CitaCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Usuario = Depends(get_current_user_async),
+):
+    # con Idempotency-Key, un reintento recibe la cita ya creada en lugar de reservar otra
+    return await idempotencia.ejecutar(
+        idempotency_key, f"usuario:{current_user.id_usuario}", "citas", cita,
+        lambda: _reservar_cita(cita, db, current_user),
+    )
+
+
+async def _reservar_cita(cita: CitaCreate, db: AsyncSession, current_user: Usuario):
+    fecha_obj, hora_obj = _parse_fecha_hora(cita)
+
+    v = (await db.execute(_validacion_reserva(cita))).one()
+    # validar mascota pertenece al usuario
+    if v.mascota_usuario is None:
+        raise HTTPException(status_code=400, detail="Mascota no encontrada")
+    if v.mascota_usuario != current_user.id_usuario:
+        raise HTTPException(status_code=403, detail="La mascota no pertenece al usuario autenticado")
+    # validar servicio existe
+    if v.servicio_usuario is None:
+        raise HTTPException(status_code=400, detail="Servicio no encontrado")
+    # validar método de pago por id y que pertenezca al usuario autenticado
+    if v.metodo_usuario is None:
+        raise HTTPException(status_code=400, detail="Método de pago no encontrado")
+    if v.metodo_usuario != current_user.id_usuario:
+        raise HTTPException(status_code=403, detail="El método de pago no pertenece al usuario autenticado")
 
+    # la cita siempre inicia como pendiente (el usuario podrá confirmarla después)
     # guardamos en la cita el tipo de método (texto) para mantener compatibilidad con la columna Enum actual
     nueva_cita = Cita(
         fecha_cita=fecha_obj,
         hora_cita=hora_obj,
-        metodo_pago=metodo.tipo_metodo,
-        estado_cita=estado_inicial,
+        metodo_pago=v.tipo_metodo,
+        estado_cita="pendiente",
         id_usuario=current_user.id_usuario,
         id_mascota=cita.id_mascota,
         id_servicio=cita.id_servicio,
     )
-    db.add(nueva_cita)
-    db.commit()
-    db.refresh(nueva_cita)
-    # Crear pedido y recibo asociados a la cita (registro en 'Mi Cuenta')
-    try:
-        pedido = Pedido(
-            total=Decimal(0),
-            id_metodo_pago=cita.id_metodo_pago,
-            estado_pedido="pendiente",
-            id_usuario=current_user.id_usuario,
-        )
-        db.add(pedido)
-        db.commit()
-        db.refresh(pedido)
-
-        recibo = Recibo(
-            monto_pagado=Decimal(0),
-            estado_recibo="emitido",
-            id_pedido=pedido.id_pedido,
-        )
-        db.add(recibo)
-        db.commit()
-    except Exception:
-        db.rollback()
-    # Crear notificación para el emprendedor dueño del servicio
+    # pedido y recibo asociados a la cita (registro en 'Mi Cuenta'); el recibo toma el id del pedido
+    # a través de la relación, sin releerlo
+    pedido = Pedido(
+        total=Decimal(0),
+        id_metodo_pago=cita.id_metodo_pago,
+        estado_pedido="pendiente",
+        id_usuario=current_user.id_usuario,
+    )
+    recibo = Recibo(monto_pagado=Decimal(0), estado_recibo="emitido", pedido=pedido)
+    db.add_all([nueva_cita, pedido, recibo])
     try:
-        titulo = f"Nueva cita pendiente: {servicio.tipo_servicio}"
-        mensaje = f"El usuario con id {current_user.id_usuario} ha reservado una cita para {servicio.tipo_servicio} el {fecha_obj} a las {hora_obj}."
-        notif = Notificacion(
-            id_usuario_destino=servicio.id_usuario,
-            titulo=titulo,
-            mensaje=mensaje,
-            url=f"/citas/{nueva_cita.id_cita}",
-            leida=False,
-            fecha_creacion=datetime.utcnow(),
-            id_cita=nueva_cita.id_cita,
+        await db.flush()
+        # Notificación para el emprendedor dueño del servicio: trabajo en segundo plano que se
+        # guarda con la cita (si falla se reintenta sin afectar a la reserva)
+        notificaciones.encolar_notificacion(
+            db,
+            [v.servicio_usuario],
+            f"Nueva cita pendiente: {v.tipo_servicio}",
+            f"El usuario con id {current_user.id_usuario} ha reservado una cita para {v.tipo_servicio} el {fecha_obj} a las {hora_obj}.",
+            f"/citas/{nueva_cita.id_cita}",
+            nueva_cita.id_cita,
         )
-        db.add(notif)
-        db.commit()
+        await db.commit()
     except Exception:
-        # No detener la creación de la cita si la notificación falla
-        db.rollback()
-    return nueva_cita
-
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="No se pudo registrar la cita")
     return nueva_cita
 
 # Consultar una cita por id
 @router.get("/{cita_id}")
-def get_cita(cita_id: int, db: Session = Depends(get_db)):
-    cita = db.query(Cita).filter(Cita.id_cita == cita_id).first()
+async def get_cita(cita_id: int, db: AsyncSession = Depends(get_async_db)):
+    cita = await db.get(Cita, cita_id)
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
     return cita
 
 # Actualizar el estado de una cita
 @router.put("/{cita_id}")
-def update_cita_estado(cita_id: int, estado: CitaUpdateEstado, db: Session = Depends(get_db)):
-    cita = db.query(Cita).filter(Cita.id_cita == cita_id).first()
+async def update_cita_estado(cita_id: int, estado: CitaUpdateEstado, db: AsyncSession = Depends(get_async_db)):
+    cita = await db.get(Cita, cita_id)
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
     cita.estado_cita = estado.estado_cita
-    db.commit()
-    db.refresh(cita)
+    await db.commit()
+    await db.refresh(cita)
     return cita
 
 
 # Confirmar una cita (por el dueño del servicio)
 @router.post("/{cita_id}/confirm")
-def confirm_cita(cita_id: int, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    cita = db.query(Cita).filter(Cita.id_cita == cita_id).first()
+async def confirm_cita(cita_id: int, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
+    cita = await db.get(Cita, cita_id)
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
-    servicio = db.query(Servicio).filter(Servicio.id_servicio == cita.id_servicio).first()
+    servicio = await db.get(Servicio, cita.id_servicio)
     if not servicio:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
     # Solo el dueño del servicio puede confirmar
@@ -182,37 +222,27 @@ def confirm_cita(cita_id: int, db: Session = Depends(get_db), current_user: Usua
         raise HTTPException(status_code=403, detail="No autorizado para confirmar esta cita")
 
     cita.estado_cita = "confirmada"
-    db.commit()
-    db.refresh(cita)
-
-    # Notificar al usuario que creó la cita
-    try:
-        titulo = f"Cita confirmada: {servicio.tipo_servicio}"
-        mensaje = f"Tu cita para {servicio.tipo_servicio} el {cita.fecha_cita} a las {cita.hora_cita} ha sido confirmada."
-        notif = Notificacion(
-            id_usuario_destino=cita.id_usuario,
-            titulo=titulo,
-            mensaje=mensaje,
-            url=f"/mis-citas/{cita.id_cita}",
-            leida=False,
-            fecha_creacion=datetime.utcnow(),
-            id_cita=cita.id_cita,
-        )
-        db.add(notif)
-        db.commit()
-    except Exception:
-        db.rollback()
-
+    # Notificar al usuario que creó la cita (trabajo en segundo plano, con el mismo commit)
+    notificaciones.encolar_notificacion(
+        db,
+        [cita.id_usuario],
+        f"Cita confirmada: {servicio.tipo_servicio}",
+        f"Tu cita para {servicio.tipo_servicio} el {cita.fecha_cita} a las {cita.hora_cita} ha sido confirmada.",
+        f"/mis-citas/{cita.id_cita}",
+        cita.id_cita,
+    )
+    await db.commit()
+    await db.refresh(cita)
     return cita
 
 
 # Cancelar una cita (por el dueño del servicio)
 @router.post("/{cita_id}/cancel")
-def cancel_cita(cita_id: int, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    cita = db.query(Cita).filter(Cita.id_cita == cita_id).first()
+async def cancel_cita(cita_id: int, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
+    cita = await db.get(Cita, cita_id)
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
-    servicio = db.query(Servicio).filter(Servicio.id_servicio == cita.id_servicio).first()
+    servicio = await db.get(Servicio, cita.id_servicio)
     if not servicio:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
     # Solo el dueño del servicio puede cancelar
@@ -220,27 +250,17 @@ def cancel_cita(cita_id: int, db: Session = Depends(get_db), current_user: Usuar
         raise HTTPException(status_code=403, detail="No autorizado para cancelar esta cita")
 
     cita.estado_cita = "cancelada"
-    db.commit()
-    db.refresh(cita)
-
-    # Notificar al usuario que creó la cita
-    try:
-        titulo = f"Cita cancelada: {servicio.tipo_servicio}"
-        mensaje = f"Lamentamos informarte que la cita para {servicio.tipo_servicio} el {cita.fecha_cita} a las {cita.hora_cita} ha sido cancelada."
-        notif = Notificacion(
-            id_usuario_destino=cita.id_usuario,
-            titulo=titulo,
-            mensaje=mensaje,
-            url=f"/mis-citas/{cita.id_cita}",
-            leida=False,
-            fecha_creacion=datetime.utcnow(),
-            id_cita=cita.id_cita,
-        )
-        db.add(notif)
-        db.commit()
-    except Exception:
-        db.rollback()
-
+    # Notificar al usuario que creó la cita (trabajo en segundo plano, con el mismo commit)
+    notificaciones.encolar_notificacion(
+        db,
+        [cita.id_usuario],
+        f"Cita cancelada: {servicio.tipo_servicio}",
+        f"Lamentamos informarte que la cita para {servicio.tipo_servicio} el {cita.fecha_cita} a las {cita.hora_cita} ha sido cancelada.",
+        f"/mis-citas/{cita.id_cita}",
+        cita.id_cita,
+    )
+    await db.commit()
+    await db.refresh(cita)
     return cita
 
 
@@ -254,18 +274,20 @@ class ReportPayload(BaseModel):
 
 
 @router.get("/{cita_id}/messages")
-def get_messages(cita_id: int, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    cita = db.query(Cita).filter(Cita.id_cita == cita_id).first()
+async def get_messages(cita_id: int, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
+    cita = await db.get(Cita, cita_id)
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
     # Only users involved can see messages
-    servicio = db.query(Servicio).filter(Servicio.id_servicio == cita.id_servicio).first()
+    servicio = await db.get(Servicio, cita.id_servicio)
     if not servicio:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
     if current_user.id_usuario not in (cita.id_usuario, servicio.id_usuario):
         raise HTTPException(status_code=403, detail="No autorizado para ver los mensajes de esta cita")
 
-    msgs = db.query(Mensaje).filter(Mensaje.id_cita == cita_id).order_by(Mensaje.fecha_creacion.asc()).all()
+    msgs = (await db.execute(
+        select(Mensaje).where(Mensaje.id_cita == cita_id).order_by(Mensaje.fecha_creacion.asc())
+    )).scalars().all()
     out = []
     for m in msgs:
         out.append({
@@ -280,11 +302,11 @@ def get_messages(cita_id: int, db: Session = Depends(get_db), current_user: Usua
 
 
 @router.post("/{cita_id}/messages")
-def post_message(cita_id: int, payload: CitaMessage, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    cita = db.query(Cita).filter(Cita.id_cita == cita_id).first()
+async def post_message(cita_id: int, payload: CitaMessage, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
+    cita = await db.get(Cita, cita_id)
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
-    servicio = db.query(Servicio).filter(Servicio.id_servicio == cita.id_servicio).first()
+    servicio = await db.get(Servicio, cita.id_servicio)
     if not servicio:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
 
@@ -298,12 +320,14 @@ def post_message(cita_id: int, payload: CitaMessage, db: Session = Depends(get_d
 
     # If owner is sending, check bloqueo
     if current_user.id_usuario == servicio.id_usuario:
-        bloqueo = db.query(Bloqueo).filter(Bloqueo.id_emprendedor == servicio.id_usuario, Bloqueo.id_usuario == cita.id_usuario, Bloqueo.activo == True).first()
+        bloqueo = (await db.execute(select(Bloqueo).where(Bloqueo.id_emprendedor == servicio.id_usuario, Bloqueo.id_usuario == cita.id_usuario, Bloqueo.activo == True))).scalars().first()
         if bloqueo:
             raise HTTPException(status_code=403, detail="No puede enviar mensajes a este usuario (bloqueado)")
 
         # Only one message from the owner is allowed per cita
-        existing_owner_msg = db.query(Mensaje).filter(Mensaje.id_cita == cita.id_cita, Mensaje.id_emisor == servicio.id_usuario).first()
+        existing_owner_msg = (await db.execute(
+            select(Mensaje).where(Mensaje.id_cita == cita.id_cita, Mensaje.id_emisor == servicio.id_usuario)
+        )).scalars().first()
         if existing_owner_msg:
             raise HTTPException(status_code=409, detail="Ya has enviado un mensaje para esta cita")
 
@@ -317,40 +341,34 @@ def post_message(cita_id: int, payload: CitaMessage, db: Session = Depends(get_d
             fecha_creacion=datetime.utcnow(),
         )
         db.add(nuevo)
-        db.commit()
-        db.refresh(nuevo)
-
-        # Notificar al receptor
-        titulo = f"Mensaje sobre tu cita: {servicio.tipo_servicio}"
-        notif = Notificacion(
-            id_usuario_destino=receptor_id,
-            titulo=titulo,
-            mensaje=payload.mensaje,
-            url=f"/mis-citas/{cita.id_cita}",
-            leida=False,
-            fecha_creacion=datetime.utcnow(),
-            id_cita=cita.id_cita,
+        # Notificar al receptor (trabajo en segundo plano, con el mismo commit que el mensaje)
+        notificaciones.encolar_notificacion(
+            db,
+            [receptor_id],
+            f"Mensaje sobre tu cita: {servicio.tipo_servicio}",
+            payload.mensaje,
+            f"/mis-citas/{cita.id_cita}",
+            cita.id_cita,
         )
-        db.add(notif)
-        db.commit()
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"No se pudo enviar el mensaje: {str(e)}")
 
     return {"msg": "Mensaje enviado", "id_mensaje": nuevo.id_mensaje}
 
 
 @router.post("/{cita_id}/report")
-def report_user(cita_id: int, payload: ReportPayload, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
+async def report_user(cita_id: int, payload: ReportPayload, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
     """Permite a cualquier usuario autenticado enviar una denuncia relacionada con una cita.
     - Crea un registro en `denuncias`.
     - Si el reportador es el emprendedor (dueño del servicio), también crea un `bloqueo` para evitar mensajes futuros.
     - Notifica a los administradores para su revisión.
     """
-    cita = db.query(Cita).filter(Cita.id_cita == cita_id).first()
+    cita = await db.get(Cita, cita_id)
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
-    servicio = db.query(Servicio).filter(Servicio.id_servicio == cita.id_servicio).first()
+    servicio = await db.get(Servicio, cita.id_servicio)
     if not servicio:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
 
@@ -374,8 +392,8 @@ def report_user(cita_id: int, payload: ReportPayload, db: Session = Depends(get_
             resuelta=False,
         )
         db.add(denuncia)
-        db.commit()
-        db.refresh(denuncia)
+        # flush para obtener id_denuncia; todo se confirma en un único commit al final
+        await db.flush()
 
         # Si el reportador es el emprendedor (dueño del servicio), crear bloqueo contra el usuario objetivo
         if id_reportador == servicio.id_usuario:
@@ -387,55 +405,49 @@ def report_user(cita_id: int, payload: ReportPayload, db: Session = Depends(get_
                 activo=True,
             )
             db.add(bloqueo)
-            db.commit()
-
-        # Notificar a admins
-        admins = db.query(Usuario).filter(Usuario.id_rol == 1).all()
-        for a in admins:
-            notif = Notificacion(
-                id_usuario_destino=a.id_usuario,
-                titulo=f"Nueva denuncia relacionada a cita {cita.id_cita}",
-                mensaje=f"Usuario {id_reportador} reportó a {id_objetivo}: {payload.motivo}",
-                url=f"/admin/denuncias/{denuncia.id_denuncia}",
-                leida=False,
-                fecha_creacion=datetime.utcnow(),
-                id_cita=cita.id_cita,
-            )
-            db.add(notif)
-        db.commit()
+
+        # Notificar a admins (un solo INSERT para todos, en la misma transacción)
+        await db.run_sync(
+            notificaciones.notificar_admins,
+            f"Nueva denuncia relacionada a cita {cita.id_cita}",
+            f"Usuario {id_reportador} reportó a {id_objetivo}: {payload.motivo}",
+            f"/admin/denuncias/{denuncia.id_denuncia}",
+            cita.id_cita,
+        )
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"No se pudo procesar la denuncia: {str(e)}")
 
     return {"msg": "Denuncia creada y administradores notificados"}
 
 
 @router.get("/{cita_id}/blocked")
-def is_blocked(cita_id: int, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    cita = db.query(Cita).filter(Cita.id_cita == cita_id).first()
+async def is_blocked(cita_id: int, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
+    cita = await db.get(Cita, cita_id)
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
-    servicio = db.query(Servicio).filter(Servicio.id_servicio == cita.id_servicio).first()
+    servicio = await db.get(Servicio, cita.id_servicio)
     if not servicio:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
     # Only involved users can ask
     if current_user.id_usuario not in (cita.id_usuario, servicio.id_usuario):
         raise HTTPException(status_code=403, detail="No autorizado")
 
-    bloqueo = db.query(Bloqueo).filter(Bloqueo.id_emprendedor == servicio.id_usuario, Bloqueo.id_usuario == cita.id_usuario, Bloqueo.activo == True).first()
+    bloqueo = (await db.execute(select(Bloqueo).where(Bloqueo.id_emprendedor == servicio.id_usuario, Bloqueo.id_usuario == cita.id_usuario, Bloqueo.activo == True))).scalars().first()
     return {"blocked": bloqueo is not None}
 
 
 @router.post("/{cita_id}/message")
-def send_message_to_cliente(cita_id: int, payload: CitaMessage, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
+async def send_message_to_cliente(cita_id: int, payload: CitaMessage, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
     """Permite al dueño del servicio enviar un mensaje al usuario que reservó la cita.
     Crea una Notificacion para el cliente destino con el mensaje proporcionado.
     """
-    cita = db.query(Cita).filter(Cita.id_cita == cita_id).first()
+    cita = await db.get(Cita, cita_id)
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
 
-    servicio = db.query(Servicio).filter(Servicio.id_servicio == cita.id_servicio).first()
+    servicio = await db.get(Servicio, cita.id_servicio)
     if not servicio:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
 
@@ -457,9 +469,9 @@ def send_message_to_cliente(cita_id: int, payload: CitaMessage, db: Session = De
             id_cita=cita.id_cita,
         )
         db.add(notif)
-        db.commit()
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         # Propagar detalle de la excepción para diagnóstico en desarrollo
         raise HTTPException(status_code=500, detail=f"No se pudo enviar el mensaje: {str(e)}")
 
@@ -467,10 +479,10 @@ def send_message_to_cliente(cita_id: int, payload: CitaMessage, db: Session = De
 
 # Eliminar una cita
 @router.delete("/{cita_id}")
-def delete_cita(cita_id: int, db: Session = Depends(get_db)):
-    cita = db.query(Cita).filter(Cita.id_cita == cita_id).first()
+async def delete_cita(cita_id: int, db: AsyncSession = Depends(get_async_db)):
+    cita = await db.get(Cita, cita_id)
     if not cita:
         raise HTTPException(status_code=404, detail="Cita no encontrada")
-    db.delete(cita)
-    db.commit()
+    await db.delete(cita)
+    await db.commit()
     return {"detail": "Cita eliminada"}
@@ -0,0 +1,102 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+
+from auth import get_current_user_async
+from database import AsyncSessionLocal, get_async_engine
+from models import Cita, DetallePedido, Mascota, Pedido, Producto, Recibo, Servicio, Usuario
+from utils.pagination import paginate_keyset_async
+
+router = APIRouter(prefix="/cuenta", tags=["Cuenta"])
+
+SECCIONES = ("citas", "pedidos", "recibos")
+
+# tamaño de página por sección (la vista de cuenta muestra pocas filas de cada una)
+DEFAULT_SECTION_SIZE = 20
+MAX_SECTION_SIZE = 100
+
+
+def _columns(model):
+    return [getattr(model, c.key) for c in model.__table__.columns]
+
+
+async def _citas(id_usuario: int, cursor: Optional[str], limit: int):
+    # cita + nombre del servicio + nombre de la mascota en una sola consulta, más recientes primero
+    query = (
+        select(*_columns(Cita), Servicio.tipo_servicio, Servicio.precio_servicio, Mascota.nombre_mascota)
+        .join(Servicio, Cita.id_servicio == Servicio.id_servicio)
+        .outerjoin(Mascota, Cita.id_mascota == Mascota.id_mascota)
+        .where(Cita.id_usuario == id_usuario)
+    )
+    async with AsyncSessionLocal() as db:
+        rows, next_cursor = await paginate_keyset_async(
+            db, query, [Cita.fecha_cita, Cita.hora_cita, Cita.id_cita], cursor, limit, descending=True
+        )
+    return {"items": [dict(r._mapping) for r in rows], "next_cursor": next_cursor}
+
+
+async def _pedidos(id_usuario: int, cursor: Optional[str], limit: int):
+    async with AsyncSessionLocal() as db:
+        rows, next_cursor = await paginate_keyset_async(
+            db, select(*_columns(Pedido)).where(Pedido.id_usuario == id_usuario), [Pedido.id_pedido], cursor, limit, descending=True
+        )
+        pedidos = [dict(r._mapping, detalles=[], recibos=[]) for r in rows]
+        if pedidos:
+            # líneas de todos los pedidos de la página con nombre y precio del producto: una consulta
+            by_id = {p["id_pedido"]: p for p in pedidos}
+            detalles = await db.execute(
+                select(
+                    DetallePedido.id_detalle_pedido,
+                    DetallePedido.id_pedido,
+                    DetallePedido.id_producto,
+                    DetallePedido.cantidad,
+                    DetallePedido.subtotal,
+                    Producto.nombre_producto,
+                    Producto.precio_producto,
+                )
+                .outerjoin(Producto, DetallePedido.id_producto == Producto.id_producto)
+                .where(DetallePedido.id_pedido.in_(by_id))
+                .order_by(DetallePedido.id_detalle_pedido)
+            )
+            for d in detalles:
+                by_id[d.id_pedido]["detalles"].append(dict(d._mapping))
+            # recibos de estos pedidos (la sección "recibos" se pagina aparte y puede no coincidir)
+            recibos = await db.execute(select(*_columns(Recibo)).where(Recibo.id_pedido.in_(by_id)).order_by(Recibo.id_recibo))
+            for r in recibos:
+                by_id[r.id_pedido]["recibos"].append(dict(r._mapping))
+    return {"items": pedidos, "next_cursor": next_cursor}
+
+
+async def _recibos(id_usuario: int, cursor: Optional[str], limit: int):
+    query = select(*_columns(Recibo)).join(Pedido, Recibo.id_pedido == Pedido.id_pedido).where(Pedido.id_usuario == id_usuario)
+    async with AsyncSessionLocal() as db:
+        rows, next_cursor = await paginate_keyset_async(db, query, [Recibo.id_recibo], cursor, limit, descending=True)
+    return {"items": [dict(r._mapping) for r in rows], "next_cursor": next_cursor}
+
+
+_LOADERS = {"citas": _citas, "pedidos": _pedidos, "recibos": _recibos}
+
+
+# Resumen de "Mi Cuenta": citas (con servicio y mascota), pedidos (con sus líneas y recibos) y recibos del
+# usuario autenticado. Cada sección se pagina por separado (`<seccion>_cursor` = `next_cursor` de la
+# respuesta anterior) y se consulta en paralelo con su propia sesión.
+@router.get("/")
+async def get_cuenta(
+    secciones: Optional[str] = Query(None, description="Secciones a cargar separadas por coma (por defecto todas)"),
+    limit: int = Query(DEFAULT_SECTION_SIZE, ge=1, le=MAX_SECTION_SIZE),
+    citas_cursor: Optional[str] = None,
+    pedidos_cursor: Optional[str] = None,
+    recibos_cursor: Optional[str] = None,
+    current_user: Usuario = Depends(get_current_user_async),
+):
+    pedidas = [s.strip() for s in secciones.split(",") if s.strip()] if secciones else list(SECCIONES)
+    invalidas = [s for s in pedidas if s not in _LOADERS]
+    if invalidas:
+        raise HTTPException(status_code=400, detail=f"Secciones inválidas: {', '.join(invalidas)}")
+
+    cursors = {"citas": citas_cursor, "pedidos": pedidos_cursor, "recibos": recibos_cursor}
+    get_async_engine()
+    results = await asyncio.gather(*(_LOADERS[s](current_user.id_usuario, cursors[s], limit) for s in pedidas))
+    return dict(zip(pedidas, results))
@@ -1,21 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Denuncia, Usuario, Notificacion, Cita, Servicio, Mensaje
+from database import get_db
+from models import Denuncia, Usuario, Cita, Servicio, Mensaje
 from auth import get_current_user
-from datetime import datetime
+from services import notificaciones
 
 router = APIRouter(prefix="/denuncias", tags=["Denuncias"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.get("/")
 def list_denuncias(db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
     # Solo admins
@@ -60,34 +52,15 @@ def invalidate_denuncia(id_denuncia: int, payload: ActionPayload, db: Session =
 
     try:
         d.resuelta = True
-        db.commit()
-
         texto = payload.mensaje or "La denuncia ha sido revisada por un administrador y se ha determinado que no procede."
 
-        # Notificar al reportador
-        notif1 = Notificacion(
-            id_usuario_destino=d.id_reportador,
-            titulo="Denuncia invalidada",
-            mensaje=texto,
-            url=f"/mis-citas/{d.id_cita}" if d.id_cita else None,
-            leida=False,
-            fecha_creacion=datetime.utcnow(),
-            id_cita=d.id_cita,
+        # Notificar al reportador y al objetivo si existe (trabajos en segundo plano, mismo commit)
+        notificaciones.encolar_notificacion(
+            db, [d.id_reportador], "Denuncia invalidada", texto,
+            f"/mis-citas/{d.id_cita}" if d.id_cita else None, d.id_cita,
         )
-        db.add(notif1)
-
-        # Notificar al objetivo si existe
         if d.id_objetivo:
-            notif2 = Notificacion(
-                id_usuario_destino=d.id_objetivo,
-                titulo="Denuncia invalidada",
-                mensaje=texto,
-                url=None,
-                leida=False,
-                fecha_creacion=datetime.utcnow(),
-                id_cita=d.id_cita,
-            )
-            db.add(notif2)
+            notificaciones.encolar_notificacion(db, [d.id_objetivo], "Denuncia invalidada", texto, None, d.id_cita)
 
         db.commit()
     except Exception as e:
@@ -118,34 +91,13 @@ def inactivate_user(id_denuncia: int, payload: ActionPayload, db: Session = Depe
 
     try:
         objetivo.estado_usuario = 'Inactivo'
-        db.commit()
-
+        d.resuelta = True
         texto = payload.mensaje or "Su cuenta ha sido inactivada temporalmente por una revisión administrativa relacionada con una denuncia. Contacte al soporte para más información."
 
-        notif = Notificacion(
-            id_usuario_destino=objetivo.id_usuario,
-            titulo="Usuario inactivado",
-            mensaje=texto,
-            url=None,
-            leida=False,
-            fecha_creacion=datetime.utcnow(),
-            id_cita=d.id_cita,
+        # Notificar al usuario afectado y al reportador (trabajo en segundo plano, mismo commit)
+        notificaciones.encolar_notificacion(
+            db, [objetivo.id_usuario, d.id_reportador], "Usuario inactivado", texto, None, d.id_cita,
         )
-        db.add(notif)
-
-        # Notificar al reportador también
-        notif2 = Notificacion(
-            id_usuario_destino=d.id_reportador,
-            titulo="Usuario inactivado",
-            mensaje=texto,
-            url=None,
-            leida=False,
-            fecha_creacion=datetime.utcnow(),
-            id_cita=d.id_cita,
-        )
-        db.add(notif2)
-
-        d.resuelta = True
         db.commit()
     except Exception as e:
         db.rollback()
@@ -0,0 +1,84 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import get_current_user_async
+from config import dispatch_conf
+from database import get_async_db
+from models import Usuario
+from services import despacho
+from services.rutas import rutas
+from services.event_hub import ROL_DOMICILIARIO
+
+router = APIRouter(prefix="/despacho", tags=["Despacho"])
+
+
+def require_domiciliario(current_user: Usuario = Depends(get_current_user_async)):
+    if current_user.id_rol != ROL_DOMICILIARIO:
+        raise HTTPException(status_code=403, detail="Solo para domiciliarios")
+    return current_user
+
+
+# Reclamar los siguientes pedidos disponibles (opcionalmente de una ciudad, una región o un
+# domicilio); quedan reservados al domiciliario durante DISPATCH_LEASE_SECONDS
+@router.post("/reclamar")
+async def reclamar_pedidos(
+    cantidad: Optional[int] = Query(None, ge=1, le=dispatch_conf.DISPATCH_MAX_CLAIM, description="Por defecto 1; con id_domicilio, todos los del domicilio"),
+    id_ciudad: Optional[int] = None,
+    id_region: Optional[int] = None,
+    id_domicilio: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Usuario = Depends(require_domiciliario),
+):
+    if cantidad is None:
+        cantidad = dispatch_conf.DISPATCH_MAX_CLAIM if id_domicilio else 1
+    ids_domicilio = [id_domicilio] if id_domicilio else None
+    return await despacho.reclamar(db, current_user.id_usuario, cantidad, id_ciudad, id_region, ids_domicilio)
+
+
+# Pedidos reclamados o en ruta del domiciliario
+@router.get("/mios")
+async def mis_pedidos(db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(require_domiciliario)):
+    return await despacho.asignados(db, current_user.id_usuario)
+
+
+# Rutas de entrega: domicilios con pedidos disponibles agrupados por ciudad y prefijo postal
+@router.get("/rutas")
+async def listar_rutas(
+    id_ciudad: Optional[int] = None,
+    id_region: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Usuario = Depends(require_domiciliario),
+):
+    # las reservas vencidas vuelven a las rutas aunque nadie esté reclamando
+    await despacho.barrer(db)
+    return await rutas.listar(db, id_ciudad, id_region)
+
+
+# Reclamar de una vez los pedidos disponibles de una ruta
+@router.post("/rutas/{id_ruta}/reclamar")
+async def reclamar_ruta(id_ruta: str, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(require_domiciliario)):
+    ruta = await rutas.obtener(db, id_ruta)
+    if ruta is None:
+        raise HTTPException(status_code=404, detail="Ruta no encontrada")
+    pedidos = await despacho.reclamar(
+        db, current_user.id_usuario, dispatch_conf.DISPATCH_MAX_CLAIM,
+        ids_domicilio=[p["id_domicilio"] for p in ruta["paradas"]],
+    )
+    return {**ruta, "pedidos": pedidos}
+
+
+@router.post("/{id_pedido}/recoger")
+async def recoger_pedido(id_pedido: int, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(require_domiciliario)):
+    return await despacho.recoger(db, id_pedido, current_user.id_usuario)
+
+
+@router.post("/{id_pedido}/entregar")
+async def entregar_pedido(id_pedido: int, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(require_domiciliario)):
+    return await despacho.entregar(db, id_pedido, current_user.id_usuario)
+
+
+@router.post("/{id_pedido}/liberar")
+async def liberar_pedido(id_pedido: int, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(require_domiciliario)):
+    return await despacho.liberar(db, id_pedido, current_user.id_usuario)
@@ -1,20 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import get_db
 from models import DetallePedido
 from schemas import DetallePedidoCreate, DetallePedidoUpdate
 from sqlalchemy.exc import SQLAlchemyError
 from decimal import Decimal
+from utils.listing import ListParams, ListSpec, list_page
 
 router = APIRouter(prefix="/detalle_pedido", tags=["DetallePedido"])
 
-# Dependencia DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Listado paginado: filtros, orden y campos permitidos (ver utils/listing.py)
+DETALLES = ListSpec(
+    DetallePedido,
+    filters=("id_pedido", "id_producto"),
+    sortable=("subtotal",),
+)
 
 # Crear detalle de pedido
 @router.post("/")
@@ -36,8 +36,8 @@ def create_detalle(request: DetallePedidoCreate, db: Session = Depends(get_db)):
 
 # Listar todos los detalles
 @router.get("/")
-def get_detalles(db: Session = Depends(get_db)):
-    return db.query(DetallePedido).all()
+def get_detalles(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return list_page(db, DETALLES, params, response)
 
 # Obtener detalle por ID
 @router.get("/{detalle_id}")
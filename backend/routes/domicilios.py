@@ -1,18 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from typing import Optional
+from database import get_db
 from models import Domicilio, Pedido, DetallePedido, Producto
 from schemas import DomicilioCreate, DomicilioUpdate
+from services import despacho
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate_keyset, set_next_cursor
 
 router = APIRouter(prefix="/domicilios", tags=["Domicilios"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # Crear domicilio
 @router.post("/")
 def create_domicilio(domicilio: DomicilioCreate, db: Session = Depends(get_db)):
@@ -22,93 +18,127 @@ def create_domicilio(domicilio: DomicilioCreate, db: Session = Depends(get_db)):
     db.refresh(nuevo_domicilio)
     return nuevo_domicilio
 
-# Listar todos los domicilios
-@router.get("/")
-def get_domicilios(db: Session = Depends(get_db)):
-    domicilios = db.query(Domicilio).all()
-    result = []
-    for d in domicilios:
-        # obtener pedidos asociados a este domicilio
-        pedidos = db.query(Pedido).filter(Pedido.id_domicilio == d.id_domicilio).all()
-        pedidos_serialized = []
-        for p in pedidos:
-            detalles = db.query(DetallePedido).filter(DetallePedido.id_pedido == p.id_pedido).all()
-            productos = []
-            for det in detalles:
-                prod = db.query(Producto).filter(Producto.id_producto == det.id_producto).first()
-                productos.append({
-                    "id_producto": det.id_producto,
-                    "nombre_producto": getattr(prod, 'nombre_producto', None),
-                    "cantidad": det.cantidad,
-                    "subtotal": float(det.subtotal) if det.subtotal is not None else None,
-                })
-            pedidos_serialized.append({
-                "id_pedido": p.id_pedido,
-                "estado_pedido": getattr(p, 'estado_pedido', None),
-                "total": float(p.total) if p.total is not None else None,
-                "productos": productos,
-            })
-
-        result.append({
-            "id_domicilio": d.id_domicilio,
-            "direccion_completa": d.direccion_completa,
-            "codigo_postal": d.codigo_postal,
-            "id_region": d.id_region,
-            "id_ciudad": d.id_ciudad,
-            "id_usuario": d.id_usuario,
-            "estado_domicilio": getattr(d, 'estado_domicilio', None),
-            "estado_domicilio": getattr(d, 'estado_domicilio', None),
-            "pedidos": pedidos_serialized,
-        })
+def _load_pedidos_por_domicilio(db: Session, ids_domicilio):
+    """Carga pedidos -> detalle_pedido -> productos de varios domicilios con un número fijo de consultas.
 
-    return result
+    Una consulta IN para los pedidos y otra para los detalles (unidos al nombre del producto),
+    sin importar cuántos domicilios, pedidos o items haya. Devuelve {id_domicilio: [pedido, ...]}.
+    """
+    por_domicilio = {id_dom: [] for id_dom in ids_domicilio}
+    if not ids_domicilio:
+        return por_domicilio
 
-# Obtener un domicilio por ID
-@router.get("/{id_domicilio}")
-def get_domicilio(id_domicilio: int, db: Session = Depends(get_db)):
-    domicilio = db.query(Domicilio).filter(Domicilio.id_domicilio == id_domicilio).first()
-    if not domicilio:
-        raise HTTPException(status_code=404, detail="Domicilio no encontrado")
-    # incluir pedidos y productos para este domicilio
-    pedidos = db.query(Pedido).filter(Pedido.id_domicilio == domicilio.id_domicilio).all()
-    pedidos_serialized = []
-    for p in pedidos:
-        detalles = db.query(DetallePedido).filter(DetallePedido.id_pedido == p.id_pedido).all()
-        productos = []
+    pedidos = (
+        db.query(
+            Pedido.id_pedido, Pedido.id_domicilio, Pedido.estado_pedido, Pedido.total,
+            Pedido.estado_despacho, Pedido.id_domiciliario,
+        )
+        .filter(Pedido.id_domicilio.in_(ids_domicilio))
+        .order_by(Pedido.id_pedido)
+        .all()
+    )
+    productos_por_pedido = {p.id_pedido: [] for p in pedidos}
+    if productos_por_pedido:
+        detalles = (
+            db.query(
+                DetallePedido.id_pedido,
+                DetallePedido.id_producto,
+                DetallePedido.cantidad,
+                DetallePedido.subtotal,
+                Producto.nombre_producto,
+            )
+            .outerjoin(Producto, DetallePedido.id_producto == Producto.id_producto)
+            .filter(DetallePedido.id_pedido.in_(list(productos_por_pedido)))
+            .order_by(DetallePedido.id_detalle_pedido)
+            .all()
+        )
         for det in detalles:
-            prod = db.query(Producto).filter(Producto.id_producto == det.id_producto).first()
-            productos.append({
+            productos_por_pedido[det.id_pedido].append({
                 "id_producto": det.id_producto,
-                "nombre_producto": getattr(prod, 'nombre_producto', None),
+                "nombre_producto": det.nombre_producto,
                 "cantidad": det.cantidad,
                 "subtotal": float(det.subtotal) if det.subtotal is not None else None,
             })
-        pedidos_serialized.append({
+
+    for p in pedidos:
+        por_domicilio[p.id_domicilio].append({
             "id_pedido": p.id_pedido,
-            "estado_pedido": getattr(p, 'estado_pedido', None),
+            "estado_pedido": p.estado_pedido,
             "total": float(p.total) if p.total is not None else None,
-            "productos": productos,
+            "estado_despacho": p.estado_despacho,
+            "id_domiciliario": p.id_domiciliario,
+            "productos": productos_por_pedido[p.id_pedido],
         })
+    return por_domicilio
 
+
+def _serialize_domicilio(d, pedidos):
     return {
-        "id_domicilio": domicilio.id_domicilio,
-        "direccion_completa": domicilio.direccion_completa,
-        "codigo_postal": domicilio.codigo_postal,
-        "id_region": domicilio.id_region,
-        "id_ciudad": domicilio.id_ciudad,
-        "id_usuario": domicilio.id_usuario,
-        "estado_domicilio": getattr(domicilio, 'estado_domicilio', None),
-        "pedidos": pedidos_serialized,
+        "id_domicilio": d.id_domicilio,
+        "direccion_completa": d.direccion_completa,
+        "codigo_postal": d.codigo_postal,
+        "id_region": d.id_region,
+        "id_ciudad": d.id_ciudad,
+        "id_usuario": d.id_usuario,
+        "estado_domicilio": getattr(d, 'estado_domicilio', None),
+        "pedidos": pedidos,
     }
 
 
+# Listar domicilios (filtros opcionales y paginación por cursor sobre id_domicilio;
+# el cursor de la siguiente página se devuelve en la cabecera X-Next-Cursor)
+@router.get("/")
+def get_domicilios(
+    response: Response,
+    estado_domicilio: Optional[str] = Query(None, description="Estado o varios separados por coma"),
+    id_ciudad: Optional[int] = None,
+    id_region: Optional[int] = None,
+    id_usuario: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    query = db.query(Domicilio)
+    if estado_domicilio:
+        estados = [e.strip() for e in estado_domicilio.split(",") if e.strip()]
+        query = query.filter(Domicilio.estado_domicilio.in_(estados))
+    if id_ciudad:
+        query = query.filter(Domicilio.id_ciudad == id_ciudad)
+    if id_region:
+        query = query.filter(Domicilio.id_region == id_region)
+    if id_usuario:
+        query = query.filter(Domicilio.id_usuario == id_usuario)
+
+    domicilios, next_cursor = paginate_keyset(query, [Domicilio.id_domicilio], cursor, limit)
+    set_next_cursor(response, next_cursor)
+
+    pedidos = _load_pedidos_por_domicilio(db, [d.id_domicilio for d in domicilios])
+    return [_serialize_domicilio(d, pedidos[d.id_domicilio]) for d in domicilios]
+
+# Obtener un domicilio por ID
+@router.get("/{id_domicilio}")
+def get_domicilio(id_domicilio: int, db: Session = Depends(get_db)):
+    domicilio = db.query(Domicilio).filter(Domicilio.id_domicilio == id_domicilio).first()
+    if not domicilio:
+        raise HTTPException(status_code=404, detail="Domicilio no encontrado")
+    # incluir pedidos y productos para este domicilio
+    pedidos = _load_pedidos_por_domicilio(db, [domicilio.id_domicilio])
+    return _serialize_domicilio(domicilio, pedidos[domicilio.id_domicilio])
+
+
 # Actualizar domicilio
 @router.put("/{id_domicilio}")
 def update_domicilio(id_domicilio: int, domicilio: DomicilioUpdate, db: Session = Depends(get_db)):
     db_domicilio = db.query(Domicilio).filter(Domicilio.id_domicilio == id_domicilio).first()
     if not db_domicilio:
         raise HTTPException(status_code=404, detail="Domicilio no encontrado")
-    for key, value in domicilio.dict(exclude_unset=True).items():
+    data = domicilio.dict(exclude_unset=True)
+    nuevo_estado = data.get("estado_domicilio")
+    if nuevo_estado and nuevo_estado != db_domicilio.estado_domicilio:
+        # el despacho de sus pedidos sigue al estado (o 409 si lo tiene un domiciliario)
+        pedidos = db.query(Pedido).filter(Pedido.id_domicilio == id_domicilio).with_for_update().all()
+        despacho.por_estado_domicilio(pedidos, nuevo_estado)
+    for key, value in data.items():
         if hasattr(db_domicilio, key):
             setattr(db_domicilio, key, value)
     db.commit()
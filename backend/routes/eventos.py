@@ -0,0 +1,88 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from auth import get_actor_from_token_async
+from config import events_conf
+from models import Proveedor
+from services.event_hub import Cursor, canal_proveedor, canal_rol, canal_usuario, format_sse, hub, replay
+
+router = APIRouter(prefix="/eventos", tags=["Eventos"])
+
+
+def _canales(actor) -> list:
+    if isinstance(actor, Proveedor):
+        return [canal_proveedor(actor.id_proveedor)]
+    return [canal_usuario(actor.id_usuario), canal_rol(actor.id_rol)]
+
+
+def _parse_last_id(value: Optional[str]) -> Optional[Cursor]:
+    if value is None or value == "":
+        return None
+    try:
+        return Cursor.desde_token(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID inválido")
+
+
+# Stream SSE del actor autenticado: notificaciones nuevas, cambios de estado de sus pedidos y, para
+# domiciliarios, domicilios nuevos o que cambian de estado. El token va en la query porque
+# EventSource no permite cabeceras. Al reconectar, el navegador envía Last-Event-ID y se reenvían
+# los eventos perdidos; si son demasiados llega un evento `reset` y el cliente debe recargar.
+@router.get("/stream")
+async def stream_eventos(
+    request: Request,
+    token: str = Query(..., description="JWT del usuario o proveedor"),
+    last_event_id: Optional[str] = Query(None, description="Alternativa a la cabecera Last-Event-ID"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    actor = await get_actor_from_token_async(token)
+    canales = _canales(actor)
+    desde = _parse_last_id(last_event_id_header or last_event_id)
+
+    sub = await hub.subscribe(canales)
+    # con la suscripción ya activa se leen los eventos perdidos; los repetidos se descartan por id
+    try:
+        perdidos = await replay(canales, desde) if desde is not None else []
+    except Exception:
+        hub.unsubscribe(sub)
+        raise
+
+    async def generate():
+        try:
+            # lo que el cliente ya tiene: su Last-Event-ID más lo que estaba en la tabla al suscribirse
+            posicion = sub.inicio
+            enviados = set()
+            if perdidos is None:
+                yield "event: reset\ndata: {}\n\n"
+            else:
+                # sin `id:` hasta terminar: si se corta a mitad, se reanuda desde el Last-Event-ID anterior
+                for row in perdidos:
+                    enviados.add(row.id_evento)
+                    yield format_sse(None, row.tipo, row.datos)
+                if desde is not None:
+                    posicion = desde.unir(posicion)
+            if desde is not None:
+                yield f"id: {posicion.token()}\n\n"
+            while True:
+                try:
+                    row, cursor = await asyncio.wait_for(sub.queue.get(), timeout=events_conf.EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if sub.closed or await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                repetido = row.id_evento in enviados or posicion.conoce(row.id_evento)
+                posicion = posicion.unir(cursor)
+                if not repetido:
+                    yield format_sse(posicion.token(), row.tipo, row.datos)
+                if sub.closed and sub.queue.empty():
+                    break
+        finally:
+            hub.unsubscribe(sub)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=headers)
+
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends
+from database import pool_status
+from models import Usuario
+from utils.security import hash_metrics
+from services.event_hub import hub
+from services import referencias, trabajos
+from services.email_queue import mailer
+from auth import require_admin, require_admin_async
+
+router = APIRouter(prefix="/internal", tags=["Internal"])
+
+
+# Estadísticas en vivo del pool de conexiones (en uso, overflow, tiempo de espera)
+@router.get("/db/pool")
+def get_pool_status(current_user: Usuario = Depends(require_admin)):
+    return pool_status()
+
+
+# Executor de hashing de contraseñas: tiempo en cola, duración media y rechazos (503)
+@router.get("/hashing")
+def get_hashing_status(current_user: Usuario = Depends(require_admin)):
+    return hash_metrics.as_dict()
+
+
+# Conexiones SSE abiertas en este worker (GET /eventos/stream)
+@router.get("/eventos")
+def get_eventos_status(current_user: Usuario = Depends(require_admin)):
+    return {"conexiones": hub.connections}
+
+
+# Cola de correo de este worker: pendientes, enviados, reintentos y fallos
+@router.get("/email")
+def get_email_status(current_user: Usuario = Depends(require_admin)):
+    return mailer.as_dict()
+
+
+# Cola de trabajos en segundo plano (compartida por todos los workers): profundidad por tipo
+# y estado, retraso del trabajo listo más antiguo y latencia de encolado a completado
+@router.get("/trabajos")
+async def get_trabajos_status(current_user: Usuario = Depends(require_admin_async)):
+    return await trabajos.metricas()
+
+
+# Recarga regiones, ciudades y roles en la caché de este worker (tras editarlos en la base)
+@router.post("/referencias/recargar")
+def recargar_referencias(current_user: Usuario = Depends(require_admin)):
+    ref = referencias.recargar()
+    return {"regiones": len(ref.regiones), "ciudades": len(ref.ciudades), "roles": len(ref.roles), "etag": ref.etag}
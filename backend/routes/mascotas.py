@@ -1,24 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import get_db
 from models import Mascota, Usuario
 from schemas import MascotaCreate
 from auth import get_current_user
+from utils.listing import ListParams, ListSpec, list_page
 
 router = APIRouter(prefix="/mascotas", tags=["Mascotas"])
 
-# Dependencia para DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Listado paginado: filtros, orden y campos permitidos (ver utils/listing.py)
+MASCOTAS = ListSpec(
+    Mascota,
+    filters=("id_usuario", "especie_mascota"),
+    sortable=("nombre_mascota", "edad_mascota"),
+)
 
 # Listar todas las mascotas
 @router.get("/")
-def listar_mascotas(db: Session = Depends(get_db)):
-    return db.query(Mascota).all()
+def listar_mascotas(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return list_page(db, MASCOTAS, params, response)
 
 # Crear mascota
 @router.post("/")
@@ -2,21 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
-from database import SessionLocal
+from database import get_db
 from models import MetodoPago, Usuario
 from schemas import MetodoPagoCreate, MetodoPagoUpdate
 from auth import get_current_user  # Dependencia que obtiene usuario logueado desde JWT
 
 router = APIRouter(prefix="/metodo_pago", tags=["MetodoPago"])
 
-# Dependencia DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # -----------------------
 # Crear método de pago
 # -----------------------
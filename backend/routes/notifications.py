@@ -1,40 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from models import Notificacion, Usuario
-from auth import get_current_user
+from schemas import NotificacionesLeer
+from services import notificaciones
+from auth import get_current_user_async
+from utils.pagination import paginate_keyset_async, set_next_cursor
 
 router = APIRouter(prefix="/notificaciones", tags=["Notificaciones"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# La campana muestra pocas a la vez; el resto se pide con el cursor
+DEFAULT_INBOX_SIZE = 20
+MAX_INBOX_SIZE = 100
+
+# destinatarios de envío masivo -> rol
+SEGMENTOS = {
+    "domiciliarios": notificaciones.ROL_DOMICILIARIO,
+    "emprendedores": notificaciones.ROL_EMPRENDEDOR,
+    "clientes": notificaciones.ROL_CLIENTE,
+}
 
 
+def _no_leida():
+    # filas antiguas pueden tener leida = NULL
+    return or_(Notificacion.leida == False, Notificacion.leida.is_(None))  # noqa: E712
+
+
+# Bandeja del usuario, más recientes primero (por id: fecha_creacion puede ser NULL).
+# El cursor de la siguiente página va en la cabecera X-Next-Cursor.
 @router.get("/")
-def get_notificaciones(db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    notifs = db.query(Notificacion).filter(Notificacion.id_usuario_destino == current_user.id_usuario).order_by(Notificacion.fecha_creacion.desc()).all()
-    return notifs
+async def get_notificaciones(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_INBOX_SIZE, ge=1, le=MAX_INBOX_SIZE),
+    leida: Optional[bool] = Query(None, description="Filtrar por leídas (true) o no leídas (false)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Usuario = Depends(get_current_user_async),
+):
+    stmt = select(Notificacion).where(Notificacion.id_usuario_destino == current_user.id_usuario)
+    if leida is True:
+        stmt = stmt.where(Notificacion.leida == True)  # noqa: E712
+    elif leida is False:
+        stmt = stmt.where(_no_leida())
+    rows, next_cursor = await paginate_keyset_async(
+        db, stmt, [Notificacion.id_notificacion], cursor, limit, descending=True, scalars=True
+    )
+    set_next_cursor(response, next_cursor)
+    return rows
+
+
+# Número de notificaciones sin leer (para el contador de la campana)
+@router.get("/no-leidas")
+async def contar_no_leidas(db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
+    total = await db.scalar(
+        select(func.count()).select_from(Notificacion).where(Notificacion.id_usuario_destino == current_user.id_usuario, _no_leida())
+    )
+    return {"no_leidas": total}
+
+
+# Marcar como leídas varias notificaciones (`ids`) o todas (`todas: true`) con un solo UPDATE
+@router.put("/leer")
+async def marcar_leidas(payload: NotificacionesLeer, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
+    if not payload.todas and not payload.ids:
+        raise HTTPException(status_code=400, detail="Indica ids o todas")
+    stmt = (
+        update(Notificacion)
+        .where(Notificacion.id_usuario_destino == current_user.id_usuario, _no_leida())
+        .values(leida=True)
+        .execution_options(synchronize_session=False)
+    )
+    if not payload.todas:
+        # solo las del usuario: ids ajenos se ignoran
+        stmt = stmt.where(Notificacion.id_notificacion.in_(payload.ids))
+    result = await db.execute(stmt)
+    await db.commit()
+    return {"actualizadas": result.rowcount}
 
 
 @router.put("/{not_id}/leer")
-def marcar_leida(not_id: int, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    notif = db.query(Notificacion).filter(Notificacion.id_notificacion == not_id).first()
+async def marcar_leida(not_id: int, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
+    notif = await db.get(Notificacion, not_id)
     if not notif:
         raise HTTPException(status_code=404, detail="Notificación no encontrada")
     if notif.id_usuario_destino != current_user.id_usuario:
         raise HTTPException(status_code=403, detail="No autorizado")
     notif.leida = True
-    db.commit()
-    db.refresh(notif)
+    await db.commit()
+    await db.refresh(notif)
     return notif
 
 
 @router.post("/")
-def create_notificacion(payload: dict, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
+async def create_notificacion(payload: dict, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
     """Crear una notificación desde el frontend.
 
     Payload esperado (ejemplos):
@@ -42,40 +102,49 @@ def create_notificacion(payload: dict, db: Session = Depends(get_db), current_us
       "tipo": "cancelacion_domicilio",
       "mensaje": "...",
       "domicilio_id": 12,
-      "destinatario": "admin"   # o un id de usuario (int)
+      "destinatario": "admin"   # o un id de usuario (int), o un segmento (solo admins):
+                                # "domiciliarios" | "emprendedores" | "clientes", con
+                                # "id_region" / "id_ciudad" opcionales
     }
     """
     tipo = payload.get("tipo") or "notificacion"
     mensaje = payload.get("mensaje") or ""
     destinatario = payload.get("destinatario")
 
-    created = []
-
-    # Enviar a todos los admins si el frontend pide 'admin'
+    # Enviar a todos los admins si el frontend pide 'admin' (un solo INSERT para todos)
     if destinatario == "admin":
-        admins = db.query(Usuario).filter(Usuario.id_rol == 1).all()
-        if not admins:
+        enviadas = await db.run_sync(notificaciones.notificar_admins, tipo, mensaje)
+        if not enviadas:
             raise HTTPException(status_code=404, detail="No se encontraron administradores")
-        for a in admins:
-            n = Notificacion(id_usuario_destino=a.id_usuario, titulo=tipo, mensaje=mensaje)
-            db.add(n)
-            db.commit()
-            db.refresh(n)
-            created.append(n)
-        return created
+        await db.commit()
+        return {"enviadas": enviadas}
+
+    # Envío a un segmento de usuarios (INSERT ... SELECT, sin cargar los usuarios)
+    if destinatario in SEGMENTOS:
+        if current_user.id_rol != notificaciones.ROL_ADMIN:
+            raise HTTPException(status_code=403, detail="Solo los administradores pueden enviar a un segmento")
+        try:
+            id_region = int(payload["id_region"]) if payload.get("id_region") is not None else None
+            id_ciudad = int(payload["id_ciudad"]) if payload.get("id_ciudad") is not None else None
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="id_region / id_ciudad inválidos")
+        destinatarios = notificaciones.segmento(SEGMENTOS[destinatario], id_region, id_ciudad)
+        enviadas = await db.run_sync(notificaciones.notificar_segmento, destinatarios, tipo, mensaje)
+        await db.commit()
+        return {"enviadas": enviadas}
 
     # Si destinatario es un id numérico, crear para ese usuario
     try:
         if destinatario is None:
             raise ValueError("destinatario ausente")
         target_id = int(destinatario)
-        user = db.query(Usuario).filter(Usuario.id_usuario == target_id).first()
+        user = await db.get(Usuario, target_id)
         if not user:
             raise HTTPException(status_code=404, detail="Usuario destinatario no encontrado")
         n = Notificacion(id_usuario_destino=target_id, titulo=tipo, mensaje=mensaje)
         db.add(n)
-        db.commit()
-        db.refresh(n)
+        await db.commit()
+        await db.refresh(n)
         return n
     except ValueError:
         raise HTTPException(status_code=400, detail="destinatario inválido")
@@ -1,28 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from models import Pedido, DetallePedido, Recibo, Usuario, MetodoPago
 from schemas import PedidoCreate, PedidoUpdate
 from sqlalchemy.exc import SQLAlchemyError
 from decimal import Decimal
-from auth import get_current_user
+from auth import get_current_user_async
+from services import despacho
 
 router = APIRouter(prefix="/pedidos", tags=["Pedidos"])
 
-# Dependencia DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # Crear pedido
 @router.post("/")
-def create_pedido(request: PedidoCreate, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
+async def create_pedido(request: PedidoCreate, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
     try:
         # validar que el método de pago pertenece al usuario
-        metodo = db.query(MetodoPago).filter(MetodoPago.id_metodo_pago == request.id_metodo_pago).first()
+        metodo = await db.get(MetodoPago, request.id_metodo_pago)
         if not metodo:
             raise HTTPException(status_code=404, detail="Método de pago no encontrado")
         if metodo.id_usuario != current_user.id_usuario and getattr(current_user, "id_rol", None) != 1:
@@ -35,39 +29,43 @@ def create_pedido(request: PedidoCreate, db: Session = Depends(get_db), current_
             id_usuario=current_user.id_usuario
         )
         db.add(pedido)
-        db.commit()
-        db.refresh(pedido)
+        await db.commit()
+        await db.refresh(pedido)
         return pedido
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 # Listar pedidos
 @router.get("/")
-def get_pedidos(db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
+async def get_pedidos(db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
     # Si es admin (id_rol == 1) devolver todos, si no devolver solo los del usuario
     user_role = getattr(current_user, "id_rol", None)
-    if user_role == 1:
-        # administrador: ver todos los pedidos
-        return db.query(Pedido).all()
+    query = select(Pedido)
     if user_role == 3:
-        # domiciliario: ver pedidos disponibles (pendiente o en-proceso)
-        return db.query(Pedido).filter(Pedido.estado_pedido.in_(["pendiente", "en-proceso"])) .all()
-    # cliente u otros: ver solo sus pedidos
-    return db.query(Pedido).filter(Pedido.id_usuario == current_user.id_usuario).all()
+        # domiciliario: solo los pedidos que reclamó o lleva en ruta (índice por id_domiciliario);
+        # los disponibles se toman con POST /despacho/reclamar
+        query = query.where(
+            Pedido.id_domiciliario == current_user.id_usuario,
+            Pedido.estado_despacho.in_(["reclamado", "en-ruta"]),
+        )
+    elif user_role != 1:
+        # cliente u otros: ver solo sus pedidos (el administrador ve todos)
+        query = query.where(Pedido.id_usuario == current_user.id_usuario)
+    return (await db.execute(query)).scalars().all()
 
 # Obtener por ID
 @router.get("/{pedido_id}")
-def get_pedido(pedido_id: int, db: Session = Depends(get_db)):
-    pedido = db.query(Pedido).filter(Pedido.id_pedido == pedido_id).first()
+async def get_pedido(pedido_id: int, db: AsyncSession = Depends(get_async_db)):
+    pedido = await db.get(Pedido, pedido_id)
     if not pedido:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
     return pedido
 
 # Actualizar pedido
 @router.put("/{pedido_id}")
-def update_pedido(pedido_id: int, request: PedidoUpdate, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    pedido = db.query(Pedido).filter(Pedido.id_pedido == pedido_id).first()
+async def update_pedido(pedido_id: int, request: PedidoUpdate, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
+    pedido = await db.get(Pedido, pedido_id)
     if not pedido:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
@@ -81,18 +79,19 @@ def update_pedido(pedido_id: int, request: PedidoUpdate, db: Session = Depends(g
                 setattr(pedido, var, Decimal(value))
             else:
                 setattr(pedido, var, value)
+    despacho.por_estado_pedido(pedido)
     try:
-        db.commit()
-        db.refresh(pedido)
+        await db.commit()
+        await db.refresh(pedido)
         return pedido
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 # Eliminar pedido
 @router.delete("/{pedido_id}")
-def delete_pedido(pedido_id: int, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
-    pedido = db.query(Pedido).filter(Pedido.id_pedido == pedido_id).first()
+async def delete_pedido(pedido_id: int, db: AsyncSession = Depends(get_async_db), current_user: Usuario = Depends(get_current_user_async)):
+    pedido = await db.get(Pedido, pedido_id)
     if not pedido:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
@@ -102,11 +101,11 @@ def delete_pedido(pedido_id: int, db: Session = Depends(get_db), current_user: U
 
     try:
         # Eliminar primero los registros dependientes para evitar errores de integridad referencial
-        db.query(DetallePedido).filter(DetallePedido.id_pedido == pedido_id).delete()
-        db.query(Recibo).filter(Recibo.id_pedido == pedido_id).delete()
-        db.delete(pedido)
-        db.commit()
+        await db.execute(delete(DetallePedido).where(DetallePedido.id_pedido == pedido_id))
+        await db.execute(delete(Recibo).where(Recibo.id_pedido == pedido_id))
+        await db.delete(pedido)
+        await db.commit()
         return {"detail": "Pedido eliminado"}
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,29 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from models import Producto, Proveedor, Usuario
 from schemas import ProductoCreate, ProductoUpdate
-from auth import get_current_actor
+from auth import get_current_actor_async
+from services import catalogo
+from utils.listing import ListParams, ListSpec, list_page_async
 
 router = APIRouter(prefix="/productos", tags=["Productos"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Listado paginado: filtros, orden y campos permitidos (ver utils/listing.py)
+PRODUCTOS = ListSpec(
+    Producto,
+    filters=("id_proveedor", "categoria_producto", "estado_producto"),
+    sortable=("nombre_producto", "precio_producto", "categoria_producto"),
+)
 
-
-# Listar todos los productos
+# Listar todos los productos (respuesta en caché con ETag, ver services/catalogo.py)
 @router.get("/")
-def get_productos(db: Session = Depends(get_db)):
-    return db.query(Producto).all()
+async def get_productos(request: Request, response: Response, params: ListParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+    return await catalogo.cached_async(
+        request, catalogo.PRODUCTOS, catalogo.list_key(PRODUCTOS, params),
+        lambda: list_page_async(db, PRODUCTOS, params, response), response,
+    )
 
 
 # Crear producto (requiere actor: proveedor o admin usuario)
 @router.post("/")
-def create_producto(producto: ProductoCreate, actor=Depends(get_current_actor), db: Session = Depends(get_db)):
+async def create_producto(producto: ProductoCreate, actor=Depends(get_current_actor_async), db: AsyncSession = Depends(get_async_db)):
     data = producto.dict()
     # Si el actor es proveedor, forzamos id_proveedor
     if isinstance(actor, Proveedor):
@@ -35,24 +39,27 @@ def create_producto(producto: ProductoCreate, actor=Depends(get_current_actor),
 
     nuevo_producto = Producto(**data)
     db.add(nuevo_producto)
-    db.commit()
-    db.refresh(nuevo_producto)
+    await db.commit()
+    await db.refresh(nuevo_producto)
     return nuevo_producto
 
 
-# Consultar producto por id
+# Consultar producto por id (en caché con ETag)
 @router.get("/{producto_id}")
-def get_producto(producto_id: int, db: Session = Depends(get_db)):
-    producto = db.query(Producto).filter(Producto.id_producto == producto_id).first()
-    if not producto:
-        raise HTTPException(status_code=404, detail="Producto no encontrado")
-    return producto
+async def get_producto(producto_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def cargar():
+        producto = await db.get(Producto, producto_id)
+        if not producto:
+            raise HTTPException(status_code=404, detail="Producto no encontrado")
+        return producto
+
+    return await catalogo.cached_async(request, catalogo.PRODUCTOS, producto_id, cargar)
 
 
 # Actualizar producto (proveedor solo puede actualizar su producto)
 @router.put("/{producto_id}")
-def update_producto(producto_id: int, data: ProductoUpdate, actor=Depends(get_current_actor), db: Session = Depends(get_db)):
-    producto = db.query(Producto).filter(Producto.id_producto == producto_id).first()
+async def update_producto(producto_id: int, data: ProductoUpdate, actor=Depends(get_current_actor_async), db: AsyncSession = Depends(get_async_db)):
+    producto = await db.get(Producto, producto_id)
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
 
@@ -67,15 +74,15 @@ def update_producto(producto_id: int, data: ProductoUpdate, actor=Depends(get_cu
     for key, value in data.dict(exclude_unset=True).items():
         setattr(producto, key, value)
 
-    db.commit()
-    db.refresh(producto)
+    await db.commit()
+    await db.refresh(producto)
     return producto
 
 
 # Eliminar producto
 @router.delete("/{producto_id}")
-def delete_producto(producto_id: int, actor=Depends(get_current_actor), db: Session = Depends(get_db)):
-    producto = db.query(Producto).filter(Producto.id_producto == producto_id).first()
+async def delete_producto(producto_id: int, actor=Depends(get_current_actor_async), db: AsyncSession = Depends(get_async_db)):
+    producto = await db.get(Producto, producto_id)
     if not producto:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
 
@@ -86,6 +93,6 @@ def delete_producto(producto_id: int, actor=Depends(get_current_actor), db: Sess
         if not (hasattr(actor, 'id_rol') and actor.id_rol == 1):
             raise HTTPException(status_code=403, detail="No autorizado para eliminar productos")
 
-    db.delete(producto)
-    db.commit()
+    await db.delete(producto)
+    await db.commit()
     return {"detail": "Producto eliminado"}
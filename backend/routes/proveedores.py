@@ -1,26 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import get_db
 from models import Proveedor
 from schemas import ProveedorCreate, ProveedorUpdate
-from utils.security import hash_password, verify_password, create_access_token
+from utils.security import hash_password, verify_password, verify_and_update_password, create_access_token
 from auth import get_current_actor
 from fastapi import Body
 from pydantic import BaseModel, EmailStr
+from utils.listing import ListParams, ListSpec, list_page
 
 router = APIRouter(prefix="/proveedores", tags=["Proveedores"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Listado paginado: filtros, orden y campos permitidos (ver utils/listing.py)
+PROVEEDORES = ListSpec(
+    Proveedor,
+    filters=("estado_proveedor",),
+    sortable=("nombre_compania", "correo_proveedor"),
+    exclude=("password_proveedor",),
+)
 
 # Listar todos los proveedores
 @router.get("/")
-def get_proveedores(db: Session = Depends(get_db)):
-    return db.query(Proveedor).all()
+def get_proveedores(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return list_page(db, PROVEEDORES, params, response)
 
 # Crear proveedor
 @router.post("/")
@@ -47,17 +49,19 @@ def login_proveedor(payload: ProveedorLogin = Body(...), db: Session = Depends(g
     proveedor = db.query(Proveedor).filter(Proveedor.correo_proveedor == payload.correo_proveedor).first()
     if not proveedor or not proveedor.password_proveedor:
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
-    if not verify_password(payload.password_proveedor, proveedor.password_proveedor):
+    valid, new_hash = verify_and_update_password(payload.password_proveedor, proveedor.password_proveedor)
+    if not valid:
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
-    # Si la contraseña almacenada parece ser texto plano (no contiene '$'), re-hashearla por seguridad
-    try:
-        if '$' not in (proveedor.password_proveedor or ''):
-            proveedor.password_proveedor = hash_password(payload.password_proveedor)
+    # Re-hashear si la contraseña almacenada era texto plano o usa parámetros de argon2 antiguos
+    # (el hash nuevo ya viene calculado de la verificación: no se hashea dos veces)
+    if new_hash:
+        try:
+            proveedor.password_proveedor = new_hash
             db.commit()
             db.refresh(proveedor)
-    except Exception:
-        # No debe bloquear el login si el re-hash falla por alguna razón
-        pass
+        except Exception:
+            # No debe bloquear el login si el re-hash falla por alguna razón
+            db.rollback()
     # Normalizar y comprobar estado del proveedor (evitar falsos negativos por espacios o None)
     estado = (proveedor.estado_proveedor or '').strip().lower()
     if estado != 'activo':
@@ -1,20 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import get_db
 from models import Recibo, Pedido, Usuario
 from schemas import ReciboCreate, ReciboUpdate
 from sqlalchemy.exc import SQLAlchemyError
 from decimal import Decimal
 from auth import get_current_user
+from utils.listing import ListParams, ListSpec, list_page
 
 router = APIRouter(prefix="/recibos", tags=["Recibos"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Listado paginado: filtros, orden y campos permitidos (ver utils/listing.py)
+RECIBOS = ListSpec(
+    Recibo,
+    filters=("id_pedido", "estado_recibo"),
+    sortable=("monto_pagado",),
+)
 
 # Crear recibo
 @router.post("/")
@@ -48,8 +49,8 @@ def create_recibo(request: ReciboCreate, db: Session = Depends(get_db), current_
 
 # Listar todos los recibos
 @router.get("/")
-def get_recibos(db: Session = Depends(get_db)):
-    return db.query(Recibo).all()
+def get_recibos(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return list_page(db, RECIBOS, params, response)
 
 # Consultar recibo por ID
 @router.get("/{recibo_id}")
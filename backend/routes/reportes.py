@@ -0,0 +1,209 @@
+import asyncio
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import func, select
+
+from auth import require_admin_async
+from database import AsyncSessionLocal, get_async_engine
+from models import Ciudad, Pedido, Producto, Proveedor, Recibo, Region, RolUsuario, Servicio, Usuario
+from utils.cache import TTLCache, invalidate_on_commit
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate_keyset_async, set_next_cursor
+
+router = APIRouter(prefix="/reportes", tags=["Reportes"])
+
+# Resumen ya calculado. Se invalida al hacer commit de cambios en las tablas del reporte y el TTL
+# acota la desactualización cuando el cambio ocurre en otro worker.
+_resumen_cache = TTLCache(maxsize=1, ttl=float(os.getenv("REPORTES_CACHE_TTL", "30")))
+_RESUMEN_KEY = "resumen"
+
+# Modelos cuyos cambios afectan al resumen
+_REPORTED_MODELS = (Producto, Servicio, Usuario, Proveedor, Pedido, Recibo, RolUsuario, Region, Ciudad)
+
+# Se incrementa en cada invalidación: un resumen calculado antes de un commit no se guarda
+_generation = 0
+_compute_lock = asyncio.Lock()
+
+
+async def _rows(stmt):
+    # cada consulta con su propia sesión para poder lanzarlas en paralelo
+    async with AsyncSessionLocal() as db:
+        return [dict(r._mapping) for r in await db.execute(stmt)]
+
+
+def _count(model):
+    return select(func.count()).select_from(model)
+
+
+async def _conteos():
+    stmt = select(
+        _count(Producto).scalar_subquery().label("productos"),
+        _count(Servicio).scalar_subquery().label("servicios"),
+        _count(Usuario).scalar_subquery().label("usuarios"),
+        _count(Proveedor).scalar_subquery().label("proveedores"),
+        _count(Pedido).scalar_subquery().label("pedidos"),
+        _count(Recibo).scalar_subquery().label("recibos"),
+    )
+    return (await _rows(stmt))[0]
+
+
+async def _por_estado(column):
+    return await _rows(select(column.label("estado"), func.count().label("cantidad")).group_by(column).order_by(column))
+
+
+async def _usuarios_por(id_column, name_column, join_on):
+    stmt = (
+        select(id_column, name_column, func.count(Usuario.id_usuario).label("cantidad"))
+        .select_from(Usuario)
+        .join(name_column.class_, join_on)
+        .group_by(id_column, name_column)
+        .order_by(func.count(Usuario.id_usuario).desc())
+    )
+    return await _rows(stmt)
+
+
+async def _ingresos_pedidos():
+    stmt = (
+        select(
+            Pedido.estado_pedido.label("estado"),
+            func.count().label("cantidad"),
+            func.coalesce(func.sum(Pedido.total), 0).label("total"),
+        )
+        .group_by(Pedido.estado_pedido)
+        .order_by(Pedido.estado_pedido)
+    )
+    return await _rows(stmt)
+
+
+async def _ingresos_recibos():
+    stmt = (
+        select(
+            Recibo.estado_recibo.label("estado"),
+            func.count().label("cantidad"),
+            func.coalesce(func.sum(Recibo.monto_pagado), 0).label("total"),
+        )
+        .group_by(Recibo.estado_recibo)
+        .order_by(Recibo.estado_recibo)
+    )
+    return await _rows(stmt)
+
+
+async def _calcular_resumen() -> dict:
+    (
+        conteos,
+        productos_estado,
+        servicios_estado,
+        por_rol,
+        por_region,
+        por_ciudad,
+        pedidos_estado,
+        recibos_estado,
+    ) = await asyncio.gather(
+        _conteos(),
+        _por_estado(Producto.estado_producto),
+        _por_estado(Servicio.estado_servicio),
+        _usuarios_por(Usuario.id_rol, RolUsuario.nombre_rol, Usuario.id_rol == RolUsuario.id_rol),
+        _usuarios_por(Usuario.id_region, Region.nombre_region, Usuario.id_region == Region.id_region),
+        _usuarios_por(Usuario.id_ciudad, Ciudad.nombre_ciudad, Usuario.id_ciudad == Ciudad.id_ciudad),
+        _ingresos_pedidos(),
+        _ingresos_recibos(),
+    )
+    return {
+        "conteos": conteos,
+        "productos_por_estado": productos_estado,
+        "servicios_por_estado": servicios_estado,
+        "usuarios_por_rol": por_rol,
+        "usuarios_por_region": por_region,
+        "usuarios_por_ciudad": por_ciudad,
+        "ingresos": {
+            "pedidos_por_estado": pedidos_estado,
+            "recibos_por_estado": recibos_estado,
+            "total_pagado": sum((r["total"] for r in recibos_estado if r["estado"] == "pagado"), 0),
+        },
+    }
+
+
+async def get_resumen() -> dict:
+    resumen = _resumen_cache.get(_RESUMEN_KEY)
+    if resumen is not None:
+        return resumen
+    # un solo cálculo a la vez: los demás requests esperan y reutilizan el resultado
+    async with _compute_lock:
+        resumen = _resumen_cache.get(_RESUMEN_KEY)
+        if resumen is None:
+            generation = _generation
+            resumen = await _calcular_resumen()
+            if generation == _generation:
+                _resumen_cache.set(_RESUMEN_KEY, resumen)
+    return resumen
+
+
+def invalidate_reportes():
+    global _generation
+    _generation += 1
+    _resumen_cache.clear()
+
+
+# Resumen del panel de administración: totales, desglose por estado, usuarios por rol/región/ciudad e
+# ingresos de pedidos y recibos. Todo se calcula con GROUP BY en la base de datos.
+@router.get("/")
+async def get_reporte(current_user: Usuario = Depends(require_admin_async)):
+    get_async_engine()
+    return await get_resumen()
+
+
+# Detalle de productos con el nombre del proveedor (paginado, cursor en X-Next-Cursor)
+@router.get("/productos")
+async def get_reporte_productos(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: Usuario = Depends(require_admin_async),
+):
+    query = select(
+        Producto.id_producto,
+        Producto.nombre_producto,
+        Producto.categoria_producto,
+        Producto.precio_producto,
+        Producto.estado_producto,
+        Producto.id_proveedor,
+        Proveedor.nombre_compania,
+    ).outerjoin(Proveedor, Producto.id_proveedor == Proveedor.id_proveedor)
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        rows, next_cursor = await paginate_keyset_async(db, query, [Producto.id_producto], cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return [dict(r._mapping) for r in rows]
+
+
+# Detalle de servicios con los datos de contacto del emprendedor (paginado, cursor en X-Next-Cursor)
+@router.get("/servicios")
+async def get_reporte_servicios(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: Usuario = Depends(require_admin_async),
+):
+    query = select(
+        Servicio.id_servicio,
+        Servicio.tipo_servicio,
+        Servicio.descripcion_servicio,
+        Servicio.precio_servicio,
+        Servicio.estado_servicio,
+        Servicio.imagen_servicio,
+        Servicio.id_usuario,
+        Usuario.nombre_usuario,
+        Usuario.apellido_usuario,
+        Usuario.correo_usuario,
+        Usuario.telefono_usuario,
+    ).outerjoin(Usuario, Servicio.id_usuario == Usuario.id_usuario)
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        rows, next_cursor = await paginate_keyset_async(db, query, [Servicio.id_servicio], cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return [dict(r._mapping) for r in rows]
+
+
+# -------------------- Invalidación de la caché --------------------
+invalidate_on_commit(_REPORTED_MODELS, lambda modelos: invalidate_reportes())
@@ -1,22 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import get_db
 from models import Resultado
 from schemas import ResultadoCreate, ResultadoUpdate
+from utils.listing import ListParams, ListSpec, list_page
 
 router = APIRouter(prefix="/resultados", tags=["Resultados"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Listado paginado: filtros, orden y campos permitidos (ver utils/listing.py)
+RESULTADOS = ListSpec(
+    Resultado,
+    filters=("id_cita", "requiere_tratamiento"),
+)
 
 # Listar todos los resultados
 @router.get("/")
-def get_resultados(db: Session = Depends(get_db)):
-    return db.query(Resultado).all()
+def get_resultados(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return list_page(db, RESULTADOS, params, response)
 
 # Crear un resultado
 @router.post("/")
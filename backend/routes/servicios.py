@@ -1,25 +1,23 @@
 # routes/servicios.py
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response
 from sqlalchemy.orm import Session
 from models import Servicio, Usuario
 from auth import get_current_user
 from fastapi import Depends
-from database import SessionLocal
+from database import get_db
 from typing import Optional
-import os
-import shutil
-import time
+from config import media_conf
+from services import catalogo, upload_store
+from utils.listing import ListParams, ListSpec, list_page
 
 router = APIRouter(prefix="/servicios", tags=["Servicios"])
 
-# Dependencia para la sesión de DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
+# Listado paginado: filtros, orden y campos permitidos (ver utils/listing.py)
+SERVICIOS = ListSpec(
+    Servicio,
+    filters=("id_usuario", "tipo_servicio", "estado_servicio"),
+    sortable=("tipo_servicio", "precio_servicio"),
+)
 
 # Crear un servicio (acepta multipart/form-data con archivo opcional)
 @router.post("/")
@@ -32,28 +30,14 @@ def create_servicio(
     imagen_servicio: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db),
 ):
-    # Guardar el archivo si fue enviado
+    # Guardar el archivo si fue enviado (almacén por contenido: copia por bloques con límite de
+    # tamaño, deduplicado por hash; las variantes se generan en segundo plano)
     imagen_path = None
     if imagen_servicio is not None:
-        # Determinar directorio de uploads en backend/static/uploads
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        uploads_dir = os.path.join(base_dir, "static", "uploads")
-        os.makedirs(uploads_dir, exist_ok=True)
-        # Generar nombre único
-        timestamp = int(time.time())
-        safe_filename = f"{timestamp}_{imagen_servicio.filename}"
-        dest_path = os.path.join(uploads_dir, safe_filename)
         try:
-            with open(dest_path, "wb") as buffer:
-                shutil.copyfileobj(imagen_servicio.file, buffer)
+            imagen_path = upload_store.store_upload(imagen_servicio.file, media_conf.SERVICIO_IMAGE_SIZES)
         finally:
-            # Asegurar cerrar el archivo subido
-            try:
-                imagen_servicio.file.close()
-            except Exception:
-                pass
-        # Ruta relativa que se puede guardar en la BD
-        imagen_path = f"/static/uploads/{safe_filename}"
+            imagen_servicio.file.close()
 
     nuevo_servicio = Servicio(
         tipo_servicio=tipo_servicio,
@@ -68,11 +52,13 @@ def create_servicio(
     db.refresh(nuevo_servicio)
     return nuevo_servicio
 
-# Listar todos los servicios
+# Listar todos los servicios (respuesta en caché con ETag, ver services/catalogo.py)
 @router.get("/")
-def get_servicios(db: Session = Depends(get_db)):
-    servicios = db.query(Servicio).all()
-    return servicios
+def get_servicios(request: Request, response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return catalogo.cached(
+        request, catalogo.SERVICIOS, catalogo.list_key(SERVICIOS, params),
+        lambda: list_page(db, SERVICIOS, params, response), response,
+    )
 
 
 # Listar servicios del usuario autenticado (propios)
@@ -81,13 +67,16 @@ def get_my_servicios(db: Session = Depends(get_db), current_user: Usuario = Depe
     servicios = db.query(Servicio).filter(Servicio.id_usuario == current_user.id_usuario).all()
     return servicios
 
-# Obtener un servicio por ID
+# Obtener un servicio por ID (en caché con ETag)
 @router.get("/{servicio_id}")
-def get_servicio(servicio_id: int, db: Session = Depends(get_db)):
-    servicio = db.query(Servicio).filter(Servicio.id_servicio == servicio_id).first()
-    if not servicio:
-        raise HTTPException(status_code=404, detail="Servicio no encontrado")
-    return servicio
+def get_servicio(servicio_id: int, request: Request, db: Session = Depends(get_db)):
+    def cargar():
+        servicio = db.query(Servicio).filter(Servicio.id_servicio == servicio_id).first()
+        if not servicio:
+            raise HTTPException(status_code=404, detail="Servicio no encontrado")
+        return servicio
+
+    return catalogo.cached(request, catalogo.SERVICIOS, servicio_id, cargar)
 
 # Eliminar un servicio
 @router.delete("/{servicio_id}")
@@ -1,22 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import get_db
 from models import Tratamiento
 from schemas import TratamientoCreate, TratamientoUpdate
+from utils.listing import ListParams, ListSpec, list_page
 
 router = APIRouter(prefix="/tratamientos", tags=["Tratamientos"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Listado paginado: filtros, orden y campos permitidos (ver utils/listing.py)
+TRATAMIENTOS = ListSpec(
+    Tratamiento,
+    filters=("id_resultado", "estado_tratamiento"),
+    sortable=("tipo_tratamiento",),
+)
 
 # Listar todos los tratamientos
 @router.get("/")
-def get_tratamientos(db: Session = Depends(get_db)):
-    return db.query(Tratamiento).all()
+def get_tratamientos(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return list_page(db, TRATAMIENTOS, params, response)
 
 # Crear un tratamiento
 @router.post("/")
@@ -1,42 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Region, Ciudad
+from fastapi import APIRouter, HTTPException, Request
 
-router = APIRouter(prefix="/ubicaciones", tags=["Ubicaciones"])
+from services import referencias
+from utils.http_cache import cached_json
 
+router = APIRouter(prefix="/ubicaciones", tags=["Ubicaciones"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Regiones y ciudades salen de la caché de datos de referencia (services/referencias.py), sin
+# consultar la base. El ETag cambia al recargarla; con If-None-Match se responde 304.
+MAX_AGE = 300
 
 
 @router.get("/regiones")
-def get_regiones(db: Session = Depends(get_db)):
-    regiones = db.query(Region).all()
-    # serializar a lista de dicts para evitar problemas de serialización de ORM
-    return [{"id_region": r.id_region, "nombre_region": r.nombre_region} for r in regiones]
+async def get_regiones(request: Request):
+    ref = await referencias.get_async()
+    return cached_json(request, ref.regiones, ref.etag, MAX_AGE)
 
 
 @router.get("/ciudades")
-def get_ciudades(region_id: int | None = None, db: Session = Depends(get_db)):
-    if region_id:
-        ciudades = db.query(Ciudad).filter(Ciudad.id_region == region_id).all()
-    else:
-        ciudades = db.query(Ciudad).all()
-
-    return [
-        {"id_ciudad": c.id_ciudad, "nombre_ciudad": c.nombre_ciudad, "id_region": c.id_region}
-        for c in ciudades
-    ]
+async def get_ciudades(request: Request, region_id: int | None = None):
+    ref = await referencias.get_async()
+    ciudades = ref.ciudades_por_region.get(region_id, []) if region_id else ref.ciudades
+    return cached_json(request, ciudades, ref.etag, MAX_AGE)
 
 
 @router.get("/ciudades/{id_ciudad}")
-def get_ciudad(id_ciudad: int, db: Session = Depends(get_db)):
-    ciudad = db.query(Ciudad).filter(Ciudad.id_ciudad == id_ciudad).first()
+async def get_ciudad(request: Request, id_ciudad: int):
+    ref = await referencias.get_async()
+    ciudad = ref.ciudad_por_id.get(id_ciudad)
     if not ciudad:
         raise HTTPException(status_code=404, detail="Ciudad no encontrada")
-    return ciudad
+    return cached_json(request, ciudad, ref.etag, MAX_AGE)
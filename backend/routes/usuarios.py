@@ -1,30 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Usuario, Region, Ciudad
+from database import get_db, get_async_db, AsyncSessionLocal
+from models import Usuario
 import logging
 from pydantic import BaseModel, EmailStr, ConfigDict
-from utils.security import hash_password, verify_password, create_access_token
+from utils.security import hash_password, hash_password_async, verify_password, verify_and_update_password, create_access_token
 from sqlalchemy.exc import IntegrityError
 import base64
-from io import BytesIO
-from PIL import Image
-from pathlib import Path
-import uuid
 from services.verification_service import send_verification_email, verify_code
+from services import image_pipeline, referencias, upload_store
+from config import media_conf
 import os
+from utils.listing import ListParams, ListSpec, list_page
 
 router = APIRouter(prefix="/usuarios", tags=["Usuarios"])
 
-# -------------------- Dependencia DB --------------------
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
+# Listado paginado: filtros, orden y campos permitidos (ver utils/listing.py)
+USUARIOS = ListSpec(
+    Usuario,
+    filters=("id_rol", "estado_usuario", "id_region", "id_ciudad"),
+    sortable=("nombre_usuario", "apellido_usuario", "correo_usuario"),
+    exclude=("password_usuario",),
+)
 
 # -------------------- Esquemas --------------------
 class UsuarioCreate(BaseModel):
@@ -106,23 +107,22 @@ async def request_verification(data: VerificationRequest):
     try:
         await send_verification_email(data.correo_usuario)
         return {"message": "Código de verificación enviado"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/verify-and-register")
-async def verify_and_register(data: VerifyCodeRequest, db: Session = Depends(get_db)):
+async def verify_and_register(data: VerifyCodeRequest, db: AsyncSession = Depends(get_async_db)):
     """Verifica el código y registra al usuario"""
     try:
-        # Imprimir datos recibidos para debug
-        print("Datos recibidos:", data)
         # Verificar el código
-        if not verify_code(data.correo_usuario, data.code):
+        if not await verify_code(data.correo_usuario, data.code):
             raise HTTPException(status_code=400, detail="Código inválido")
+    except HTTPException:
+        raise
     except Exception as e:
-        # Mostrar error detallado
-        import traceback
-        print("Error detallado:", str(e))
-        print("Traceback completo:", traceback.format_exc())
+        logging.exception("Unexpected error verifying code")
         # Si es un error de validación de Pydantic, mostrar todos los errores
         if hasattr(e, 'errors'):
             return JSONResponse(
@@ -131,10 +131,12 @@ async def verify_and_register(data: VerifyCodeRequest, db: Session = Depends(get
             )
         raise HTTPException(status_code=400, detail=str(e))
     
+    imagen = await run_in_threadpool(_imagen_para_guardar, data.user_data.imagen_usuario)
+
     # Proceder con el registro
     try:
-        # Hash de la contraseña
-        hashed_pw = hash_password(data.user_data.password_usuario)
+        # Hash de la contraseña (CPU intensivo: en el executor de hashing, fuera del event loop)
+        hashed_pw = await hash_password_async(data.user_data.password_usuario)
         
         # Crear el usuario
         nuevo_usuario = Usuario(
@@ -145,30 +147,35 @@ async def verify_and_register(data: VerifyCodeRequest, db: Session = Depends(get
             password_usuario=hashed_pw,
             id_region=data.user_data.id_region,
             id_ciudad=data.user_data.id_ciudad,
-            imagen_usuario=data.user_data.imagen_usuario,
+            imagen_usuario=imagen,
             id_rol=data.user_data.id_rol,
             estado_usuario=data.user_data.estado_usuario
         )
         
         db.add(nuevo_usuario)
-        db.commit()
-        db.refresh(nuevo_usuario)
+        await db.commit()
+        await db.refresh(nuevo_usuario)
         
         return {
             "message": "Usuario registrado exitosamente",
             "usuario": nuevo_usuario
         }
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="El correo ya está registrado")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+def _imagen_para_guardar(value):
+    # Los data URL (base64) no se guardan en la columna: se mueven al almacén de uploads
+    return upload_store.offload_data_url(value, media_conf.PROFILE_IMAGE_SIZES)
+
+
 # -------------------- CRUD --------------------
 @router.get("/")
-def get_usuarios(db: Session = Depends(get_db)):
-    return db.query(Usuario).all()
+def get_usuarios(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return list_page(db, USUARIOS, params, response)
 
 
 @router.post("/")
@@ -182,7 +189,7 @@ def create_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
         password_usuario=hashed_pw,
         id_region=usuario.id_region,
         id_ciudad=usuario.id_ciudad,
-        imagen_usuario=usuario.imagen_usuario,
+        imagen_usuario=_imagen_para_guardar(usuario.imagen_usuario),
         id_rol=usuario.id_rol,
         estado_usuario=usuario.estado_usuario
     )
@@ -207,7 +214,10 @@ def update_usuario(usuario_id: int, request: UsuarioUpdate, db: Session = Depend
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    for key, value in request.dict(exclude_unset=True).items():
+    changes = request.dict(exclude_unset=True)
+    if "imagen_usuario" in changes:
+        changes["imagen_usuario"] = _imagen_para_guardar(changes["imagen_usuario"])
+    for key, value in changes.items():
         # Solo setear atributos que realmente existen en el modelo para evitar errores
         if hasattr(usuario, key):
             setattr(usuario, key, value)
@@ -222,18 +232,18 @@ def update_usuario(usuario_id: int, request: UsuarioUpdate, db: Session = Depend
 from services.password_recovery_service import send_recovery_email, verify_recovery_code
 
 @router.get("/check-role/{email}")
-async def check_user_role(email: str, db: Session = Depends(get_db)):
+async def check_user_role(email: str, db: AsyncSession = Depends(get_async_db)):
     """Verifica el rol de un usuario por su correo"""
-    user = db.query(Usuario).filter(Usuario.correo_usuario == email).first()
+    user = (await db.execute(select(Usuario).where(Usuario.correo_usuario == email))).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     return {"id_rol": user.id_rol}
 
 @router.post("/request-password-recovery")
-async def request_password_recovery(data: PasswordRecoveryRequest, db: Session = Depends(get_db)):
+async def request_password_recovery(data: PasswordRecoveryRequest, db: AsyncSession = Depends(get_async_db)):
     """Solicita un código de recuperación de contraseña"""
     # Verificar que el usuario existe
-    user = db.query(Usuario).filter(Usuario.correo_usuario == data.correo_usuario).first()
+    user = (await db.execute(select(Usuario).where(Usuario.correo_usuario == data.correo_usuario))).scalars().first()
     if not user:
         # Por seguridad, no revelamos si el correo existe o no
         return {"message": "Si el correo existe, recibirás un código de recuperación"}
@@ -241,37 +251,34 @@ async def request_password_recovery(data: PasswordRecoveryRequest, db: Session =
     try:
         await send_recovery_email(data.correo_usuario)
         return {"message": "Código de recuperación enviado"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/verify-and-reset-password")
-async def verify_and_reset_password(data: PasswordRecoveryVerify, db: Session = Depends(get_db)):
+async def verify_and_reset_password(data: PasswordRecoveryVerify, db: AsyncSession = Depends(get_async_db)):
     """Verifica el código y actualiza la contraseña"""
     # Buscar el usuario
-    user = db.query(Usuario).filter(Usuario.correo_usuario == data.correo_usuario).first()
+    user = (await db.execute(select(Usuario).where(Usuario.correo_usuario == data.correo_usuario))).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
     # Si es administrador (rol 1), no necesita verificar código
     if user.id_rol != 1:
         # Verificar el código para usuarios no administradores
-        if not verify_recovery_code(data.correo_usuario, data.code):
+        if not await verify_recovery_code(data.correo_usuario, data.code):
             raise HTTPException(status_code=400, detail="Código inválido")
     
-    # Actualizar la contraseña
-    user = db.query(Usuario).filter(Usuario.correo_usuario == data.correo_usuario).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    
     # Hash de la nueva contraseña
-    hashed_pw = hash_password(data.new_password)
+    hashed_pw = await hash_password_async(data.new_password)
     user.password_usuario = hashed_pw
     
     try:
-        db.commit()
+        await db.commit()
         return {"message": "Contraseña actualizada exitosamente"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint para cambiar contraseña (requiere contraseña actual)
@@ -330,6 +337,8 @@ def register_admin(request: RegisterRequest, admin_key: str, db: Session = Depen
     if existing_user:
         raise HTTPException(status_code=400, detail="El correo ya está registrado")
 
+    imagen = _imagen_para_guardar(request.imagen_usuario)
+
     try:
         # Hash de la contraseña
         hashed_pw = hash_password(request.password_usuario)
@@ -343,7 +352,7 @@ def register_admin(request: RegisterRequest, admin_key: str, db: Session = Depen
             password_usuario=hashed_pw,
             id_region=request.id_region,
             id_ciudad=request.id_ciudad,
-            imagen_usuario=request.imagen_usuario,
+            imagen_usuario=imagen,
             id_rol=1,  # Forzar rol de administrador
             estado_usuario="activo"
         )
@@ -374,6 +383,8 @@ def register_domiciliario(request: RegisterRequest, domiciliario_key: str, db: S
     if existing_user:
         raise HTTPException(status_code=400, detail="El correo ya está registrado")
 
+    imagen = _imagen_para_guardar(request.imagen_usuario)
+
     try:
         # Hash de la contraseña
         hashed_pw = hash_password(request.password_usuario)
@@ -387,7 +398,7 @@ def register_domiciliario(request: RegisterRequest, domiciliario_key: str, db: S
             password_usuario=hashed_pw,
             id_region=request.id_region,
             id_ciudad=request.id_ciudad,
-            imagen_usuario=request.imagen_usuario,
+            imagen_usuario=imagen,
             id_rol=3,  # Forzar rol de domiciliario
             estado_usuario="activo"
         )
@@ -409,6 +420,8 @@ def register_domiciliario(request: RegisterRequest, domiciliario_key: str, db: S
     if existing_user:
         raise HTTPException(status_code=400, detail="El correo ya está registrado")
 
+    imagen = _imagen_para_guardar(request.imagen_usuario)
+
     try:
         # Hash de la contraseña
         hashed_pw = hash_password(request.password_usuario)
@@ -422,7 +435,7 @@ def register_domiciliario(request: RegisterRequest, domiciliario_key: str, db: S
             password_usuario=hashed_pw,
             id_region=request.id_region,
             id_ciudad=request.id_ciudad,
-            imagen_usuario=request.imagen_usuario,
+            imagen_usuario=imagen,
             id_rol=1,  # Forzar rol de administrador
             estado_usuario="activo"
         )
@@ -446,14 +459,14 @@ def register_user(request: RegisterRequest, db: Session = Depends(get_db)):
     if existing_user:
         raise HTTPException(status_code=400, detail="El correo ya está registrado")
 
+    # Validar región/ciudad/rol contra la caché de datos de referencia (sin consultas),
+    # antes de ocupar un cupo de hashing con un registro inválido
+    ref = referencias.get()
+    referencias.validar_ubicacion(ref, request.id_region, request.id_ciudad)
+    if request.id_rol not in ref.rol_por_id:
+        raise HTTPException(status_code=400, detail="Rol inválido")
+
     hashed_pw = hash_password(request.password_usuario)
-    # Validar que la región/ciudad existen
-    region = db.query(Region).filter(Region.id_region == request.id_region).first()
-    ciudad = db.query(Ciudad).filter(Ciudad.id_ciudad == request.id_ciudad).first()
-    if not region:
-        raise HTTPException(status_code=400, detail="Región inválida")
-    if not ciudad:
-        raise HTTPException(status_code=400, detail="Ciudad inválida")
 
     nuevo_usuario = Usuario(
         nombre_usuario=request.nombre_usuario,
@@ -463,7 +476,7 @@ def register_user(request: RegisterRequest, db: Session = Depends(get_db)):
         password_usuario=hashed_pw,
         id_region=request.id_region,
         id_ciudad=request.id_ciudad,
-        imagen_usuario=request.imagen_usuario,
+        imagen_usuario=_imagen_para_guardar(request.imagen_usuario),
         id_rol=request.id_rol,
         estado_usuario=request.estado_usuario
     )
@@ -488,73 +501,62 @@ def register_user(request: RegisterRequest, db: Session = Depends(get_db)):
 async def update_profile_picture(
     id_usuario: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    print(f"Received image upload request for user {id_usuario}")
-    usuario = db.query(Usuario).filter(Usuario.id_usuario == id_usuario).first()
+    """Guarda el original y responde de inmediato; las variantes (avatar, card, full en WebP/JPEG)
+    se generan en el pool de procesos y `imagen_usuario` pasa a apuntar a la variante "full" al terminar.
+    """
+    usuario = await db.get(Usuario, id_usuario)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    try:
-        # Read and process the image
-        contents = await file.read()
-        if not contents:
-            raise HTTPException(status_code=400, detail="Archivo vacío")
-            
-        print(f"Image size: {len(contents)} bytes")
-        
-        # Validate image format
-        try:
-            img = Image.open(BytesIO(contents))
-            print(f"Original image format: {img.format}, size: {img.size}")
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Formato de imagen inválido: {str(e)}")
-        
-        # Resize if too large
-        max_size = (800, 800)
-        img.thumbnail(max_size, Image.Resampling.LANCZOS)
-        print(f"Resized image size: {img.size}")
-        
-        # Guardar la imagen en disco en backend/static/uploads
-        uploads_dir = Path(__file__).resolve().parent.parent / "static" / "uploads"
-        uploads_dir.mkdir(parents=True, exist_ok=True)
-
-        # Determinar extensión segura
-        original_ext = Path(file.filename).suffix if file.filename else ".jpg"
-        if original_ext == "":
-            original_ext = ".jpg"
-
-        filename = f"{id_usuario}_{uuid.uuid4().hex}{original_ext}"
-        file_path = uploads_dir / filename
-
-        # Convertir a JPEG para uniformidad
-        buffer = BytesIO()
-        img.convert('RGB').save(buffer, format='JPEG', quality=85)
-        with open(file_path, "wb") as f:
-            f.write(buffer.getvalue())
-
-        # Guardar ruta relativa en la DB (/static/uploads/filename)
-        usuario.imagen_usuario = f"/static/uploads/{filename}"
-        db.commit()
-        db.refresh(usuario)
-        print("Image saved to disk at:", str(file_path), "db field length=", len(usuario.imagen_usuario or ""))
+    # copia a disco + validación de cabecera (tamaño/formato) sin decodificar la imagen
+    original, stem = await image_pipeline.save_profile_original(file, id_usuario)
+    original_url = image_pipeline.static_url(original)
+    sizes = media_conf.PROFILE_IMAGE_SIZES
 
-        return {
-            "mensaje": "Imagen actualizada",
-            "imagen_usuario": usuario.imagen_usuario
-        }
+    try:
+        usuario.imagen_usuario = original_url
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+    async def _use_full_variant(variants):
+        async with AsyncSessionLocal() as session:
+            usuario = (await session.execute(
+                select(Usuario).where(Usuario.id_usuario == id_usuario).with_for_update()
+            )).scalars().first()
+            # solo si el usuario no ha subido otra foto mientras tanto
+            if usuario is None or usuario.imagen_usuario != original_url:
+                return
+            # por el ORM: el commit invalida el actor cacheado (hooks de sesión de auth.py)
+            usuario.imagen_usuario = variants["full"]["jpeg"]
+            await session.commit()
+
+    image_pipeline.schedule_variants(original, stem, sizes, on_done=_use_full_variant)
+
+    return {
+        "mensaje": "Imagen actualizada",
+        "imagen_usuario": original_url,
+        "variantes": image_pipeline.variant_urls(original.parent, stem, sizes),
+        "procesando": True,
+    }
+
 
 @router.post("/login")
 def login_user(request: LoginRequest, db: Session = Depends(get_db)):
     user = db.query(Usuario).filter(Usuario.correo_usuario == request.correo_usuario).first()
 
-    if not user or not verify_password(request.password_usuario, user.password_usuario):
+    valid, new_hash = verify_and_update_password(request.password_usuario, user.password_usuario) if user else (False, None)
+    if not valid:
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
+    # Rehash transparente si cambiaron los parámetros de argon2 (o el valor era legacy)
+    if new_hash:
+        user.password_usuario = new_hash
+        db.commit()
+
     # 🚫 Bloquear inicio de sesión si el usuario está inactivo
     if user.estado_usuario.lower() != "activo":
         raise HTTPException(status_code=403, detail="Tu cuenta está inactiva. Contacta al administrador.")
@@ -223,3 +223,9 @@ class ReciboUpdate(BaseModel):
     estado_recibo: Optional[str] = None
     id_pedido: Optional[int] = None
 
+
+# notificaciones
+class NotificacionesLeer(BaseModel):
+    # ids concretos o todas las no leídas del usuario
+    ids: Optional[list[int]] = None
+    todas: bool = False
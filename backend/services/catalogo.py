@@ -0,0 +1,101 @@
+"""Caché de lectura del catálogo público: `GET /productos/` y `GET /servicios/` (listados y por id).
+
+Cada respuesta se guarda ya serializada (bytes JSON) con un ETag fuerte calculado sobre el cuerpo,
+así que es el mismo en todos los workers. Con If-None-Match se responde 304 sin cuerpo y el
+navegador revalida cada vez (`no-cache`), por lo que una edición se ve en el siguiente request.
+
+Cualquier commit que cree, edite o elimine un Producto/Servicio descarta la caché de ese catálogo
+en este worker; CATALOGO_CACHE_TTL acota cuánto puede servir otro worker la versión anterior.
+"""
+import hashlib
+import json
+import os
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from models import Producto, Servicio
+from utils.cache import TTLCache, invalidate_on_commit
+from utils.http_cache import cached_bytes
+from utils.listing import TOTAL_COUNT_HEADER, ListParams, ListSpec, page_key
+from utils.pagination import NEXT_CURSOR_HEADER
+
+CATALOGO_CACHE_TTL = float(os.getenv("CATALOGO_CACHE_TTL", "30"))
+CACHE_CONTROL = "public, no-cache"
+
+PRODUCTOS = "productos"
+SERVICIOS = "servicios"
+
+_MODELOS = {Producto: PRODUCTOS, Servicio: SERVICIOS}
+_caches = {nombre: TTLCache(maxsize=512, ttl=CATALOGO_CACHE_TTL) for nombre in _MODELOS.values()}
+# Se incrementa en cada invalidación: una respuesta leída antes de un commit no se guarda
+_generations = {nombre: 0 for nombre in _MODELOS.values()}
+
+# cabeceras del listado que forman parte de la respuesta guardada
+_LIST_HEADERS = (NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER)
+
+
+class Entrada:
+    __slots__ = ("body", "etag", "headers")
+
+    def __init__(self, content, headers=None):
+        self.body = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()[:20]}"'
+        self.headers = headers or {}
+
+
+def list_key(spec: ListSpec, params: ListParams) -> tuple:
+    # a partir de los parámetros ya validados: un parámetro desconocido no desaloja páginas reales
+    return ("lista", page_key(spec, params))
+
+
+def _list_headers(response: Response | None) -> dict:
+    if response is None:
+        return {}
+    return {h: response.headers[h] for h in _LIST_HEADERS if h in response.headers}
+
+
+def _store(catalogo: str, key, gen: int, content, response) -> Entrada:
+    entrada = Entrada(content, _list_headers(response))
+    if gen == _generations[catalogo]:
+        _caches[catalogo].set(key, entrada)
+    return entrada
+
+
+def _responder(request: Request, entrada: Entrada) -> Response:
+    return cached_bytes(request, entrada.body, entrada.etag, CACHE_CONTROL, entrada.headers)
+
+
+def cached(request: Request, catalogo: str, key, cargar, response: Response | None = None) -> Response:
+    """Respuesta guardada para `key` o, si no hay, la de `cargar()` (endpoints `def`).
+
+    `response` es la que recibió el listado para copiar sus cabeceras de paginación.
+    """
+    entrada = _caches[catalogo].get(key)
+    if entrada is None:
+        gen = _generations[catalogo]
+        entrada = _store(catalogo, key, gen, cargar(), response)
+    return _responder(request, entrada)
+
+
+async def cached_async(request: Request, catalogo: str, key, cargar, response: Response | None = None) -> Response:
+    """Como `cached` con un `cargar` asíncrono."""
+    entrada = _caches[catalogo].get(key)
+    if entrada is None:
+        gen = _generations[catalogo]
+        entrada = _store(catalogo, key, gen, await cargar(), response)
+    return _responder(request, entrada)
+
+
+def invalidar(catalogo: str):
+    _generations[catalogo] += 1
+    _caches[catalogo].clear()
+
+
+# -------------------- Invalidación --------------------
+def _invalidar_modelos(modelos):
+    for modelo in modelos:
+        invalidar(_MODELOS[modelo])
+
+
+invalidate_on_commit(tuple(_MODELOS), _invalidar_modelos)
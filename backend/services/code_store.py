@@ -0,0 +1,178 @@
+"""Almacén de códigos de un solo uso (verificación de correo y recuperación de contraseña).
+
+Dos implementaciones con la misma interfaz, elegidas con CODE_STORE:
+
+- `MemoryCodeStore` ("memory"): en el proceso, con tope de tamaño y un barrido periódico de
+  vencidos. Solo sirve con un worker: un código emitido en un proceso no existe en otro.
+- `DBCodeStore` ("db"): tabla `codigos_verificacion` con clave (propósito, correo), compartida por
+  todos los workers; la validación y el contador de intentos se hacen bajo bloqueo de fila.
+
+En ambos se guarda el sha256 del código y se compara en tiempo constante. Cada código admite
+CODE_MAX_ATTEMPTS intentos fallidos; al agotarlos se descarta y hay que pedir uno nuevo.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select
+
+from config import security_conf
+from database import AsyncSessionLocal, get_async_engine
+from models import CodigoVerificacion
+
+logger = logging.getLogger(__name__)
+
+VERIFICACION = "verificacion"
+RECUPERACION = "recuperacion"
+
+_MENSAJES_SIN_CODIGO = {
+    VERIFICACION: "No hay código pendiente para este correo",
+    RECUPERACION: "No hay código de recuperación pendiente para este correo",
+}
+
+
+def _hash(codigo: str) -> str:
+    return hashlib.sha256(codigo.encode()).hexdigest()
+
+
+def _sin_codigo(proposito: str):
+    return HTTPException(status_code=400, detail=_MENSAJES_SIN_CODIGO.get(proposito, "No hay código pendiente"))
+
+
+def _expirado():
+    return HTTPException(status_code=400, detail="El código ha expirado")
+
+
+def _incorrecto(agotado: bool):
+    if agotado:
+        return HTTPException(status_code=429, detail="Demasiados intentos, solicita un código nuevo")
+    return HTTPException(status_code=400, detail="Código incorrecto")
+
+
+class MemoryCodeStore:
+    def __init__(self, max_size: int = security_conf.CODE_STORE_MAX_SIZE):
+        self.max_size = max_size
+        self._codigos = OrderedDict()  # (proposito, correo) -> [hash, expira (monotonic), intentos]
+        self._sweeper = None
+
+    def _start_sweeper(self):
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_loop())
+
+    async def _sweep_loop(self):
+        while self._codigos:
+            await asyncio.sleep(security_conf.CODE_SWEEP_INTERVAL)
+            self.sweep()
+
+    def sweep(self) -> int:
+        ahora = time.monotonic()
+        vencidos = [k for k, v in self._codigos.items() if v[1] < ahora]
+        for k in vencidos:
+            del self._codigos[k]
+        return len(vencidos)
+
+    async def guardar(self, proposito: str, correo: str, codigo: str, ttl: float):
+        key = (proposito, correo)
+        self._codigos.pop(key, None)
+        self._codigos[key] = [_hash(codigo), time.monotonic() + ttl, 0]
+        while len(self._codigos) > self.max_size:
+            self._codigos.popitem(last=False)
+        self._start_sweeper()
+
+    async def verificar(self, proposito: str, correo: str, codigo: str) -> bool:
+        key = (proposito, correo)
+        item = self._codigos.get(key)
+        if item is None:
+            raise _sin_codigo(proposito)
+        if item[1] < time.monotonic():
+            del self._codigos[key]
+            raise _expirado()
+        if not hmac.compare_digest(item[0], _hash(codigo)):
+            item[2] += 1
+            agotado = item[2] >= security_conf.CODE_MAX_ATTEMPTS
+            if agotado:
+                del self._codigos[key]
+            raise _incorrecto(agotado)
+        # código de un solo uso
+        del self._codigos[key]
+        return True
+
+    def __len__(self):
+        return len(self._codigos)
+
+
+class DBCodeStore:
+    def __init__(self):
+        self._last_sweep = 0.0
+
+    async def _maybe_sweep(self, db, ahora: datetime):
+        if time.monotonic() - self._last_sweep < security_conf.CODE_SWEEP_INTERVAL:
+            return
+        self._last_sweep = time.monotonic()
+        await db.execute(delete(CodigoVerificacion).where(CodigoVerificacion.fecha_expiracion < ahora))
+
+    async def guardar(self, proposito: str, correo: str, codigo: str, ttl: float):
+        ahora = datetime.utcnow()
+        get_async_engine()
+        async with AsyncSessionLocal() as db:
+            await self._maybe_sweep(db, ahora)
+            # un código pendiente por correo y propósito: el nuevo reemplaza al anterior
+            await db.execute(delete(CodigoVerificacion).where(
+                CodigoVerificacion.proposito == proposito, CodigoVerificacion.correo == correo
+            ))
+            db.add(CodigoVerificacion(
+                proposito=proposito, correo=correo, codigo_hash=_hash(codigo), intentos=0,
+                fecha_expiracion=ahora + timedelta(seconds=ttl),
+            ))
+            await db.commit()
+
+    async def verificar(self, proposito: str, correo: str, codigo: str) -> bool:
+        get_async_engine()
+        async with AsyncSessionLocal() as db:
+            # bloqueo de fila: dos intentos simultáneos no pueden usar el mismo código ni saltarse el contador
+            fila = (await db.execute(
+                select(CodigoVerificacion)
+                .where(CodigoVerificacion.proposito == proposito, CodigoVerificacion.correo == correo)
+                .with_for_update()
+            )).scalar_one_or_none()
+            if fila is None:
+                raise _sin_codigo(proposito)
+            if fila.fecha_expiracion < datetime.utcnow():
+                await db.delete(fila)
+                await db.commit()
+                raise _expirado()
+            if not hmac.compare_digest(fila.codigo_hash, _hash(codigo)):
+                fila.intentos += 1
+                agotado = fila.intentos >= security_conf.CODE_MAX_ATTEMPTS
+                if agotado:
+                    await db.delete(fila)
+                await db.commit()
+                raise _incorrecto(agotado)
+            await db.delete(fila)
+            await db.commit()
+        return True
+
+
+def _crear_store():
+    if security_conf.CODE_STORE == "db":
+        return DBCodeStore()
+    if security_conf.CODE_STORE != "memory":
+        logger.warning("CODE_STORE=%r desconocido; se usa memoria", security_conf.CODE_STORE)
+    return MemoryCodeStore()
+
+
+store = _crear_store()
+
+
+async def guardar(proposito: str, correo: str, codigo: str):
+    await store.guardar(proposito, correo, codigo, security_conf.CODE_TTL_MINUTES * 60)
+
+
+async def verificar(proposito: str, correo: str, codigo: str) -> bool:
+    """True si el código es válido (y lo consume); si no, HTTPException con el motivo."""
+    return await store.verificar(proposito, correo, codigo)
@@ -0,0 +1,256 @@
+"""Despacho de pedidos con domicilio a domiciliarios.
+
+Un pedido con domicilio nace `disponible`. `reclamar` asigna al domiciliario los siguientes N
+(opcionalmente de una ciudad o región) en una sola transacción con SELECT ... FOR UPDATE SKIP
+LOCKED sobre `pedidos`: dos domiciliarios que reclaman a la vez reciben pedidos distintos y
+ninguno espera al otro.
+
+La reserva vence a los DISPATCH_LEASE_SECONDS. Si el domiciliario no lo recoge antes
+(`recoger` -> `en-ruta`), el barrido lo devuelve a `disponible`. `entregar` lo cierra y
+`liberar` lo suelta a propósito.
+
+Cada cambio deja un evento `despacho` en el canal de los domiciliarios (services/event_hub.py):
+las rutas de services/rutas.py y los avisos del frontend se enteran de lo reclamado, liberado o
+vencido. PUT /domicilios y PUT /pedidos no pasan por aquí: `por_estado_domicilio` y `por_estado_pedido`
+ajustan el despacho a esos cambios para que un pedido entregado o cancelado no siga `disponible`.
+"""
+import time
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, insert, or_, select, update
+
+from config import dispatch_conf
+from models import Domicilio, Evento, Pedido
+from services.event_hub import despacho_evento, evento_rows
+
+DISPONIBLE = "disponible"
+RECLAMADO = "reclamado"
+EN_RUTA = "en-ruta"
+ENTREGADO = "entregado"
+
+_ultimo_barrido = 0.0
+
+
+async def _publicar(db, filas, estado: str):
+    # los UPDATE masivos no pasan por el flush: el evento se inserta aquí, en la misma transacción
+    if filas:
+        await db.execute(insert(Evento), evento_rows([despacho_evento(f.id_pedido, f.id_domicilio, estado) for f in filas]))
+
+
+async def liberar_vencidos(db) -> int:
+    """Devuelve a `disponible` las reservas vencidas (sin commit). Devuelve cuántas liberó."""
+    vencidos = (await db.execute(
+        select(Pedido.id_pedido, Pedido.id_domicilio)
+        .where(Pedido.estado_despacho == RECLAMADO, Pedido.reservado_hasta < datetime.utcnow())
+        .with_for_update(skip_locked=True)
+    )).all()
+    if not vencidos:
+        return 0
+    await db.execute(
+        update(Pedido)
+        .where(Pedido.id_pedido.in_([v.id_pedido for v in vencidos]))
+        .values(estado_despacho=DISPONIBLE, id_domiciliario=None, reservado_hasta=None)
+        .execution_options(synchronize_session=False)
+    )
+    await _publicar(db, vencidos, DISPONIBLE)
+    return len(vencidos)
+
+
+async def _maybe_liberar(db):
+    global _ultimo_barrido
+    if time.monotonic() - _ultimo_barrido < dispatch_conf.DISPATCH_SWEEP_INTERVAL:
+        return
+    _ultimo_barrido = time.monotonic()
+    await liberar_vencidos(db)
+
+
+async def barrer(db):
+    """Libera las reservas vencidas si ya toca (cada DISPATCH_SWEEP_INTERVAL) y hace commit."""
+    await _maybe_liberar(db)
+    await db.commit()
+
+
+def _entregas_query():
+    return (
+        select(
+            Pedido.id_pedido, Pedido.estado_pedido, Pedido.total, Pedido.estado_despacho,
+            Pedido.reservado_hasta, Pedido.id_usuario, Domicilio.id_domicilio, Domicilio.direccion_completa,
+            Domicilio.codigo_postal, Domicilio.id_ciudad, Domicilio.id_region,
+        )
+        .join(Domicilio, Domicilio.id_domicilio == Pedido.id_domicilio)
+        .order_by(Pedido.id_pedido)
+    )
+
+
+def _as_dict(row) -> dict:
+    d = dict(row._mapping)
+    d["total"] = float(d["total"]) if d["total"] is not None else None
+    return d
+
+
+async def asignados(db, id_domiciliario: int) -> list:
+    """Pedidos reclamados (con reserva vigente) o en ruta del domiciliario."""
+    ahora = datetime.utcnow()
+    rows = (await db.execute(
+        _entregas_query().where(
+            Pedido.id_domiciliario == id_domiciliario,
+            or_(
+                Pedido.estado_despacho == EN_RUTA,
+                and_(Pedido.estado_despacho == RECLAMADO, Pedido.reservado_hasta >= ahora),
+            ),
+        )
+    )).all()
+    return [_as_dict(r) for r in rows]
+
+
+async def reclamar(db, id_domiciliario: int, cantidad: int, id_ciudad: int = None, id_region: int = None, ids_domicilio=None) -> list:
+    """Asigna al domiciliario hasta `cantidad` pedidos disponibles y los devuelve.
+
+    Con `ids_domicilio` solo se reclaman pedidos de esos domicilios (una ruta de services/rutas.py).
+    """
+    await _maybe_liberar(db)
+    ahora = datetime.utcnow()
+
+    # tope de reservas sin recoger por domiciliario
+    pendientes = (await db.execute(
+        select(func.count()).select_from(Pedido).where(
+            Pedido.id_domiciliario == id_domiciliario,
+            Pedido.estado_despacho == RECLAMADO,
+            Pedido.reservado_hasta >= ahora,
+        )
+    )).scalar()
+    cantidad = min(cantidad, dispatch_conf.DISPATCH_MAX_CLAIM - pendientes)
+    if cantidad <= 0:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"Ya tienes {pendientes} pedidos reclamados sin recoger")
+
+    query = (
+        select(Pedido.id_pedido, Pedido.id_domicilio)
+        .join(Domicilio, Domicilio.id_domicilio == Pedido.id_domicilio)
+        # los disponibles siempre tienen reservado_hasta NULL: con ambas columnas del índice
+        # fijadas, el orden por id_pedido sale del propio índice
+        .where(Pedido.estado_despacho == DISPONIBLE, Pedido.reservado_hasta.is_(None), Pedido.estado_pedido != "cancelado")
+        .order_by(Pedido.id_pedido)
+        .limit(cantidad)
+        # filas tomadas por otra transacción se saltan en lugar de esperar
+        .with_for_update(skip_locked=True, of=Pedido)
+    )
+    if id_ciudad:
+        query = query.where(Domicilio.id_ciudad == id_ciudad)
+    if id_region:
+        query = query.where(Domicilio.id_region == id_region)
+    if ids_domicilio is not None:
+        query = query.where(Pedido.id_domicilio.in_(ids_domicilio))
+    filas = (await db.execute(query)).all()
+    ids = [f.id_pedido for f in filas]
+
+    if ids:
+        await db.execute(
+            update(Pedido)
+            .where(Pedido.id_pedido.in_(ids))
+            .values(
+                estado_despacho=RECLAMADO,
+                id_domiciliario=id_domiciliario,
+                reservado_hasta=ahora + timedelta(seconds=dispatch_conf.DISPATCH_LEASE_SECONDS),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await _publicar(db, filas, RECLAMADO)
+    await db.commit()
+    if not ids:
+        return []
+    rows = (await db.execute(_entregas_query().where(Pedido.id_pedido.in_(ids)))).all()
+    return [_as_dict(r) for r in rows]
+
+
+async def _propio(db, id_pedido: int, id_domiciliario: int, estado: str) -> Pedido:
+    pedido = (await db.execute(
+        select(Pedido).where(Pedido.id_pedido == id_pedido).with_for_update()
+    )).scalars().first()
+    if not pedido:
+        raise HTTPException(status_code=404, detail="Pedido no encontrado")
+    if pedido.id_domiciliario != id_domiciliario:
+        raise HTTPException(status_code=409, detail="El pedido no está asignado a ti")
+    if pedido.estado_despacho == RECLAMADO and pedido.reservado_hasta < datetime.utcnow():
+        raise HTTPException(status_code=409, detail="La reserva del pedido venció; vuelve a reclamarlo")
+    if pedido.estado_despacho != estado:
+        raise HTTPException(status_code=409, detail=f"El pedido está {pedido.estado_despacho}")
+    return pedido
+
+
+async def _estado_domicilio(db, pedido: Pedido, estado: str):
+    # el cambio de estado del domicilio también avisa al cliente por SSE (services/event_hub.py)
+    domicilio = await db.get(Domicilio, pedido.id_domicilio)
+    if domicilio:
+        domicilio.estado_domicilio = estado
+
+
+async def recoger(db, id_pedido: int, id_domiciliario: int) -> Pedido:
+    """El domiciliario recogió el pedido: deja de vencer y pasa a `en-ruta`."""
+    pedido = await _propio(db, id_pedido, id_domiciliario, RECLAMADO)
+    pedido.estado_despacho = EN_RUTA
+    pedido.reservado_hasta = None
+    await _estado_domicilio(db, pedido, "En-entrega")
+    await db.commit()
+    return pedido
+
+
+async def entregar(db, id_pedido: int, id_domiciliario: int) -> Pedido:
+    pedido = await _propio(db, id_pedido, id_domiciliario, EN_RUTA)
+    pedido.estado_despacho = ENTREGADO
+    await _estado_domicilio(db, pedido, "Entregado")
+    await db.commit()
+    return pedido
+
+
+async def liberar(db, id_pedido: int, id_domiciliario: int) -> Pedido:
+    """Devuelve un pedido reclamado (aún sin recoger) a los disponibles."""
+    pedido = await _propio(db, id_pedido, id_domiciliario, RECLAMADO)
+    pedido.estado_despacho = DISPONIBLE
+    pedido.id_domiciliario = None
+    pedido.reservado_hasta = None
+    await db.commit()
+    return pedido
+
+
+# -------------------- Cambios hechos fuera de /despacho --------------------
+_ACTIVOS = (DISPONIBLE, RECLAMADO, EN_RUTA)
+
+
+def _cerrar(pedido: Pedido, estado):
+    pedido.estado_despacho = estado
+    pedido.reservado_hasta = None
+    if estado != ENTREGADO:
+        pedido.id_domiciliario = None
+
+
+def por_estado_domicilio(pedidos, estado_domicilio: str):
+    """Ajusta el despacho de los pedidos de un domicilio que cambia de estado (sin commit).
+
+    Entregado y Cancelado lo cierran y Pendiente vuelve a ofrecer lo que no tiene ningún
+    domiciliario. Lo que un domiciliario tiene reclamado solo se recoge o se libera por /despacho.
+    """
+    if estado_domicilio == "Entregado":
+        for pedido in pedidos:
+            if pedido.estado_despacho in _ACTIVOS:
+                _cerrar(pedido, ENTREGADO)
+    elif estado_domicilio == "Cancelado":
+        for pedido in pedidos:
+            if pedido.estado_despacho in _ACTIVOS:
+                _cerrar(pedido, None)
+    elif estado_domicilio == "Pendiente":
+        if any(p.estado_despacho in (RECLAMADO, EN_RUTA) for p in pedidos):
+            raise HTTPException(status_code=409, detail="Un domiciliario tiene el pedido; se libera con POST /despacho/{id_pedido}/liberar")
+        for pedido in pedidos:
+            if pedido.estado_despacho is None and pedido.estado_pedido != "cancelado":
+                _cerrar(pedido, DISPONIBLE)
+    elif estado_domicilio == "En-entrega":
+        if any(p.estado_despacho in (DISPONIBLE, RECLAMADO) for p in pedidos):
+            raise HTTPException(status_code=409, detail="El pedido se recoge con POST /despacho/{id_pedido}/recoger")
+
+
+def por_estado_pedido(pedido: Pedido):
+    """Un pedido cancelado deja de ofrecerse y sale de la lista del domiciliario (sin commit)."""
+    if pedido.estado_pedido == "cancelado" and pedido.estado_despacho in _ACTIVOS:
+        _cerrar(pedido, None)
@@ -0,0 +1,215 @@
+"""Envío de correos en segundo plano con conexiones SMTP persistentes.
+
+`enviar()` deja el correo en una cola en memoria y vuelve enseguida: el request no espera el
+handshake SMTP/STARTTLS ni el envío. EMAIL_POOL_SIZE workers por proceso consumen la cola; cada
+uno mantiene abierta su conexión (se cierra tras EMAIL_IDLE_TIMEOUT sin uso) y envía hasta
+EMAIL_BATCH_SIZE correos seguidos por ella.
+
+Un error temporal (conexión caída, 4xx) se reintenta con espera exponencial sin bloquear al
+worker; un rechazo permanente (5xx) o agotar EMAIL_MAX_RETRIES solo se registra en el log.
+Los correos aún en cola al apagar el proceso se pierden: los códigos se pueden volver a pedir.
+"""
+import asyncio
+import logging
+from email.message import EmailMessage
+
+import aiosmtplib
+from fastapi import HTTPException
+
+from config import email_conf
+
+logger = logging.getLogger(__name__)
+
+# espera máxima al apagar para vaciar la cola
+_DRAIN_TIMEOUT = 10
+
+
+class SmtpSettings:
+    def __init__(self, host: str, port: int, sender: str, username=None, password=None,
+                 start_tls: bool = False, use_tls: bool = False, validate_certs: bool = True, timeout: float = 60):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.use_tls = use_tls
+        self.validate_certs = validate_certs
+        self.timeout = timeout
+
+    @classmethod
+    def from_conf(cls, conf=email_conf.email_conf):
+        """Misma configuración que usaba fastapi-mail (config/email_conf.py)."""
+        credentials = conf.USE_CREDENTIALS
+        return cls(
+            host=conf.MAIL_SERVER,
+            port=conf.MAIL_PORT,
+            sender=conf.MAIL_FROM,
+            username=conf.MAIL_USERNAME if credentials else None,
+            password=conf.MAIL_PASSWORD.get_secret_value() if credentials else None,
+            start_tls=conf.MAIL_STARTTLS,
+            use_tls=conf.MAIL_SSL_TLS,
+            validate_certs=conf.VALIDATE_CERTS,
+            timeout=conf.TIMEOUT,
+        )
+
+
+class _Correo:
+    __slots__ = ("mensaje", "intentos")
+
+    def __init__(self, mensaje: EmailMessage):
+        self.mensaje = mensaje
+        self.intentos = 0
+
+
+class _Conexion:
+    """Conexión SMTP de un worker; se abre con el primer envío y se reabre si se cayó."""
+
+    def __init__(self, settings: SmtpSettings):
+        self.settings = settings
+        self.smtp = None
+
+    async def enviar(self, mensaje: EmailMessage):
+        if self.smtp is None or not self.smtp.is_connected:
+            s = self.settings
+            self.smtp = aiosmtplib.SMTP(
+                hostname=s.host, port=s.port, username=s.username, password=s.password,
+                start_tls=s.start_tls, use_tls=s.use_tls, validate_certs=s.validate_certs, timeout=s.timeout,
+            )
+            await self.smtp.connect()
+        await self.smtp.send_message(mensaje)
+
+    async def cerrar(self):
+        smtp, self.smtp = self.smtp, None
+        if smtp is not None and smtp.is_connected:
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+
+def _permanente(exc: Exception) -> bool:
+    # 5xx: el servidor rechazó el correo y reintentar no cambia el resultado
+    if isinstance(exc, aiosmtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(exc, aiosmtplib.SMTPResponseException) and 500 <= exc.code < 600
+
+
+class EmailQueue:
+    def __init__(self, settings: SmtpSettings | None = None, pool_size: int = email_conf.EMAIL_POOL_SIZE):
+        self._settings = settings
+        self.pool_size = pool_size
+        self._queue = None
+        self._workers = []
+        self._reintentos = {}  # correo -> handle de call_later pendiente
+        self.enviados = 0
+        self.reintentados = 0
+        self.fallidos = 0
+
+    @property
+    def settings(self) -> SmtpSettings:
+        if self._settings is None:
+            self._settings = SmtpSettings.from_conf()
+        return self._settings
+
+    def start(self):
+        if self._workers:
+            return
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=email_conf.EMAIL_QUEUE_SIZE)
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.pool_size)]
+
+    async def stop(self):
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Se descartan %s correos pendientes al apagar", self._queue.qsize())
+        for handle in self._reintentos.values():
+            handle.cancel()
+        self._reintentos.clear()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def enviar(self, destinatario: str, asunto: str, html: str):
+        """Encola un correo HTML. Con la cola llena responde 503 en lugar de bloquear el request."""
+        self.start()
+        mensaje = EmailMessage()
+        mensaje["From"] = self.settings.sender
+        mensaje["To"] = destinatario
+        mensaje["Subject"] = asunto
+        mensaje.set_content(html, subtype="html")
+        try:
+            self._queue.put_nowait(_Correo(mensaje))
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="El servicio de correo está saturado, intenta de nuevo en unos minutos")
+
+    def as_dict(self) -> dict:
+        return {
+            "pendientes": self._queue.qsize() if self._queue is not None else 0,
+            "esperando_reintento": len(self._reintentos),
+            "enviados": self.enviados,
+            "reintentados": self.reintentados,
+            "fallidos": self.fallidos,
+            "workers": len(self._workers),
+        }
+
+    async def _worker(self):
+        conexion = _Conexion(self.settings)
+        try:
+            while True:
+                try:
+                    correo = await asyncio.wait_for(self._queue.get(), timeout=email_conf.EMAIL_IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    await conexion.cerrar()
+                    continue
+                # lote: los correos ya en cola salen por la misma conexión sin volver a esperar
+                lote = [correo]
+                while len(lote) < email_conf.EMAIL_BATCH_SIZE and not self._queue.empty():
+                    lote.append(self._queue.get_nowait())
+                for correo in lote:
+                    try:
+                        await self._entregar(conexion, correo)
+                    finally:
+                        self._queue.task_done()
+        finally:
+            await conexion.cerrar()
+
+    async def _entregar(self, conexion: _Conexion, correo: _Correo):
+        try:
+            await conexion.enviar(correo.mensaje)
+            self.enviados += 1
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            await conexion.cerrar()
+            error = exc
+        destinatario = correo.mensaje["To"]
+        if _permanente(error) or correo.intentos >= email_conf.EMAIL_MAX_RETRIES:
+            self.fallidos += 1
+            logger.error("No se pudo enviar el correo a %s tras %s intentos: %s", destinatario, correo.intentos + 1, error)
+            return
+        espera = email_conf.EMAIL_RETRY_BACKOFF * 2 ** correo.intentos
+        correo.intentos += 1
+        self.reintentados += 1
+        logger.warning("Error enviando correo a %s (%s); reintento en %.1fs", destinatario, error, espera)
+        self._reintentos[correo] = asyncio.get_running_loop().call_later(espera, self._reencolar, correo)
+
+    def _reencolar(self, correo: _Correo):
+        self._reintentos.pop(correo, None)
+        try:
+            self._queue.put_nowait(correo)
+        except asyncio.QueueFull:
+            self.fallidos += 1
+            logger.error("Cola de correo llena: se descarta el reintento a %s", correo.mensaje["To"])
+
+
+mailer = EmailQueue()
+
+
+def enviar(destinatario: str, asunto: str, html: str):
+    mailer.enviar(destinatario, asunto, html)
@@ -0,0 +1,340 @@
+"""Eventos en tiempo real para los streams SSE (`GET /eventos/stream`).
+
+Publicación: al hacer flush de una Notificacion nueva o de un cambio de estado de Pedido/Domicilio
+se inserta una fila en `eventos` dentro de la misma transacción (si se hace rollback, el evento
+tampoco existe). Los UPDATE masivos de services/despacho.py no pasan por el flush y publican sus
+eventos `despacho` con `evento_rows`.
+
+Reparto: cada worker de uvicorn tiene un `EventHub` que, mientras haya conexiones abiertas, lee
+las filas nuevas de `eventos` cada EVENTS_POLL_INTERVAL segundos y las pone en la cola de cada
+suscriptor de ese canal. Así funciona con varios workers y una pestaña inactiva no genera
+consultas: el coste es una consulta por worker, no por cliente.
+
+Los ids se asignan al insertar y no al hacer commit: el evento 10 puede hacerse visible después del
+11. Por eso la posición de lectura (`Cursor`) no es solo el último id: cada id saltado queda como
+hueco y se vuelve a consultar hasta EVENTS_GAP_TIMEOUT segundos. El `id:` de cada evento SSE lleva
+esa posición (`ultimo` o `ultimo:hueco,hueco`) para que al reconectar tampoco se pierdan.
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, event, func, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from config import events_conf
+from database import AsyncSessionLocal, get_async_engine
+from models import Domicilio, Evento, Notificacion, Pedido
+
+logger = logging.getLogger(__name__)
+
+# Rol que recibe los avisos de domicilios nuevos o que cambian de estado
+ROL_DOMICILIARIO = 3
+
+_PURGE_EVERY = 600  # segundos entre purgas de eventos antiguos
+_VENTANA = 1000  # ids hacia atrás del último en los que se esperan commits tardíos
+
+
+# prefijo del canal de cada usuario (también se arma en SQL para los envíos masivos)
+CANAL_USUARIO_PREFIX = "usuario:"
+
+
+def canal_usuario(id_usuario: int) -> str:
+    return f"{CANAL_USUARIO_PREFIX}{id_usuario}"
+
+
+def canal_rol(id_rol: int) -> str:
+    return f"rol:{id_rol}"
+
+
+def canal_proveedor(id_proveedor: int) -> str:
+    return f"proveedor:{id_proveedor}"
+
+
+# -------------------- Publicación --------------------
+def _loaded(obj, keys) -> dict:
+    # solo atributos ya cargados: dentro del flush no se deben disparar consultas
+    state = inspect(obj).dict
+    return {k: state[k] for k in keys if k in state}
+
+
+def _changed(obj, attr: str) -> bool:
+    return inspect(obj).attrs[attr].history.has_changes()
+
+
+def _domicilio_evento(d: Domicilio) -> dict:
+    return _loaded(d, ("id_domicilio", "estado_domicilio", "id_ciudad", "id_region", "id_usuario", "codigo_postal"))
+
+
+_DESPACHO_KEYS = ("id_pedido", "id_domicilio", "estado_despacho")
+
+
+def despacho_evento(id_pedido: int, id_domicilio: int, estado_despacho) -> tuple:
+    """Aviso a los domiciliarios de que un pedido cambió de estado de despacho (para `evento_rows`)."""
+    return (canal_rol(ROL_DOMICILIARIO), "despacho", dict(zip(_DESPACHO_KEYS, (id_pedido, id_domicilio, estado_despacho))))
+
+
+def _collect_events(session) -> list:
+    eventos = []
+    for obj in session.new:
+        if isinstance(obj, Notificacion):
+            datos = _loaded(obj, ("id_notificacion", "titulo", "mensaje", "url", "leida", "id_cita", "fecha_creacion"))
+            eventos.append((canal_usuario(obj.id_usuario_destino), "notificacion", datos))
+        elif isinstance(obj, Domicilio):
+            eventos.append((canal_rol(ROL_DOMICILIARIO), "domicilio", _domicilio_evento(obj)))
+        elif isinstance(obj, Pedido) and obj.estado_despacho is not None:
+            eventos.append((canal_rol(ROL_DOMICILIARIO), "despacho", _loaded(obj, _DESPACHO_KEYS)))
+    for obj in session.dirty:
+        if isinstance(obj, Pedido):
+            if _changed(obj, "estado_pedido"):
+                datos = _loaded(obj, ("id_pedido", "estado_pedido", "id_domicilio"))
+                eventos.append((canal_usuario(obj.id_usuario), "pedido", datos))
+            if _changed(obj, "estado_despacho"):
+                eventos.append((canal_rol(ROL_DOMICILIARIO), "despacho", _loaded(obj, _DESPACHO_KEYS)))
+        elif isinstance(obj, Domicilio) and any(_changed(obj, a) for a in ("estado_domicilio", "codigo_postal", "id_ciudad")):
+            datos = _domicilio_evento(obj)
+            eventos.append((canal_rol(ROL_DOMICILIARIO), "domicilio", datos))
+            eventos.append((canal_usuario(obj.id_usuario), "domicilio", datos))
+    return eventos
+
+
+def encode_datos(datos: dict) -> str:
+    return json.dumps(jsonable_encoder(datos))
+
+
+def evento_rows(eventos) -> list:
+    """Filas para `eventos` a partir de tuplas (canal, tipo, datos)."""
+    ahora = datetime.now()
+    return [{"canal": canal, "tipo": tipo, "datos": encode_datos(datos), "fecha_creacion": ahora} for canal, tipo, datos in eventos]
+
+
+def _publish_after_flush(session, flush_context):
+    eventos = _collect_events(session)
+    if not eventos:
+        return
+    # misma conexión y transacción que el flush
+    session.connection().execute(Evento.__table__.insert(), evento_rows(eventos))
+
+
+event.listen(Session, "after_flush", _publish_after_flush)
+
+
+# -------------------- Posición de lectura --------------------
+class Cursor:
+    """Eventos ya leídos: todos hasta `ultimo` salvo los huecos.
+
+    Un hueco es un id saltado que aún puede aparecer (commit tardío). Se deja de esperar a los
+    EVENTS_GAP_TIMEOUT segundos (rollback o autoincremento no consecutivo) o si queda a más de
+    _VENTANA ids del último.
+    """
+
+    def __init__(self, ultimo: int, huecos=()):
+        self.ultimo = ultimo
+        limite = time.monotonic() + events_conf.EVENTS_GAP_TIMEOUT
+        self._huecos = {h: limite for h in huecos if ultimo - _VENTANA < h <= ultimo}  # id -> plazo
+
+    @property
+    def huecos(self):
+        return sorted(self._huecos)
+
+    def where(self):
+        """Condición sobre `eventos` para leer lo que falta."""
+        cond = Evento.id_evento > self.ultimo
+        if self._huecos:
+            cond = or_(cond, Evento.id_evento.in_(self.huecos))
+        return cond
+
+    def conoce(self, id_evento: int) -> bool:
+        return id_evento <= self.ultimo and id_evento not in self._huecos
+
+    def avanzar(self, id_evento: int):
+        """Marca `id_evento` como leído; los ids saltados quedan como huecos."""
+        if id_evento <= self.ultimo:
+            self._huecos.pop(id_evento, None)
+            return
+        limite = time.monotonic() + events_conf.EVENTS_GAP_TIMEOUT
+        for h in range(max(self.ultimo + 1, id_evento - _VENTANA + 1), id_evento):
+            self._huecos[h] = limite
+        self.ultimo = id_evento
+
+    def expirar(self):
+        ahora = time.monotonic()
+        minimo = self.ultimo - _VENTANA
+        self._huecos = {h: t for h, t in self._huecos.items() if t > ahora and h > minimo}
+
+    def copia(self) -> "Cursor":
+        c = Cursor(self.ultimo)
+        c._huecos = dict(self._huecos)
+        return c
+
+    def unir(self, otro: "Cursor") -> "Cursor":
+        """Lo leído por cualquiera de los dos."""
+        huecos = [h for h in self._huecos if not otro.conoce(h)] + [h for h in otro._huecos if not self.conoce(h)]
+        return Cursor(max(self.ultimo, otro.ultimo), huecos)
+
+    def token(self) -> str:
+        if not self._huecos:
+            return str(self.ultimo)
+        return f"{self.ultimo}:{','.join(map(str, self.huecos))}"
+
+    @classmethod
+    def desde_token(cls, token: str) -> "Cursor":
+        """Inverso de `token()`; ValueError si no es válido."""
+        ultimo, _, huecos = token.partition(":")
+        return cls(int(ultimo), [int(h) for h in huecos.split(",") if h])
+
+
+async def cursor_actual(db) -> Cursor:
+    """Posición al final de la tabla, con huecos para los ids recientes aún sin commit."""
+    ultimo = (await db.execute(select(func.max(Evento.id_evento)))).scalar() or 0
+    vistos = set((await db.execute(
+        select(Evento.id_evento).where(Evento.id_evento > ultimo - _VENTANA)
+    )).scalars().all())
+    return Cursor(ultimo, (h for h in range(max(ultimo - _VENTANA + 1, 1), ultimo) if h not in vistos))
+
+
+# -------------------- Reparto --------------------
+def format_sse(token, tipo: str, datos: str) -> str:
+    # sin token no se envía `id:` y el navegador conserva el Last-Event-ID anterior
+    id_linea = f"id: {token}\n" if token is not None else ""
+    return f"{id_linea}event: {tipo}\ndata: {datos}\n\n"
+
+
+class Subscriber:
+    """Una conexión SSE: sus canales, su cola y si el hub la cerró por no consumir eventos.
+
+    La cola recibe tuplas (fila, cursor del hub tras leerla). `inicio` es el cursor del hub al
+    suscribirse: lo que conoce ya estaba en la tabla antes de la suscripción.
+    """
+
+    def __init__(self, canales):
+        self.canales = frozenset(canales)
+        self.queue = asyncio.Queue(maxsize=events_conf.EVENTS_QUEUE_SIZE)
+        self.closed = False
+        self.inicio = None
+
+
+class EventHub:
+    def __init__(self):
+        self._subscribers = {}  # canal -> set(Subscriber)
+        self._cursor = None  # posición de lectura; None mientras no haya conexiones
+        self._task = None
+        self._last_purge = 0.0
+
+    @property
+    def connections(self) -> int:
+        return len({s for subs in self._subscribers.values() for s in subs})
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def subscribe(self, canales) -> Subscriber:
+        sub = Subscriber(canales)
+        # si el hub estaba inactivo, fija la posición ahora para no perder eventos recientes
+        await self._prime()
+        # sin await entre la copia del cursor y el alta: ningún evento queda entre ambas
+        sub.inicio = self._cursor.copia()
+        for canal in sub.canales:
+            self._subscribers.setdefault(canal, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        for canal in sub.canales:
+            subs = self._subscribers.get(canal)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[canal]
+
+    async def _prime(self):
+        if self._cursor is None:
+            get_async_engine()
+            async with AsyncSessionLocal() as db:
+                cursor = await cursor_actual(db)
+            # otra suscripción pudo fijarlo mientras se consultaba
+            if self._cursor is None:
+                self._cursor = cursor
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(events_conf.EVENTS_POLL_INTERVAL)
+            try:
+                if not self._subscribers:
+                    # sin conexiones no se consulta; al volver a haber una se parte del final de la tabla
+                    self._cursor = None
+                    continue
+                await self._poll()
+                await self._maybe_purge()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error leyendo eventos")
+
+    async def _poll(self):
+        await self._prime()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Evento.id_evento, Evento.canal, Evento.tipo, Evento.datos)
+                .where(self._cursor.where())
+                .order_by(Evento.id_evento)
+                .limit(events_conf.EVENTS_CATCHUP_LIMIT)
+            )
+            rows = result.all()
+        for row in rows:
+            self._cursor.avanzar(row.id_evento)
+            self._dispatch(row, self._cursor.copia())
+        self._cursor.expirar()
+
+    def _dispatch(self, row, cursor: Cursor):
+        for sub in list(self._subscribers.get(row.canal, ())):
+            try:
+                sub.queue.put_nowait((row, cursor))
+            except asyncio.QueueFull:
+                # cliente lento: se cierra su stream y al reconectar se pone al día desde la tabla
+                sub.closed = True
+                self.unsubscribe(sub)
+
+    async def _maybe_purge(self):
+        loop = asyncio.get_running_loop()
+        if loop.time() - self._last_purge < _PURGE_EVERY:
+            return
+        self._last_purge = loop.time()
+        limite = datetime.now() - timedelta(hours=events_conf.EVENTS_RETENTION_HOURS)
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Evento).where(Evento.fecha_creacion < limite))
+            await db.commit()
+
+
+async def replay(canales, desde: Cursor):
+    """Eventos de `canales` que `desde` no conoce (para Last-Event-ID).
+
+    Devuelve None si hay más de EVENTS_CATCHUP_LIMIT: el cliente debe recargar su estado.
+    """
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Evento.id_evento, Evento.canal, Evento.tipo, Evento.datos)
+            .where(Evento.canal.in_(list(canales)), desde.where())
+            .order_by(Evento.id_evento)
+            .limit(events_conf.EVENTS_CATCHUP_LIMIT + 1)
+        )
+        rows = result.all()
+    if len(rows) > events_conf.EVENTS_CATCHUP_LIMIT:
+        return None
+    return rows
+
+
+hub = EventHub()
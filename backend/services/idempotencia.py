@@ -0,0 +1,177 @@
+"""Idempotency-Key para POST /checkout y POST /citas.
+
+Un cliente que reintenta tras un timeout envía la misma cabecera `Idempotency-Key`. La respuesta de
+la primera ejecución se guarda (tabla `idempotencia` y caché en memoria de cada worker) durante
+IDEMPOTENCY_TTL y los reintentos la reciben tal cual, sin volver a ejecutar la escritura.
+
+- Duplicados concurrentes en el mismo worker esperan a la ejecución en curso y reciben su resultado.
+- Entre workers, la fila `en-proceso` (restricción única) reserva la clave: un duplicado que llega
+  mientras otro worker la ejecuta recibe 409 y puede reintentar.
+- Solo se guardan respuestas exitosas: si la operación falla se libera la clave.
+- Reutilizar la clave con otro cuerpo responde 422.
+
+    return await idempotencia.ejecutar(clave, f"usuario:{id}", "checkout", payload, lambda: _checkout(...))
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from config import idempotency_conf
+from database import AsyncSessionLocal, get_async_engine
+from models import Idempotencia
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Cabecera que marca una respuesta reenviada desde el almacén
+REPLAY_HEADER = "Idempotent-Replayed"
+
+_PURGE_EVERY = 600  # segundos entre purgas de claves vencidas
+
+# (ruta, actor, clave) -> (huella, status_code, cuerpo JSON)
+_respuestas = TTLCache(maxsize=idempotency_conf.IDEMPOTENCY_CACHE_SIZE, ttl=idempotency_conf.IDEMPOTENCY_TTL)
+# (ruta, actor, clave) -> Future con la respuesta de la ejecución en curso en este worker
+_en_curso = {}
+_last_purge = 0.0
+
+
+def huella(payload) -> str:
+    return hashlib.sha256(json.dumps(jsonable_encoder(payload), sort_keys=True).encode()).hexdigest()
+
+
+def _responder(guardada, huella_request: str, replay: bool = True) -> Response:
+    huella_guardada, status_code, cuerpo = guardada
+    if huella_guardada != huella_request:
+        raise HTTPException(status_code=422, detail="Idempotency-Key ya usada con otro contenido")
+    headers = {REPLAY_HEADER: "true"} if replay else None
+    return Response(content=cuerpo, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def _where(key):
+    ruta, actor, clave = key
+    return (Idempotencia.ruta == ruta, Idempotencia.actor == actor, Idempotencia.clave == clave)
+
+
+async def _maybe_purge(db, ahora: datetime):
+    global _last_purge
+    if time.monotonic() - _last_purge < _PURGE_EVERY:
+        return
+    _last_purge = time.monotonic()
+    await db.execute(delete(Idempotencia).where(Idempotencia.fecha_expiracion < ahora))
+    await db.commit()
+
+
+async def _reservar(key, huella_request: str):
+    """Reserva la clave para este request. Devuelve la respuesta guardada si ya se completó."""
+    ruta, actor, clave = key
+    ahora = datetime.utcnow()
+    reserva = ahora + timedelta(seconds=idempotency_conf.IDEMPOTENCY_LOCK_TIMEOUT)
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        await _maybe_purge(db, ahora)
+        db.add(Idempotencia(ruta=ruta, actor=actor, clave=clave, huella=huella_request, estado="en-proceso", fecha_expiracion=reserva))
+        try:
+            await db.commit()
+            return None
+        except IntegrityError:
+            await db.rollback()
+
+        fila = (await db.execute(
+            select(Idempotencia.huella, Idempotencia.estado, Idempotencia.status_code, Idempotencia.respuesta, Idempotencia.fecha_expiracion)
+            .where(*_where(key))
+        )).first()
+        if fila is not None and fila.fecha_expiracion < ahora:
+            # vencida (respuesta antigua o worker caído a mitad): se vuelve a tomar la clave
+            result = await db.execute(
+                update(Idempotencia)
+                .where(*_where(key), Idempotencia.fecha_expiracion == fila.fecha_expiracion)
+                .values(huella=huella_request, estado="en-proceso", status_code=None, respuesta=None, fecha_expiracion=reserva)
+            )
+            await db.commit()
+            if result.rowcount == 1:
+                return None
+        elif fila is not None and fila.estado == "completado":
+            guardada = (fila.huella, fila.status_code, fila.respuesta)
+            _respuestas.set(key, guardada, ttl=(fila.fecha_expiracion - ahora).total_seconds())
+            return guardada
+    raise HTTPException(status_code=409, detail="Hay una solicitud con esta Idempotency-Key en proceso, reintenta en unos segundos")
+
+
+async def _guardar(key, guardada):
+    huella_request, status_code, cuerpo = guardada
+    expira = datetime.utcnow() + timedelta(seconds=idempotency_conf.IDEMPOTENCY_TTL)
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Idempotencia)
+            .where(*_where(key))
+            .values(estado="completado", status_code=status_code, respuesta=cuerpo, fecha_expiracion=expira)
+        )
+        await db.commit()
+
+
+async def _liberar(key):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Idempotencia).where(*_where(key), Idempotencia.estado == "en-proceso"))
+        await db.commit()
+
+
+async def ejecutar(clave, actor: str, ruta: str, payload, operacion, status_code: int = 200):
+    """Ejecuta `operacion()` una sola vez por (ruta, actor, clave); sin clave la ejecuta siempre."""
+    if not clave:
+        return await operacion()
+    if len(clave) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key demasiado larga")
+    key = (ruta, actor, clave)
+    huella_request = huella(payload)
+
+    guardada = _respuestas.get(key)
+    if guardada is not None:
+        return _responder(guardada, huella_request)
+    en_curso = _en_curso.get(key)
+    if en_curso is not None:
+        # duplicado concurrente en este worker: se espera a la ejecución en curso
+        return _responder(await asyncio.shield(en_curso), huella_request)
+
+    futuro = asyncio.get_running_loop().create_future()
+    _en_curso[key] = futuro
+    try:
+        guardada = await _reservar(key, huella_request)
+        if guardada is not None:
+            futuro.set_result(guardada)
+            return _responder(guardada, huella_request)
+        try:
+            resultado = await operacion()
+        except BaseException:
+            try:
+                await _liberar(key)
+            except Exception:
+                logger.exception("No se pudo liberar la Idempotency-Key %r", key)
+            raise
+        guardada = (huella_request, status_code, json.dumps(jsonable_encoder(resultado)))
+        _respuestas.set(key, guardada)
+        futuro.set_result(guardada)
+        try:
+            await _guardar(key, guardada)
+        except Exception:
+            # la operación ya está confirmada: se responde igual y la reserva vence sola
+            logger.exception("No se pudo guardar la respuesta de la Idempotency-Key %r", key)
+        return _responder(guardada, huella_request, replay=False)
+    except BaseException as exc:
+        if not futuro.done():
+            if isinstance(exc, asyncio.CancelledError):
+                futuro.cancel()
+            else:
+                futuro.set_exception(exc)
+                futuro.exception()  # marcada como leída aunque nadie la espere
+        raise
+    finally:
+        _en_curso.pop(key, None)
@@ -0,0 +1,199 @@
+"""Pipeline de imágenes subidas: guarda el original y genera las variantes en un pool de procesos.
+
+El endpoint solo copia el archivo a disco y valida la cabecera (en el threadpool); la decodificación,
+el redimensionado y la codificación WebP/JPEG ocurren en otro proceso, así no bloquean el event loop
+ni compiten por el GIL con los requests.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image, ImageOps
+
+from config import media_conf
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+PROFILE_DIR = STATIC_DIR / "uploads" / "perfiles"
+
+# Formatos aceptados (según la cabecera, no la extensión del cliente) -> extensión del original
+ALLOWED_FORMATS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif"}
+
+# Formatos de salida de cada variante: clave en la respuesta, extensión, opciones de PIL
+_OUTPUT_FORMATS = (
+    ("webp", ".webp", {"quality": 80, "method": 4}),
+    ("jpeg", ".jpg", {"quality": 85, "optimize": True}),
+)
+
+_CHUNK_SIZE = 64 * 1024
+
+_executor = None
+# referencias a las tareas de finalización para que no las recoja el GC antes de terminar
+_pending_tasks = set()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=media_conf.IMAGE_WORKERS)
+    return _executor
+
+
+def shutdown(wait: bool = False):
+    """Cierra el pool. Con `wait=True` termina antes las variantes pendientes (scripts por lotes)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait, cancel_futures=not wait)
+        _executor = None
+
+
+def static_url(path: Path) -> str:
+    return "/static/" + path.relative_to(STATIC_DIR).as_posix()
+
+
+def atomic_write(path: Path, write):
+    """Escribe en un temporal del mismo directorio y lo renombra: nunca se sirve un archivo a medias."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=path.suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _check_pixels(img):
+    width, height = img.size
+    if width * height > media_conf.IMAGE_MAX_PIXELS:
+        raise ValueError(f"Imagen demasiado grande ({width}x{height})")
+
+
+def copy_limited(src, dest_dir: Path, digest=None) -> Path:
+    """Copia un archivo subido por bloques a un temporal en `dest_dir`, cortando al superar
+    IMAGE_MAX_UPLOAD_BYTES. Si se pasa `digest` (hashlib) se actualiza con cada bloque."""
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dest_dir, prefix=".tmp-")
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            while chunk := src.read(_CHUNK_SIZE):
+                size += len(chunk)
+                if size > media_conf.IMAGE_MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="Archivo demasiado grande")
+                if digest is not None:
+                    digest.update(chunk)
+                f.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Archivo vacío")
+        return Path(tmp)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def probe_format(path: Path) -> str:
+    """Valida formato y dimensiones leyendo solo la cabecera (sin decodificar los píxeles)."""
+    try:
+        with Image.open(path) as img:
+            fmt = img.format
+            _check_pixels(img)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Formato de imagen inválido")
+    if fmt not in ALLOWED_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato de imagen no soportado: {fmt}")
+    return fmt
+
+
+def _store_original(src, dest_dir: Path, stem: str):
+    tmp = copy_limited(src, dest_dir)
+    try:
+        dest = dest_dir / f"{stem}{ALLOWED_FORMATS[probe_format(tmp)]}"
+        os.replace(tmp, dest)
+        return dest
+    except BaseException:
+        if tmp.exists():
+            tmp.unlink()
+        raise
+
+
+def render_variants(src: str, dest_dir: str, stem: str, sizes: dict) -> dict:
+    """Genera cada variante en WebP y JPEG. Se ejecuta en el pool de procesos."""
+    Image.MAX_IMAGE_PIXELS = media_conf.IMAGE_MAX_PIXELS
+    out_dir = Path(dest_dir)
+    with Image.open(src) as img:
+        _check_pixels(img)
+        # JPEG: decodificar directamente a escala reducida cuando es posible (mucho más barato)
+        img.draft("RGB", (max(sizes.values()),) * 2)
+        img = ImageOps.exif_transpose(img).convert("RGB")
+    variants = {}
+    for name, side in sorted(sizes.items(), key=lambda item: -item[1]):
+        img.thumbnail((side, side), Image.Resampling.LANCZOS)
+        variants[name] = {}
+        for key, ext, options in _OUTPUT_FORMATS:
+            path = out_dir / f"{stem}_{name}{ext}"
+            atomic_write(path, lambda f: img.save(f, format=key.upper(), **options))
+            variants[name][key] = static_url(path)
+    return variants
+
+
+def variant_paths(dest_dir: Path, stem: str, sizes: dict) -> dict:
+    """Rutas donde quedarán las variantes (se conocen antes de generarlas)."""
+    return {name: {key: dest_dir / f"{stem}_{name}{ext}" for key, ext, _ in _OUTPUT_FORMATS} for name in sizes}
+
+
+def variant_urls(dest_dir: Path, stem: str, sizes: dict) -> dict:
+    return {
+        name: {key: static_url(path) for key, path in paths.items()}
+        for name, paths in variant_paths(dest_dir, stem, sizes).items()
+    }
+
+
+async def save_profile_original(file: UploadFile, id_usuario: int):
+    """Persiste el original de la foto de perfil y devuelve (ruta, stem). Lanza HTTPException 4xx."""
+    stem = f"{id_usuario}_{uuid.uuid4().hex}"
+    path = await run_in_threadpool(_store_original, file.file, PROFILE_DIR, stem)
+    return path, stem
+
+
+def _log_failure(original):
+    def callback(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Error procesando la imagen %s", original, exc_info=future.exception())
+    return callback
+
+
+def submit_variants(original: Path, stem: str, sizes: dict):
+    """Encola la generación de variantes sin esperar el resultado (válido desde endpoints `def`)."""
+    future = _get_executor().submit(render_variants, str(original), str(original.parent), stem, sizes)
+    future.add_done_callback(_log_failure(original))
+    return future
+
+
+def schedule_variants(original: Path, stem: str, sizes: dict, on_done=None):
+    """Igual que `submit_variants`; `on_done(variants)` (corrutina) se ejecuta en el event loop al terminar."""
+    future = submit_variants(original, stem, sizes)
+
+    async def _finish():
+        try:
+            variants = await asyncio.wrap_future(future)
+        except Exception:
+            return  # ya registrado por submit_variants
+        if on_done is not None:
+            await on_done(variants)
+
+    task = asyncio.get_running_loop().create_task(_finish())
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
+    return task
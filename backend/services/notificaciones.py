@@ -0,0 +1,128 @@
+"""Envío de una misma notificación a muchos usuarios con una sola sentencia.
+
+- `notificar_admins`: ids de los administradores en caché (se invalida al cambiar roles) y un
+  único INSERT con executemany.
+- `notificar_segmento`: INSERT ... SELECT sobre `usuarios` filtrando por rol/región/ciudad, sin
+  cargar filas de Usuario en Python.
+
+Las funciones reciben una Session síncrona y no hacen commit: la notificación queda en la misma
+transacción que el cambio que la origina. Desde una AsyncSession se usan con `run_sync`:
+
+    await db.run_sync(notificaciones.notificar_admins, "Título", "Mensaje")
+
+`encolar_notificacion` deja el envío como trabajo en segundo plano (services/trabajos.py), para
+avisos que no deben retrasar ni hacer fallar el request: se guarda con el commit del handler y se
+reintenta si falla.
+"""
+from datetime import datetime
+
+from sqlalchemy import String, cast, false, insert, literal, select
+from sqlalchemy.orm import Session
+
+from models import Evento, Notificacion, Usuario
+from services import trabajos
+from services.event_hub import CANAL_USUARIO_PREFIX, encode_datos, evento_rows, canal_usuario
+from utils.cache import TTLCache, invalidate_on_commit
+
+ROL_ADMIN = 1
+ROL_EMPRENDEDOR = 2
+ROL_DOMICILIARIO = 3
+ROL_CLIENTE = 4
+
+# ids de los administradores; se invalida al hacer commit de un cambio de rol y el TTL acota
+# la desactualización cuando el cambio ocurre en otro worker
+_admin_cache = TTLCache(maxsize=1, ttl=300)
+_ADMINS_KEY = "admins"
+
+
+def admin_ids(db: Session) -> tuple:
+    ids = _admin_cache.get(_ADMINS_KEY)
+    if ids is None:
+        ids = tuple(db.execute(select(Usuario.id_usuario).where(Usuario.id_rol == ROL_ADMIN)).scalars())
+        _admin_cache.set(_ADMINS_KEY, ids)
+    return ids
+
+
+def segmento(id_rol: int | None = None, id_region: int | None = None, id_ciudad: int | None = None):
+    """SELECT de los ids de usuario de un segmento (p. ej. domiciliarios de una región)."""
+    stmt = select(Usuario.id_usuario)
+    if id_rol is not None:
+        stmt = stmt.where(Usuario.id_rol == id_rol)
+    if id_region is not None:
+        stmt = stmt.where(Usuario.id_region == id_region)
+    if id_ciudad is not None:
+        stmt = stmt.where(Usuario.id_ciudad == id_ciudad)
+    return stmt
+
+
+def _datos(titulo, mensaje, url, id_cita) -> dict:
+    return {"titulo": titulo, "mensaje": mensaje, "url": url, "id_cita": id_cita, "leida": False}
+
+
+def notificar_usuarios(db: Session, ids, titulo: str, mensaje: str, url: str | None = None, id_cita: int | None = None) -> int:
+    """Una notificación por id en un solo INSERT (executemany), más sus eventos SSE."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    datos = _datos(titulo, mensaje, url, id_cita)
+    ahora = datetime.utcnow()
+    db.execute(
+        insert(Notificacion),
+        [dict(datos, id_usuario_destino=i, fecha_creacion=ahora) for i in ids],
+    )
+    db.execute(insert(Evento), evento_rows((canal_usuario(i), "notificacion", datos) for i in ids))
+    return len(ids)
+
+
+def notificar_admins(db: Session, titulo: str, mensaje: str, url: str | None = None, id_cita: int | None = None) -> int:
+    return notificar_usuarios(db, admin_ids(db), titulo, mensaje, url, id_cita)
+
+
+def notificar_segmento(db: Session, destinatarios, titulo: str, mensaje: str, url: str | None = None, id_cita: int | None = None) -> int:
+    """Notifica a todos los usuarios de `destinatarios` (ver `segmento`) con INSERT ... SELECT."""
+    ids = destinatarios.subquery()
+    datos = _datos(titulo, mensaje, url, id_cita)
+    ahora = datetime.utcnow()
+    result = db.execute(
+        insert(Notificacion).from_select(
+            ["id_usuario_destino", "titulo", "mensaje", "url", "id_cita", "leida", "fecha_creacion"],
+            select(
+                ids.c.id_usuario,
+                literal(titulo),
+                literal(mensaje),
+                literal(url, String),
+                literal(id_cita),
+                false(),
+                literal(ahora),
+            ),
+        )
+    )
+    # evento por usuario con el canal armado en SQL
+    db.execute(
+        insert(Evento).from_select(
+            ["canal", "tipo", "datos", "fecha_creacion"],
+            select(
+                literal(CANAL_USUARIO_PREFIX) + cast(ids.c.id_usuario, String),
+                literal("notificacion"),
+                literal(encode_datos(datos)),
+                literal(datetime.now()),
+            ),
+        )
+    )
+    return result.rowcount
+
+
+def encolar_notificacion(db, ids, titulo: str, mensaje: str, url: str | None = None, id_cita: int | None = None):
+    """Notificación como trabajo en segundo plano; se guarda con el commit de `db` (sync o async)."""
+    datos = {"ids": list(ids), "titulo": titulo, "mensaje": mensaje, "url": url, "id_cita": id_cita}
+    return trabajos.encolar(db, "notificar", datos)
+
+
+@trabajos.tarea("notificar")
+async def _trabajo_notificar(db, datos: dict):
+    await db.run_sync(notificar_usuarios, datos["ids"], datos["titulo"], datos["mensaje"], datos.get("url"), datos.get("id_cita"))
+
+
+# -------------------- Invalidación de la caché --------------------
+# altas, bajas y cambios de rol de usuarios
+invalidate_on_commit((Usuario,), lambda modelos: _admin_cache.clear(), attrs=("id_rol",))
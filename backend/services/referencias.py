@@ -0,0 +1,122 @@
+"""Datos de referencia en memoria: regiones, ciudades y roles.
+
+Cambian casi nunca pero se consultan en el registro, el checkout y los selectores de ubicación.
+Se cargan al arrancar (y la primera vez que hagan falta) en una instantánea inmutable con índices
+por id y región → ciudades; `/ubicaciones/*` y las validaciones la usan sin ir a la base.
+
+La instantánea se descarta al hacer commit de un cambio en esas tablas en este worker, con
+`recargar()` (POST /internal/referencias/recargar) o al cumplirse REFERENCIAS_TTL segundos, que
+acota la desactualización cuando el cambio se hizo en otro worker o directamente en la base.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import AsyncSessionLocal, SessionLocal, get_async_engine
+from models import Ciudad, Region, RolUsuario
+from utils.cache import invalidate_on_commit
+
+REFERENCIAS_TTL = float(os.getenv("REFERENCIAS_TTL", "3600"))
+
+_snapshot = None
+_lock = threading.Lock()
+# Se incrementa en cada invalidación: una carga que empezó antes de un commit no se guarda
+_generation = 0
+
+
+class Referencias:
+    """Instantánea de solo lectura; se reemplaza entera al recargar."""
+
+    def __init__(self, regiones, ciudades, roles):
+        self.regiones = regiones  # [{"id_region", "nombre_region"}]
+        self.ciudades = ciudades  # [{"id_ciudad", "nombre_ciudad", "id_region"}]
+        self.roles = roles  # [{"id_rol", "nombre_rol", "descripcion_rol"}]
+        self.region_por_id = {r["id_region"]: r for r in regiones}
+        self.ciudad_por_id = {c["id_ciudad"]: c for c in ciudades}
+        self.rol_por_id = {r["id_rol"]: r for r in roles}
+        por_region = {}
+        for c in ciudades:
+            por_region.setdefault(c["id_region"], []).append(c)
+        self.ciudades_por_region = por_region
+        contenido = json.dumps([regiones, ciudades, roles], sort_keys=True).encode()
+        self.etag = f'"{hashlib.sha1(contenido).hexdigest()[:16]}"'
+        self.cargado = time.monotonic()
+
+    def vigente(self) -> bool:
+        return time.monotonic() - self.cargado < REFERENCIAS_TTL
+
+
+def _leer(db: Session) -> Referencias:
+    def rows(stmt):
+        return [dict(r._mapping) for r in db.execute(stmt)]
+
+    return Referencias(
+        rows(select(Region.id_region, Region.nombre_region).order_by(Region.id_region)),
+        rows(select(Ciudad.id_ciudad, Ciudad.nombre_ciudad, Ciudad.id_region).order_by(Ciudad.id_ciudad)),
+        rows(select(RolUsuario.id_rol, RolUsuario.nombre_rol, RolUsuario.descripcion_rol).order_by(RolUsuario.id_rol)),
+    )
+
+
+def get() -> Referencias:
+    """Instantánea vigente; la carga con una sesión propia si no hay o venció (endpoints `def`)."""
+    global _snapshot
+    snap = _snapshot
+    if snap is not None and snap.vigente():
+        return snap
+    with _lock:
+        snap = _snapshot
+        if snap is None or not snap.vigente():
+            generation = _generation
+            with SessionLocal() as db:
+                snap = _leer(db)
+            if generation == _generation:
+                _snapshot = snap
+        return snap
+
+
+async def get_async() -> Referencias:
+    """Como `get`, para endpoints async: la carga no bloquea el event loop."""
+    global _snapshot
+    snap = _snapshot
+    if snap is not None and snap.vigente():
+        return snap
+    generation = _generation
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        snap = await db.run_sync(_leer)
+    if generation == _generation:
+        _snapshot = snap
+    return snap
+
+
+def recargar() -> Referencias:
+    invalidar()
+    return get()
+
+
+def invalidar():
+    global _snapshot, _generation
+    _generation += 1
+    _snapshot = None
+
+
+def validar_ubicacion(ref: Referencias, id_region: int, id_ciudad: int):
+    if id_region not in ref.region_por_id:
+        raise HTTPException(status_code=400, detail="Región inválida")
+    ciudad = ref.ciudad_por_id.get(id_ciudad)
+    if ciudad is None:
+        raise HTTPException(status_code=400, detail="Ciudad inválida")
+    if ciudad["id_region"] != id_region:
+        raise HTTPException(status_code=400, detail="La ciudad no pertenece a la región")
+
+
+# -------------------- Invalidación --------------------
+_REFERENCE_MODELS = (Region, Ciudad, RolUsuario)
+
+invalidate_on_commit(_REFERENCE_MODELS, lambda modelos: invalidar())
@@ -0,0 +1,169 @@
+"""Rutas de entrega: domicilios con pedidos `disponible` agrupados por ciudad y prefijo postal.
+
+Cada grupo (región, ciudad, primeros DISPATCH_POSTAL_PREFIX caracteres del código postal) se
+parte en rutas de como mucho DISPATCH_RUN_MAX_STOPS paradas, ordenadas por código postal.
+
+El índice vive en memoria en cada worker y se mantiene de forma incremental. Los domicilios
+nuevos o modificados y los pedidos que se reclaman, liberan o vencen dejan un evento en la tabla
+`eventos` (services/event_hub.py, services/despacho.py), en la misma transacción. En cada consulta
+se leen los eventos que el `Cursor` aún no vio (incluidos los de commit tardío) y se releen solo
+esos domicilios; una parada reclamada sale de su ruta enseguida. Después se vuelven a partir solo
+los grupos que cambiaron.
+
+Se reconstruye entero al arrancar, cada DISPATCH_RUNS_REBUILD_SECONDS o si hay más eventos
+atrasados que EVENTS_CATCHUP_LIMIT.
+"""
+import asyncio
+import json
+import time
+
+from sqlalchemy import select
+
+from config import dispatch_conf, events_conf
+from models import Domicilio, Evento, Pedido
+from services.despacho import DISPONIBLE
+from services.event_hub import ROL_DOMICILIARIO, canal_rol, cursor_actual
+
+_COLUMNAS = (
+    Domicilio.id_domicilio, Domicilio.direccion_completa,
+    Domicilio.codigo_postal, Domicilio.id_ciudad, Domicilio.id_region, Domicilio.id_usuario,
+)
+
+
+def _paradas_query():
+    # mismas condiciones que despacho.reclamar: por el índice idx_pedidos_despacho
+    return (
+        select(*_COLUMNAS)
+        .join(Pedido, Pedido.id_domicilio == Domicilio.id_domicilio)
+        .where(Pedido.estado_despacho == DISPONIBLE, Pedido.reservado_hasta.is_(None), Pedido.estado_pedido != "cancelado")
+        .distinct()
+    )
+
+
+def prefijo_postal(codigo_postal) -> str:
+    return (codigo_postal or "").strip().upper()[:dispatch_conf.DISPATCH_POSTAL_PREFIX]
+
+
+def id_ruta(id_ciudad: int, prefijo: str, n: int) -> str:
+    return f"{id_ciudad}:{prefijo or '-'}:{n}"
+
+
+class Rutas:
+    def __init__(self):
+        self._paradas = {}  # id_domicilio -> clave del grupo
+        self._grupos = {}  # (id_region, id_ciudad, prefijo) -> {id_domicilio: parada}
+        self._rutas = {}  # clave -> [ruta, ...] ya partidas
+        self._sucios = set()
+        self._cursor = None  # posición en `eventos` (services/event_hub.Cursor)
+        self._cargado_en = 0.0
+        self._lock = asyncio.Lock()
+
+    # -------------------- índice --------------------
+    def _quitar(self, id_domicilio: int):
+        clave = self._paradas.pop(id_domicilio, None)
+        if clave is None:
+            return
+        grupo = self._grupos[clave]
+        del grupo[id_domicilio]
+        if not grupo:
+            del self._grupos[clave]
+        self._sucios.add(clave)
+
+    def _aplicar(self, row):
+        self._quitar(row.id_domicilio)
+        clave = (row.id_region, row.id_ciudad, prefijo_postal(row.codigo_postal))
+        self._paradas[row.id_domicilio] = clave
+        self._grupos.setdefault(clave, {})[row.id_domicilio] = {
+            "id_domicilio": row.id_domicilio,
+            "direccion_completa": row.direccion_completa,
+            "codigo_postal": row.codigo_postal,
+            "id_usuario": row.id_usuario,
+        }
+        self._sucios.add(clave)
+
+    def _partir(self, clave):
+        grupo = self._grupos.get(clave)
+        if not grupo:
+            self._rutas.pop(clave, None)
+            return
+        id_region, id_ciudad, prefijo = clave
+        paradas = sorted(grupo.values(), key=lambda p: (p["codigo_postal"] or "", p["id_domicilio"]))
+        n = dispatch_conf.DISPATCH_RUN_MAX_STOPS
+        self._rutas[clave] = [
+            {
+                "id_ruta": id_ruta(id_ciudad, prefijo, i // n + 1),
+                "id_region": id_region,
+                "id_ciudad": id_ciudad,
+                "prefijo_postal": prefijo or None,
+                "paradas": paradas[i:i + n],
+            }
+            for i in range(0, len(paradas), n)
+        ]
+
+    # -------------------- sincronización --------------------
+    async def _cargar(self, db):
+        # la posición se fija antes de leer las paradas: un cambio entre ambas consultas se
+        # vuelve a aplicar en la siguiente sincronización (releer un domicilio es idempotente)
+        cursor = await cursor_actual(db)
+        rows = (await db.execute(_paradas_query())).all()
+        self._paradas, self._grupos, self._rutas = {}, {}, {}
+        self._sucios = set()
+        for row in rows:
+            self._aplicar(row)
+        self._cursor = cursor
+        self._cargado_en = time.monotonic()
+
+    async def _sincronizar(self, db):
+        # se leen todos los canales: los huecos del cursor son ids globales de `eventos`
+        eventos = (await db.execute(
+            select(Evento.id_evento, Evento.canal, Evento.datos)
+            .where(self._cursor.where())
+            .order_by(Evento.id_evento)
+            .limit(events_conf.EVENTS_CATCHUP_LIMIT + 1)
+        )).all()
+        if len(eventos) > events_conf.EVENTS_CATCHUP_LIMIT:
+            await self._cargar(db)
+            return
+        canal = canal_rol(ROL_DOMICILIARIO)
+        ids = {json.loads(e.datos).get("id_domicilio") for e in eventos if e.canal == canal} - {None}
+        if ids:
+            rows = (await db.execute(_paradas_query().where(Domicilio.id_domicilio.in_(ids)))).all()
+            for row in rows:
+                self._aplicar(row)
+            # sin pedidos disponibles (reclamados, entregados, cancelados) o eliminados
+            for id_domicilio in ids - {row.id_domicilio for row in rows}:
+                self._quitar(id_domicilio)
+        for e in eventos:
+            self._cursor.avanzar(e.id_evento)
+        self._cursor.expirar()
+
+    async def actualizar(self, db):
+        async with self._lock:
+            vencido = time.monotonic() - self._cargado_en > dispatch_conf.DISPATCH_RUNS_REBUILD_SECONDS
+            if self._cursor is None or vencido:
+                await self._cargar(db)
+            else:
+                await self._sincronizar(db)
+            for clave in self._sucios:
+                self._partir(clave)
+            self._sucios.clear()
+
+    # -------------------- consulta --------------------
+    async def listar(self, db, id_ciudad: int = None, id_region: int = None) -> list:
+        await self.actualizar(db)
+        claves = sorted(
+            (c for c in self._rutas if (not id_region or c[0] == id_region) and (not id_ciudad or c[1] == id_ciudad)),
+            key=lambda c: (c[0], c[1], c[2]),
+        )
+        return [ruta for clave in claves for ruta in self._rutas[clave]]
+
+    async def obtener(self, db, ruta_id: str):
+        await self.actualizar(db)
+        for rutas in self._rutas.values():
+            for ruta in rutas:
+                if ruta["id_ruta"] == ruta_id:
+                    return ruta
+        return None
+
+
+rutas = Rutas()
@@ -0,0 +1,227 @@
+"""Cola de trabajos en segundo plano persistida en la tabla `trabajos`.
+
+Para efectos secundarios que no deben retrasar ni hacer fallar el request (p. ej. notificar a
+otro usuario). El handler llama a `encolar` antes de su commit: el trabajo se guarda en la misma
+transacción que el cambio, así solo existe si el cambio se confirmó y sobrevive a reinicios.
+
+    trabajos.encolar(db, "notificar", {"ids": [5], "titulo": "...", "mensaje": "..."})
+    await db.commit()
+
+Los consume `python worker.py` (y cada worker de uvicorn si JOBS_IN_PROCESS=1): reclaman lotes
+con SELECT ... FOR UPDATE SKIP LOCKED, de modo que varios consumidores no toman el mismo trabajo.
+Un fallo se reintenta con espera exponencial hasta JOBS_MAX_ATTEMPTS y luego queda `fallido`
+con el error en `ultimo_error`. Si un consumidor muere a mitad, el trabajo se retoma al vencer su
+reserva (JOBS_LEASE_SECONDS).
+
+Los tipos se registran con `@tarea("tipo")`; la función recibe una AsyncSession y los datos, y
+sus escrituras se confirman junto con la marca de completado.
+"""
+import asyncio
+import json
+import logging
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, func, or_, select, update
+
+from config import jobs_conf
+from database import AsyncSessionLocal, get_async_engine
+from models import Trabajo
+from services.event_hub import encode_datos
+
+logger = logging.getLogger(__name__)
+
+_PURGE_EVERY = 600  # segundos entre purgas de trabajos completados
+_METRICAS_MUESTRA = 1000  # trabajos completados recientes usados para la latencia
+
+_tareas = {}
+
+
+def tarea(tipo: str):
+    """Registra la función que ejecuta los trabajos de `tipo`."""
+    def registrar(fn):
+        _tareas[tipo] = fn
+        return fn
+    return registrar
+
+
+def encolar(db, tipo: str, datos: dict, retraso: float = 0) -> Trabajo:
+    """Añade el trabajo a la sesión (síncrona o async); se guarda con el commit del handler."""
+    ahora = datetime.utcnow()
+    trabajo = Trabajo(
+        tipo=tipo, datos=encode_datos(datos), estado="pendiente", intentos=0,
+        disponible_en=ahora + timedelta(seconds=retraso), fecha_creacion=ahora,
+    )
+    db.add(trabajo)
+    return trabajo
+
+
+# -------------------- Consumo --------------------
+def _listos(ahora: datetime):
+    return or_(
+        and_(Trabajo.estado == "pendiente", Trabajo.disponible_en <= ahora),
+        # reclamado por un consumidor que no terminó a tiempo
+        and_(Trabajo.estado == "en-proceso", Trabajo.bloqueado_hasta < ahora),
+    )
+
+
+async def _reclamar() -> list:
+    ahora = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        trabajos = (await db.execute(
+            select(Trabajo)
+            .where(_listos(ahora))
+            .order_by(Trabajo.disponible_en)
+            .limit(jobs_conf.JOBS_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )).scalars().all()
+        for t in trabajos:
+            t.estado = "en-proceso"
+            t.intentos += 1
+            t.fecha_inicio = ahora
+            t.bloqueado_hasta = ahora + timedelta(seconds=jobs_conf.JOBS_LEASE_SECONDS)
+        await db.commit()
+        return [(t.id_trabajo, t.tipo, t.datos, t.intentos) for t in trabajos]
+
+
+def _con_lease(id_trabajo: int, intentos: int):
+    # el intento reclamado identifica el lease: si otro consumidor lo reclamó, `intentos` cambió
+    return and_(Trabajo.id_trabajo == id_trabajo, Trabajo.intentos == intentos, Trabajo.estado == "en-proceso")
+
+
+async def _ejecutar(id_trabajo: int, tipo: str, datos: str, intentos: int):
+    async with AsyncSessionLocal() as db:
+        try:
+            fn = _tareas.get(tipo)
+            if fn is None:
+                raise LookupError(f"Tipo de trabajo desconocido: {tipo}")
+            await fn(db, json.loads(datos))
+            resultado = await db.execute(
+                update(Trabajo).where(_con_lease(id_trabajo, intentos))
+                .values(estado="completado", fecha_fin=datetime.utcnow(), bloqueado_hasta=None, ultimo_error=None)
+            )
+            if resultado.rowcount == 0:
+                # el lease venció y otro consumidor reclamó el trabajo: descartar los efectos
+                await db.rollback()
+                logger.warning("Trabajo %s (%s) perdió el lease (intento %s); se descarta", id_trabajo, tipo, intentos)
+                return
+            await db.commit()
+            return
+        except Exception as exc:
+            await db.rollback()
+            error = repr(exc)[:2000]
+
+        agotado = intentos >= jobs_conf.JOBS_MAX_ATTEMPTS
+        ahora = datetime.utcnow()
+        espera = jobs_conf.JOBS_RETRY_BACKOFF * 2 ** (intentos - 1)
+        if agotado:
+            logger.error("Trabajo %s (%s) fallido tras %s intentos: %s", id_trabajo, tipo, intentos, error)
+        else:
+            logger.warning("Trabajo %s (%s) falló (intento %s), reintento en %.0fs: %s", id_trabajo, tipo, intentos, espera, error)
+        # sin lease no se toca el estado: el trabajo ya es de otro consumidor
+        await db.execute(
+            update(Trabajo).where(_con_lease(id_trabajo, intentos)).values(
+                estado="fallido" if agotado else "pendiente",
+                ultimo_error=error,
+                bloqueado_hasta=None,
+                disponible_en=ahora + timedelta(seconds=espera),
+                fecha_fin=ahora if agotado else None,
+            )
+        )
+        await db.commit()
+
+
+async def procesar_lote() -> int:
+    """Reclama y ejecuta un lote de trabajos listos. Devuelve cuántos reclamó."""
+    reclamados = await _reclamar()
+    for trabajo in reclamados:
+        await _ejecutar(*trabajo)
+    return len(reclamados)
+
+
+async def _purgar():
+    limite = datetime.utcnow() - timedelta(hours=jobs_conf.JOBS_RETENTION_HOURS)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Trabajo).where(Trabajo.estado == "completado", Trabajo.fecha_fin < limite))
+        await db.commit()
+
+
+async def run(stop: asyncio.Event | None = None):
+    """Bucle del consumidor: lotes seguidos mientras haya trabajos, si no espera JOBS_POLL_INTERVAL."""
+    get_async_engine()
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    ultima_purga = 0.0
+    while not stop.is_set():
+        try:
+            procesados = await procesar_lote()
+            if loop.time() - ultima_purga > _PURGE_EVERY:
+                ultima_purga = loop.time()
+                await _purgar()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Error consumiendo trabajos")
+            procesados = 0
+        if not procesados:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=jobs_conf.JOBS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+class Consumidor:
+    """Consumidor dentro de un worker de uvicorn (JOBS_IN_PROCESS=1)."""
+
+    def __init__(self):
+        self._task = None
+        self._stop = None
+
+    def start(self):
+        if self._task is None:
+            self._stop = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(run(self._stop))
+
+    async def stop(self):
+        if self._task is not None:
+            # termina el trabajo en curso; lo no reclamado queda en la tabla
+            self._stop.set()
+            await self._task
+            self._task = None
+
+
+consumidor = Consumidor()
+
+
+# -------------------- Métricas --------------------
+async def metricas() -> dict:
+    """Profundidad de la cola, retraso del trabajo listo más antiguo y latencia de los completados."""
+    ahora = datetime.utcnow()
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        por_estado = (await db.execute(
+            select(Trabajo.tipo, Trabajo.estado, func.count().label("cantidad"))
+            .where(Trabajo.estado != "completado")
+            .group_by(Trabajo.tipo, Trabajo.estado)
+            .order_by(Trabajo.tipo, Trabajo.estado)
+        )).all()
+        mas_antiguo = (await db.execute(
+            select(func.min(Trabajo.disponible_en)).where(_listos(ahora))
+        )).scalar()
+        completados = (await db.execute(
+            select(Trabajo.fecha_creacion, Trabajo.fecha_fin)
+            .where(Trabajo.estado == "completado")
+            .order_by(Trabajo.fecha_fin.desc())
+            .limit(_METRICAS_MUESTRA)
+        )).all()
+    latencias = sorted((c.fecha_fin - c.fecha_creacion).total_seconds() for c in completados)
+    return {
+        "cola": [dict(r._mapping) for r in por_estado],
+        "pendientes": sum(r.cantidad for r in por_estado if r.estado == "pendiente"),
+        "retraso_segundos": (ahora - mas_antiguo).total_seconds() if mas_antiguo else 0,
+        "latencia": {
+            "muestra": len(latencias),
+            "media_segundos": sum(latencias) / len(latencias) if latencias else None,
+            "p95_segundos": latencias[max(0, math.ceil(len(latencias) * 0.95) - 1)] if latencias else None,
+        },
+    }
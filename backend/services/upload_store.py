@@ -0,0 +1,101 @@
+"""Almacén de archivos subidos direccionado por contenido.
+
+Cada archivo se guarda una sola vez como `static/uploads/cas/<2 primeros hex>/<sha256>.<ext>`: el hash
+se calcula mientras se copia el upload por bloques, y si ya existe un archivo con ese contenido se
+reutiliza (subidas idénticas de distintos usuarios ocupan un único archivo en disco y en caché).
+Las variantes redimensionadas se llaman `<sha256>_<variante>.<webp|jpg>` junto al original.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+from io import BytesIO
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from config import media_conf
+from services.image_pipeline import (
+    ALLOWED_FORMATS, STATIC_DIR, copy_limited, probe_format, static_url, submit_variants, variant_paths,
+)
+
+CAS_DIR = STATIC_DIR / "uploads" / "cas"
+
+
+def _path_for(sha: str, fmt: str) -> Path:
+    return CAS_DIR / sha[:2] / f"{sha}{ALLOWED_FORMATS[fmt]}"
+
+
+def _ensure_variants(path: Path, sha: str, sizes: dict | None):
+    if not sizes:
+        return
+    # si el contenido ya existía, sus variantes también (salvo que el proceso anterior fallara)
+    paths = variant_paths(path.parent, sha, sizes)
+    if any(not p.exists() for formats in paths.values() for p in formats.values()):
+        submit_variants(path, sha, sizes)
+
+
+def _commit_temp(tmp: Path, dest: Path) -> Path:
+    if dest.exists():
+        tmp.unlink()  # contenido duplicado: se descarta la copia nueva
+    else:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, dest)
+    return dest
+
+
+def store_upload(src, sizes: dict | None = None) -> str:
+    """Guarda un archivo subido (objeto tipo archivo) y devuelve su URL bajo /static.
+
+    Lanza HTTPException 400/413 si no es una imagen válida o supera el tamaño máximo.
+    """
+    digest = hashlib.sha256()
+    tmp = copy_limited(src, CAS_DIR, digest)
+    try:
+        fmt = probe_format(tmp)
+        sha = digest.hexdigest()
+        path = _commit_temp(tmp, _path_for(sha, fmt))
+    except BaseException:
+        if tmp.exists():
+            tmp.unlink()
+        raise
+    _ensure_variants(path, sha, sizes)
+    return static_url(path)
+
+
+
+_DATA_URL_RE = re.compile(r"^data:image/[\w.+-]+;base64,", re.IGNORECASE)
+
+
+def is_data_url(value) -> bool:
+    return isinstance(value, str) and value[:5].lower() == "data:"
+
+
+def store_data_url(value: str, sizes: dict | None = None) -> str:
+    """Decodifica un data URL base64 de imagen, lo guarda en el almacén y devuelve su URL."""
+    match = _DATA_URL_RE.match(value)
+    if not match:
+        raise HTTPException(status_code=400, detail="Data URL de imagen inválido")
+    payload = value[match.end():]
+    # comprobar el tamaño antes de decodificar (base64 ocupa 4/3 del binario)
+    if len(payload) * 3 // 4 > media_conf.IMAGE_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Imagen demasiado grande")
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Data URL de imagen inválido")
+    return store_upload(BytesIO(data), sizes)
+
+
+def offload_data_url(value, sizes: dict | None = None):
+    """Para campos de imagen que llegan en JSON: si el valor es un data URL lo guarda en el almacén y
+    devuelve la ruta corta; cualquier otro valor se devuelve sin cambios.
+
+    Con IMAGE_DATA_URL_POLICY=reject los data URLs se rechazan con 400.
+    """
+    if not is_data_url(value):
+        return value
+    if media_conf.IMAGE_DATA_URL_POLICY == "reject":
+        raise HTTPException(status_code=400, detail="No se aceptan imágenes embebidas (data URL); usa el endpoint de subida")
+    return store_data_url(value, sizes)
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+
+class TTLCache:
+    """Mapa en memoria con expiración por tiempo (TTL) y desalojo LRU al superar `maxsize`.
+
+    Es seguro entre hilos (los endpoints `def` de FastAPI corren en un threadpool).
+    Cada proceso de uvicorn tiene su propia copia: el TTL acota cuánto puede quedar
+    desactualizada una entrada que otro worker invalidó.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+def invalidate_on_commit(models, callback, attrs=None, collect=None):
+    """Llama a `callback(claves)` tras el commit de una sesión cuyos flushes tocaron `models`.
+
+    Cuentan los objetos creados, eliminados o modificados (con `attrs`, solo si cambió alguno de
+    esos atributos). `claves` es el conjunto de sus clases o, con `collect(obj)`, de lo que devuelva
+    para cada uno; se evalúa en el flush, cuando aún hay historial de cambios. Un rollback las descarta.
+    """
+    key = object()  # entrada propia en session.info
+
+    def modificado(session, obj):
+        if attrs is None:
+            return session.is_modified(obj, include_collections=False)
+        state = inspect(obj).attrs
+        return any(state[a].history.has_changes() for a in attrs)
+
+    def after_flush(session, flush_context):
+        touched = [*session.new, *session.deleted]
+        touched += [obj for obj in session.dirty if isinstance(obj, models) and modificado(session, obj)]
+        claves = set()
+        for obj in touched:
+            if isinstance(obj, models):
+                claves.update(collect(obj) if collect else (type(obj),))
+        if claves:
+            session.info.setdefault(key, set()).update(claves)
+
+    def after_commit(session):
+        claves = session.info.pop(key, None)
+        if claves:
+            callback(claves)
+
+    def after_soft_rollback(session, previous_transaction):
+        session.info.pop(key, None)
+
+    event.listen(Session, "after_flush", after_flush)
+    event.listen(Session, "after_commit", after_commit)
+    event.listen(Session, "after_soft_rollback", after_soft_rollback)
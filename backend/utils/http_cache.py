@@ -0,0 +1,28 @@
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # se comparan sin el prefijo débil W/ (los proxies con compresión lo añaden)
+    return etag.removeprefix("W/") in {t.strip().removeprefix("W/") for t in header.split(",")}
+
+
+def cached_json(request: Request, content, etag: str, max_age: int) -> Response:
+    """Respuesta JSON con ETag y Cache-Control; 304 sin cuerpo si el cliente ya tiene esa versión."""
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=content, headers=headers)
+
+
+def cached_bytes(request: Request, body: bytes, etag: str, cache_control: str, headers: dict | None = None) -> Response:
+    """Como `cached_json` para un cuerpo JSON ya serializado (sin volver a codificarlo)."""
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": cache_control}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
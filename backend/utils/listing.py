@@ -0,0 +1,154 @@
+"""Listados de colecciones: paginación por cursor, filtros permitidos, orden y proyección de campos.
+
+Cada router declara qué se puede filtrar/ordenar y qué columnas nunca se devuelven:
+
+    PRODUCTOS = ListSpec(Producto, filters=("id_proveedor", "estado_producto"), sortable=("precio_producto",))
+
+    @router.get("/")
+    def get_productos(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+        return list_page(db, PRODUCTOS, params, response)
+
+Parámetros de consulta comunes:
+- `limit` / `cursor`: página por keyset; el cursor siguiente va en la cabecera `X-Next-Cursor`.
+- `fields=a,b`: solo esas columnas (se piden así al SELECT, no se recortan después).
+- `sort=campo` o `sort=-campo`: orden por una columna permitida (desempate por la clave primaria).
+- `total=true`: añade la cabecera `X-Total-Count` con el total filtrado (un COUNT extra).
+- `<columna>=valor` para las columnas de `filters`; `valor1,valor2` filtra con IN.
+"""
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+from fastapi import HTTPException, Query, Request, Response
+from sqlalchemy import func, inspect, select
+
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page_query, split_page, set_next_cursor
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+class ListSpec:
+    """Qué expone un listado: columnas visibles, filtros y órdenes permitidos."""
+
+    def __init__(self, model, filters=(), sortable=(), exclude=()):
+        self.model = model
+        mapper = inspect(model)
+        self.pk = getattr(model, mapper.primary_key[0].key)
+        self.columns = {attr.key: getattr(model, attr.key) for attr in mapper.column_attrs if attr.key not in exclude}
+        self.filters = set(filters)
+        # ordenar solo por columnas NOT NULL: el keyset no funciona con NULLs
+        self.sortable = set(sortable) | {self.pk.key}
+
+
+class ListParams:
+    """Dependencia con los parámetros comunes de listado (ver el docstring del módulo)."""
+
+    def __init__(
+        self,
+        request: Request,
+        cursor: Optional[str] = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        fields: Optional[str] = Query(None, description="Columnas separadas por coma"),
+        sort: Optional[str] = Query(None, description="Columna de orden; prefijo '-' para descendente"),
+        total: bool = Query(False, description="Incluir X-Total-Count"),
+    ):
+        self.query_params = request.query_params
+        self.cursor = cursor
+        self.limit = limit
+        self.fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        self.sort = sort
+        self.total = total
+
+
+def _coerce(column, raw: str):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return raw
+    try:
+        if python_type is bool:
+            return raw.lower() in ("1", "true", "yes", "si", "sí")
+        if python_type in (int, Decimal):
+            return python_type(raw)
+        if python_type in (date, datetime, time):
+            return python_type.fromisoformat(raw)
+    except (ValueError, InvalidOperation):
+        raise HTTPException(status_code=400, detail=f"Valor inválido para {column.key}: {raw}")
+    return raw
+
+
+def _filter_values(spec: ListSpec, params: ListParams) -> dict:
+    # solo los filtros permitidos, ya convertidos al tipo de la columna
+    values = {}
+    for name in sorted(spec.filters):
+        raw = params.query_params.get(name)
+        if raw is None or raw == "":
+            continue
+        column = getattr(spec.model, name)
+        values[name] = [_coerce(column, v) for v in raw.split(",")]
+    return values
+
+
+def _conditions(spec: ListSpec, params: ListParams) -> list:
+    conditions = []
+    for name, values in _filter_values(spec, params).items():
+        column = getattr(spec.model, name)
+        conditions.append(column == values[0] if len(values) == 1 else column.in_(values))
+    return conditions
+
+
+def page_key(spec: ListSpec, params: ListParams) -> tuple:
+    """Clave de caché de una página: solo los parámetros que cambian el resultado.
+
+    Los parámetros desconocidos no cuentan, así que no crean entradas nuevas.
+    """
+    filters = tuple((name, tuple(values)) for name, values in _filter_values(spec, params).items())
+    fields = tuple(params.fields) if params.fields else None
+    return (params.cursor, params.limit, fields, params.sort, params.total, filters)
+
+
+def _plan(spec: ListSpec, params: ListParams, where):
+    fields = params.fields or list(spec.columns)
+    unknown = [f for f in fields if f not in spec.columns]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos no permitidos: {', '.join(unknown)}")
+
+    sort_key, descending = spec.pk.key, False
+    if params.sort:
+        descending = params.sort.startswith("-")
+        sort_key = params.sort.lstrip("-")
+        if sort_key not in spec.sortable:
+            raise HTTPException(status_code=400, detail=f"No se puede ordenar por {sort_key}")
+    key_columns = [getattr(spec.model, sort_key)]
+    if sort_key != spec.pk.key:
+        key_columns.append(spec.pk)
+
+    # proyección: solo los campos pedidos + las columnas del cursor
+    selected = [spec.columns[f] for f in fields]
+    selected += [c for c in key_columns if c.key not in fields]
+    conditions = _conditions(spec, params) + list(where)
+    stmt = keyset_page_query(select(*selected).where(*conditions), key_columns, params.cursor, params.limit, descending)
+    count_stmt = select(func.count()).select_from(spec.model).where(*conditions) if params.total else None
+    return stmt, count_stmt, key_columns, fields
+
+
+def _finish(rows, key_columns, fields, params: ListParams, response: Response, total):
+    rows, next_cursor = split_page(rows, key_columns, params.limit)
+    set_next_cursor(response, next_cursor)
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+    return [{f: row._mapping[f] for f in fields} for row in rows]
+
+
+def list_page(db, spec: ListSpec, params: ListParams, response: Response, where=()):
+    """Ejecuta el listado con una Session síncrona. `where` añade condiciones propias del endpoint."""
+    stmt, count_stmt, key_columns, fields = _plan(spec, params, where)
+    total = db.execute(count_stmt).scalar_one() if count_stmt is not None else None
+    return _finish(db.execute(stmt).all(), key_columns, fields, params, response, total)
+
+
+async def list_page_async(db, spec: ListSpec, params: ListParams, response: Response, where=()):
+    """Igual que `list_page` para AsyncSession."""
+    stmt, count_stmt, key_columns, fields = _plan(spec, params, where)
+    total = (await db.execute(count_stmt)).scalar_one() if count_stmt is not None else None
+    return _finish((await db.execute(stmt)).all(), key_columns, fields, params, response, total)
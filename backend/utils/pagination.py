@@ -0,0 +1,115 @@
+import base64
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+# Tamaño de página por defecto y máximo permitido para los listados paginados
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Cabecera donde se devuelve el cursor de la siguiente página (el cuerpo sigue siendo una lista
+# para no romper a los clientes existentes)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _to_json_value(value):
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _from_json_value(column, value):
+    """Convierte un valor del cursor al tipo Python de la columna (fecha, hora, decimal...)."""
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return value
+    if python_type in (date, time, datetime):
+        return python_type.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(value)
+    if python_type is int:
+        return int(value)
+    return value
+
+
+def encode_cursor(values) -> str:
+    """Serializa los valores de la clave de orden de la última fila en un token opaco."""
+    raw = json.dumps([_to_json_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    """Decodifica un cursor generado por `encode_cursor` para las columnas indicadas."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("longitud de cursor inválida")
+        return [_from_json_value(col, v) for col, v in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def keyset_filter(columns, values, descending: bool = False):
+    """Construye la condición "fila posterior al cursor" para un orden compuesto.
+
+    Se expande como (a > x) OR (a = x AND b > y) OR ... en lugar de usar una comparación
+    de tuplas, para que MySQL pueda aprovechar el índice compuesto con un range scan.
+    """
+    clauses = []
+    for i, col in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        step = col < values[i] if descending else col > values[i]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def keyset_page_query(query, columns, cursor: str | None, limit: int, descending: bool):
+    """Orden + filtro de cursor + límite (una fila extra). Vale para Query y para select()."""
+    if cursor:
+        query = query.filter(keyset_filter(columns, decode_cursor(cursor, columns), descending))
+    order = [c.desc() for c in columns] if descending else [c.asc() for c in columns]
+    return query.order_by(*order).limit(limit + 1)
+
+
+def split_page(rows, columns, limit: int):
+    """Recorta la fila extra y devuelve (rows, next_cursor)."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return rows, next_cursor
+
+
+def paginate_keyset(query, columns, cursor: str | None, limit: int, descending: bool = False):
+    """Aplica orden, filtro de cursor y límite a `query`.
+
+    Devuelve `(rows, next_cursor)`; `next_cursor` es None cuando no hay más páginas.
+    Se pide una fila extra para saber si existe una página siguiente sin hacer un COUNT.
+    """
+    rows = keyset_page_query(query, columns, cursor, limit, descending).all()
+    return split_page(rows, columns, limit)
+
+
+async def paginate_keyset_async(db, stmt, columns, cursor: str | None, limit: int, descending: bool = False, scalars: bool = False):
+    """Igual que `paginate_keyset` para un `select()` ejecutado con AsyncSession.
+
+    Con `scalars=True` devuelve entidades ORM en lugar de filas (útil para `select(Modelo)`).
+    """
+    result = await db.execute(keyset_page_query(stmt, columns, cursor, limit, descending))
+    rows = result.scalars().all() if scalars else result.all()
+    return split_page(rows, columns, limit)
+
+
+def set_next_cursor(response: Response, next_cursor: str | None):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
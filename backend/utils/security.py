@@ -1,44 +1,154 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
 from passlib.context import CryptContext
 from passlib.exc import UnknownHashError
 from datetime import datetime, timedelta
 from jose import jwt  # asegúrate de que sea python-jose instalado: pip install "python-jose[cryptography]"
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+from config import security_conf
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=security_conf.ARGON2_TIME_COST,
+    argon2__memory_cost=security_conf.ARGON2_MEMORY_COST,
+    argon2__parallelism=security_conf.ARGON2_PARALLELISM,
+)
 
 SECRET_KEY = "tu_clave_secreta_aqui"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-# 🔒 Hashear contraseña
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
 
-# 🔑 Verificar contraseña
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a stored hash.
+# -------------------- Executor de hashing --------------------
+class HashMetrics:
+    """Operaciones de hashing: tiempo en cola, tiempo de CPU y rechazos por saturación."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.queue_total = 0.0
+        self.queue_max = 0.0
+        self.run_total = 0.0
+
+    def record(self, queued: float, ran: float):
+        with self._lock:
+            self.completed += 1
+            self.queue_total += queued
+            self.queue_max = max(self.queue_max, queued)
+            self.run_total += ran
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": security_conf.HASH_WORKERS,
+                "max_pending": security_conf.HASH_MAX_PENDING,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_avg_ms": round(self.queue_total / done * 1000, 3),
+                "queue_max_ms": round(self.queue_max * 1000, 3),
+                "run_avg_ms": round(self.run_total / done * 1000, 3),
+            }
+
+
+hash_metrics = HashMetrics()
+
+_hash_executor = ThreadPoolExecutor(max_workers=security_conf.HASH_WORKERS, thread_name_prefix="argon2")
+_pending = threading.BoundedSemaphore(security_conf.HASH_MAX_PENDING)
+_ACQUIRE_POLL = 0.01  # segundos entre intentos de las llamadas async con la cola llena
+
+
+def _timed_call(enqueued_at: float, fn, args):
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        hash_metrics.record(started - enqueued_at, time.perf_counter() - started)
+        _pending.release()
+
+
+def _submit(fn, *args):
+    if not _pending.acquire(timeout=security_conf.HASH_QUEUE_TIMEOUT):
+        hash_metrics.reject()
+        raise HTTPException(status_code=503, detail="Servidor ocupado, intenta de nuevo")
+    return _hash_executor.submit(_timed_call, time.perf_counter(), fn, args)
+
+
+async def _submit_async(fn, *args):
+    # el cupo se espera en el propio loop, sin acquire bloqueante en un hilo: si la corrutina se
+    # cancela mientras espera no queda un permiso tomado y no se ocupa el executor por defecto
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + security_conf.HASH_QUEUE_TIMEOUT
+    while not _pending.acquire(blocking=False):
+        if loop.time() >= deadline:
+            hash_metrics.reject()
+            raise HTTPException(status_code=503, detail="Servidor ocupado, intenta de nuevo")
+        await asyncio.sleep(_ACQUIRE_POLL)
+    # entre el acquire y el submit no hay await: el permiso lo libera siempre _timed_call
+    return await asyncio.wrap_future(_hash_executor.submit(_timed_call, time.perf_counter(), fn, args))
 
-    - If `hashed_password` is falsy (None/empty) return False.
+
+# -------------------- Contraseñas --------------------
+def _verify_and_update(plain_password: str, hashed_password: str):
+    """Devuelve (válida, hash_nuevo). `hash_nuevo` no es None cuando hay que regenerar el hash
+    almacenado: parámetros de argon2 distintos a los configurados o contraseña legacy en texto plano.
+
+    - If `hashed_password` is falsy (None/empty) return (False, None).
     - If passlib cannot identify the hash, fall back to a safe plaintext
       comparison only when the stored value doesn't look like a hash
       (no '$' separator). This supports legacy rows that accidentally
-      stored plaintext. Return False otherwise.
+      stored plaintext.
     """
     if not hashed_password:
-        return False
+        return False, None
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        return pwd_context.verify_and_update(plain_password, hashed_password)
     except UnknownHashError:
         # Stored value isn't a recognizable hash. As a last resort,
         # allow plaintext comparison for legacy rows that contain
         # un-hashed passwords (this is temporary and not recommended).
-        # Detect likely hash values by presence of '$'. If absent,
-        # compare directly and return the result.
-        try:
-            if isinstance(hashed_password, str) and "$" not in hashed_password:
-                return plain_password == hashed_password
-        except Exception:
-            pass
-        return False
+        if isinstance(hashed_password, str) and "$" not in hashed_password and plain_password == hashed_password:
+            return True, pwd_context.hash(plain_password)
+        return False, None
+
+
+# 🔒 Hashear contraseña (en el executor dedicado; la llamada espera el resultado)
+def hash_password(password: str) -> str:
+    return _submit(pwd_context.hash, password).result()
+
+
+# 🔑 Verificar contraseña
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return verify_and_update_password(plain_password, hashed_password)[0]
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Verifica y, si corresponde, devuelve el hash regenerado para guardarlo (rehash-on-login)."""
+    if not hashed_password:
+        return False, None
+    return _submit(_verify_and_update, plain_password, hashed_password).result()
+
+
+# Variantes para endpoints `async def`
+async def hash_password_async(password: str) -> str:
+    return await _submit_async(pwd_context.hash, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+    if not hashed_password:
+        return False, None
+    return await _submit_async(_verify_and_update, plain_password, hashed_password)
+
 
 # 🎟️ Crear token JWT
 def create_access_token(data: dict, expires_delta: int = ACCESS_TOKEN_EXPIRE_MINUTES):
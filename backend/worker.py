@@ -0,0 +1,31 @@
+"""Consumidor de la cola de trabajos en segundo plano (services/trabajos.py).
+
+Uso (desde backend/):  python worker.py
+
+Se pueden ejecutar varios a la vez; con JOBS_IN_PROCESS=0 los workers de uvicorn solo encolan.
+SIGINT/SIGTERM terminan el trabajo en curso y salen; lo pendiente queda en la tabla.
+"""
+import asyncio
+import logging
+import signal
+
+from database import get_async_engine
+from services import trabajos
+# registra los tipos de trabajo
+from services import notificaciones  # noqa: F401
+
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await trabajos.run(stop)
+    finally:
+        await get_async_engine().dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main())
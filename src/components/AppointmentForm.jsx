@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from "react";
 import axios from "axios";
+import { getTodas } from "../utils/paginacion";
 import { useAuth } from "../context/AuthContext";
 import { useAlert } from "../context/AlertContext";
 import Swal from "sweetalert2";
@@ -45,12 +46,12 @@ const AppointmentModal = ({ servicio, onClose }) => {
       if (!user) return;
       try {
         const headers = { Authorization: `Bearer ${user.token}` };
-        const [mascRes, servRes] = await Promise.all([
+        const [mascRes, todosServicios] = await Promise.all([
           axios.get("http://localhost:8000/mascotas/mis-mascotas", { headers }),
-          axios.get("http://localhost:8000/servicios/", { headers }),
+          getTodas("http://localhost:8000/servicios/", { headers }),
         ]);
         setMisMascotas(Array.isArray(mascRes.data) ? mascRes.data : []);
-        setServicios(Array.isArray(servRes.data) ? servRes.data : []);
+        setServicios(todosServicios);
         // obtener métodos de pago del usuario para elegir
         try {
           const metRes = await axios.get("http://localhost:8000/metodo_pago/", { headers });
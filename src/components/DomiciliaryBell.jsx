@@ -1,6 +1,7 @@
 import React, { useEffect, useState, useRef } from "react";
 import { FiBell } from "react-icons/fi";
 import axios from "axios";
+import { getTodas } from "../utils/paginacion";
 import { useAuth } from "../context/AuthContext";
 import Swal from "sweetalert2";
 
@@ -10,6 +11,13 @@ export default function DomiciliaryBell() {
   const [open, setOpen] = useState(false);
   const ref = useRef();
 
+  // pedidos del domicilio según su despacho (/despacho): libres para reclamar o en manos de este domiciliario
+  const disponibles = (dom) => (dom.pedidos || []).filter((p) => p.estado_despacho === "disponible");
+  const mios = (dom, estado) => (dom.pedidos || []).filter(
+    (p) => Number(p.id_domiciliario) === Number(user?.id_usuario) && (estado ? p.estado_despacho === estado : ["reclamado", "en-ruta"].includes(p.estado_despacho))
+  );
+  const visible = (dom) => dom.estado_domicilio !== "Entregado" && dom.estado_domicilio !== "Cancelado" && (disponibles(dom).length > 0 || mios(dom).length > 0);
+
   useEffect(() => {
     const onDocClick = (e) => {
       if (ref.current && !ref.current.contains(e.target)) setOpen(false);
@@ -23,37 +31,71 @@ export default function DomiciliaryBell() {
     const fetchPedidos = async () => {
       if (!user?.token) return;
       try {
-        // Poll domicilios (new domicilios should notify domiciliario)
-        const res = await axios.get("http://localhost:8000/domicilios/", { headers: { Authorization: `Bearer ${user.token}` } });
-        const all = Array.isArray(res.data) ? res.data : [];
-        // filter to domicilios relevant for domiciliario: Pendiente or En-entrega
-        // The DB schema does not include an `id_domiciliario`, so show all pending/en-entrega items
-        const relevant = all.filter(d => (d.estado_domicilio === "Pendiente" || d.estado_domicilio === "En-entrega"));
-        setItems(relevant);
+        // domicilios relevantes para el domiciliario: Pendiente o En-entrega (filtro en el servidor)
+        const relevant = await getTodas("http://localhost:8000/domicilios/", {
+          headers: { Authorization: `Bearer ${user.token}` },
+          params: { estado_domicilio: "Pendiente,En-entrega" },
+        });
+        setItems(relevant.filter(visible));
       } catch (err) {
         console.error("Error fetching domiciliary domicilios", err);
       }
     };
+    if (!user?.token) return;
     fetchPedidos();
-    const iv = setInterval(fetchPedidos, 15000); // poll every 15s
-    return () => clearInterval(iv);
+
+    // en lugar de consultar cada 15s, el backend empuja los domicilios nuevos o que cambian de estado (SSE).
+    // EventSource reconecta solo y envía Last-Event-ID para recibir lo que se perdió.
+    const source = new EventSource(`http://localhost:8000/eventos/stream?token=${encodeURIComponent(user.token)}`);
+    // `domicilio`: nuevo o con otro estado; `despacho`: alguien reclamó, liberó o entregó uno de sus pedidos
+    const onCambio = async (e) => {
+      const evento = JSON.parse(e.data);
+      if (evento.id_domicilio) await refrescar(evento.id_domicilio);
+    };
+    source.addEventListener("domicilio", onCambio);
+    source.addEventListener("despacho", onCambio);
+    // demasiados eventos perdidos: recargar la lista completa
+    source.addEventListener("reset", fetchPedidos);
+    return () => source.close();
   }, [user]);
 
-  const updateEstado = async (domicilio, nuevoEstado) => {
+  // detalle con pedidos, productos y despacho; se quita si ya no es reclamable ni propio
+  const refrescar = async (id) => {
+    try {
+      const res = await axios.get(`http://localhost:8000/domicilios/${id}`, { headers: { Authorization: `Bearer ${user.token}` } });
+      setItems(prev => [...prev.filter(p => (p.id_domicilio || p.id) !== id), ...(visible(res.data) ? [res.data] : [])]);
+    } catch (err) {
+      if (err?.response?.status === 404) setItems(prev => prev.filter(p => (p.id_domicilio || p.id) !== id));
+      else console.error("Error fetching domicilio", err);
+    }
+  };
+
+  // reclamar, recoger y entregar van por /despacho: el pedido y el domicilio cambian juntos
+  const despachar = async (domicilio, accion) => {
     if (!user?.token) return;
+    const headers = { Authorization: `Bearer ${user.token}` };
+    const id = domicilio.id_domicilio || domicilio.id;
     try {
-      await axios.put(`http://localhost:8000/domicilios/${domicilio.id_domicilio || domicilio.id}`, { estado_domicilio: nuevoEstado }, { headers: { Authorization: `Bearer ${user.token}` } });
-      setItems(prev => prev.filter(p => (p.id_domicilio || p.id) !== (domicilio.id_domicilio || domicilio.id)));
+      if (accion === "reclamar") {
+        const res = await axios.post("http://localhost:8000/despacho/reclamar", null, { headers, params: { id_domicilio: id } });
+        if (!res.data || res.data.length === 0) Swal.fire('Aviso', 'Otro domiciliario tomó este domicilio', 'info');
+      } else {
+        const estado = accion === "entregar" ? "en-ruta" : "reclamado";
+        for (const p of mios(domicilio, estado)) {
+          await axios.post(`http://localhost:8000/despacho/${p.id_pedido}/${accion}`, null, { headers });
+        }
+      }
+      await refrescar(id);
     } catch (err) {
       console.error("Error updating domicilio status", err);
-      Swal.fire('Error', 'No se pudo actualizar el estado del domicilio', 'error');
+      Swal.fire('Error', err?.response?.data?.detail || 'No se pudo actualizar el estado del domicilio', 'error');
     }
   };
 
   const handleCancel = async (domicilio) => {
     if (!user?.token) return;
     const headers = { Authorization: `Bearer ${user.token}` };
-    // send notification to admin about domicilio cancellation (no motivo)
+    // el domiciliario no cancela el domicilio: avisa al administrador, que lo cancela desde su panel
     try {
       await axios.post(
         "http://localhost:8000/notificaciones/",
@@ -65,17 +107,10 @@ export default function DomiciliaryBell() {
         },
         { headers }
       );
+      Swal.fire("Enviado", "Se notificó al administrador para cancelar el domicilio", "success");
     } catch (err) {
       console.error("Error enviando notificación al admin", err);
-      Swal.fire("Aviso", "No se pudo notificar al administrador, se marcará como cancelado localmente", "warning");
-    }
-
-    // then mark domicilio as Cancelado
-    try {
-      await updateEstado(domicilio, "Cancelado");
-      Swal.fire("Cancelado", "Domicilio marcado como cancelado y se notificó al administrador", "success");
-    } catch (err) {
-      console.error("Error actualizando estado del domicilio", err);
+      Swal.fire("Error", "No se pudo notificar al administrador", "error");
     }
   };
 
@@ -109,12 +144,18 @@ export default function DomiciliaryBell() {
                     <div className="text-sm text-gray-700 mt-1"><strong>Productos:</strong> {productos.slice(0,3).join(', ')}{productos.length>3? '...':''}</div>
                   )}
                   <div className="mt-2 flex gap-2">
-                    {(d.estado_domicilio === 'Pendiente' || !d.estado_domicilio) && (
-                      <button onClick={() => updateEstado(d, 'En-entrega')} className="px-2 py-1 bg-blue-600 text-white rounded text-sm">Marcar en proceso</button>
+                    {mios(d).length === 0 && (
+                      <button onClick={() => despachar(d, 'reclamar')} className="px-2 py-1 bg-blue-600 text-white rounded text-sm">Aceptar</button>
+                    )}
+                    {mios(d, 'reclamado').length > 0 && (
+                      <>
+                        <button onClick={() => despachar(d, 'recoger')} className="px-2 py-1 bg-blue-600 text-white rounded text-sm">Marcar en proceso</button>
+                        <button onClick={() => despachar(d, 'liberar')} className="px-2 py-1 bg-gray-200 rounded text-sm">Liberar</button>
+                      </>
                     )}
-                    {d.estado_domicilio === 'En-entrega' && (
+                    {mios(d, 'en-ruta').length > 0 && (
                       <>
-                        <button onClick={() => updateEstado(d, 'Entregado')} className="px-2 py-1 bg-green-600 text-white rounded text-sm">Marcar entregado</button>
+                        <button onClick={() => despachar(d, 'entregar')} className="px-2 py-1 bg-green-600 text-white rounded text-sm">Marcar entregado</button>
                         <button onClick={() => handleCancel(d)} className="px-2 py-1 bg-red-500 text-white rounded text-sm">Cancelar</button>
                       </>
                     )}
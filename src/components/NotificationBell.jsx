@@ -8,6 +8,8 @@ import MessageThread from "./MessageThread";
 export default function NotificationBell() {
   const { user } = useAuth();
   const [notifs, setNotifs] = useState([]);
+  const [unreadCount, setUnreadCount] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [open, setOpen] = useState(false);
   const ref = useRef();
   const [threadCita, setThreadCita] = useState(null);
@@ -24,27 +26,62 @@ export default function NotificationBell() {
     return () => document.removeEventListener("click", onDocClick);
   }, [user]);
 
+  useEffect(() => {
+    if (!user?.token) return;
+    // notificaciones nuevas empujadas por el backend (SSE); EventSource reconecta solo con Last-Event-ID
+    const source = new EventSource(`http://localhost:8000/eventos/stream?token=${encodeURIComponent(user.token)}`);
+    source.addEventListener("notificacion", (e) => {
+      const nueva = JSON.parse(e.data);
+      // los envíos masivos llegan sin id_notificacion: se muestran sin deduplicar
+      setNotifs(prev => [nueva, ...prev.filter(n => !nueva.id_notificacion || n.id_notificacion !== nueva.id_notificacion)]);
+      if (!nueva.leida) setUnreadCount(c => c + 1);
+    });
+    // demasiados eventos perdidos: recargar la lista completa
+    source.addEventListener("reset", fetchNotifs);
+    return () => source.close();
+  }, [user]);
+
   const fetchNotifs = async () => {
     if (!user?.token) return;
     try {
-      const res = await axios.get("http://localhost:8000/notificaciones/", { headers: { Authorization: `Bearer ${user.token}` } });
+      const headers = { Authorization: `Bearer ${user.token}` };
+      // contador y primera página de la bandeja (las más recientes)
+      const [res, countRes] = await Promise.all([
+        axios.get("http://localhost:8000/notificaciones/", { headers }),
+        axios.get("http://localhost:8000/notificaciones/no-leidas", { headers }),
+      ]);
       setNotifs(Array.isArray(res.data) ? res.data : []);
+      setNextCursor(res.headers["x-next-cursor"] || null);
+      setUnreadCount(countRes.data?.no_leidas || 0);
     } catch (err) {
       // If unauthorized, do not spam console with errors; handle silently or show minimal debug.
       if (err?.response?.status === 401) {
         console.debug('Notificaciones: token inválido o expirado (401)');
         setNotifs([]);
+        setUnreadCount(0);
         return;
       }
       console.error("Error fetching notifications", err);
     }
   };
 
+  const fetchMore = async () => {
+    if (!user?.token || !nextCursor) return;
+    try {
+      const res = await axios.get("http://localhost:8000/notificaciones/", {
+        headers: { Authorization: `Bearer ${user.token}` },
+        params: { cursor: nextCursor },
+      });
+      setNotifs(prev => [...prev, ...(Array.isArray(res.data) ? res.data : [])]);
+      setNextCursor(res.headers["x-next-cursor"] || null);
+    } catch (err) {
+      console.error("Error fetching notifications", err);
+    }
+  };
+
   // NOTE: 'Marcar como leída' feature removed per product request.
   // Notifications are shown as information only and are not marked read from this UI.
 
-  const unreadCount = notifs.filter((n) => !n.leida).length;
-
   return (
     <div className="relative" ref={ref}>
       <button onClick={() => setOpen((v) => !v)} className="relative p-2 rounded-full hover:bg-white/10">
@@ -89,6 +126,9 @@ export default function NotificationBell() {
             )}
           </div>
           <div className="p-2 text-center">
+            {nextCursor && (
+              <button onClick={fetchMore} className="text-sm text-[#7a8358] mr-4">Ver más</button>
+            )}
             <button onClick={fetchNotifs} className="text-sm text-[#7a8358]">Actualizar</button>
           </div>
         </div>
@@ -1,5 +1,7 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import axios from "axios";
+import { getTodas } from "../utils/paginacion";
+import { nuevaClaveIdempotencia } from "../utils/idempotencia";
 import { useAuth } from "../context/AuthContext";
 import { useAlert } from "../context/AlertContext";
 import Swal from "sweetalert2";
@@ -10,6 +12,9 @@ export default function PaymentModal({ onClose, cart = [], onPaymentSuccess }) {
   const { clearCart } = useCart();
   const { showAlert } = useAlert();
 
+  // misma Idempotency-Key mientras se reintenta un pago sin respuesta (timeout, red caída)
+  const idempotencyKey = useRef(null);
+
   const [metodosExistentes, setMetodosExistentes] = useState([]);
   const [metodoSeleccionado, setMetodoSeleccionado] = useState(null);
   const [showCrearNuevo, setShowCrearNuevo] = useState(false);
@@ -82,9 +87,11 @@ export default function PaymentModal({ onClose, cart = [], onPaymentSuccess }) {
     const fetchDomicilios = async () => {
       if (!user) return;
       try {
-        const res = await axios.get("http://localhost:8000/domicilios/", { headers: { Authorization: `Bearer ${user.token}` } });
-        // Filter to this user's domicilios (backend may return all)
-        const mine = (res.data || []).filter(d => d.id_usuario === user.id_usuario || d.id_usuario === user.id || d.id_usuario === user?.id_usuario);
+        // solo los domicilios de este usuario (filtro en el servidor)
+        const mine = await getTodas("http://localhost:8000/domicilios/", {
+          headers: { Authorization: `Bearer ${user.token}` },
+          params: { id_usuario: user.id_usuario || user.id },
+        });
         setSavedDomicilios(mine);
       } catch (err) {
         console.error('Error cargando domicilios:', err);
@@ -134,11 +141,12 @@ export default function PaymentModal({ onClose, cart = [], onPaymentSuccess }) {
         return;
       }
 
-      // Llamar al endpoint atómico /checkout para crear pedido, detalles y recibo en una única operación
+      // Llamar al endpoint atómico /checkout para crear pedido, detalles y recibo en una única operación.
+      // Los precios los calcula el servidor; `total` solo sirve para detectar si cambiaron (409)
       const payload = {
         id_metodo_pago: metodoSeleccionado,
         total,
-        items: cart.map((it) => ({ id_producto: it.id_producto, cantidad: it.cantidad, subtotal: Number(it.precio_producto) * Number(it.cantidad) })),
+        items: cart.map((it) => ({ id_producto: it.id_producto, cantidad: it.cantidad })),
         // si el usuario seleccionó una dirección guardada, enviar solo el id + campos editables
         domicilio: selectedSavedDomicilioId ? {
           id_domicilio: selectedSavedDomicilioId,
@@ -152,8 +160,10 @@ export default function PaymentModal({ onClose, cart = [], onPaymentSuccess }) {
         },
       };
 
-      const headers = user ? { Authorization: `Bearer ${user.token}` } : {};
+      if (!idempotencyKey.current) idempotencyKey.current = nuevaClaveIdempotencia();
+      const headers = user ? { Authorization: `Bearer ${user.token}`, 'Idempotency-Key': idempotencyKey.current } : {};
       const res = await axios.post("http://localhost:8000/checkout/", payload, { headers });
+      idempotencyKey.current = null;
 
       const pedido = res.data.pedido;
       const reciboData = res.data.recibo;
@@ -164,7 +174,16 @@ export default function PaymentModal({ onClose, cart = [], onPaymentSuccess }) {
       if (onPaymentSuccess) onPaymentSuccess(pedido, reciboData);
     } catch (err) {
       console.error("Error en el flujo de pago:", err);
-      showAlert({ type: 'error', message: 'No se pudo procesar el pago. Revisa la consola para más detalles.' });
+      // con respuesta del servidor el pedido no se creó: el próximo intento usa una clave nueva
+      if (err?.response) idempotencyKey.current = null;
+      const detail = err?.response?.data?.detail;
+      if (err?.response?.status === 409 || err?.response?.status === 400) {
+        // precio cambiado, producto agotado o datos inválidos: mostrar el motivo del servidor
+        const message = typeof detail === 'string' ? detail : `${detail?.mensaje} (total actual: $${detail?.total})`;
+        showAlert({ type: 'error', message });
+      } else {
+        showAlert({ type: 'error', message: 'No se pudo procesar el pago. Revisa la consola para más detalles.' });
+      }
     } finally {
       setLoading(false);
     }
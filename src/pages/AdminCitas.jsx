@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import axios from "axios";
+import { getTodas } from "../utils/paginacion";
 import { useAuth } from "../context/AuthContext";
 import { motion } from "framer-motion";
 
@@ -14,8 +15,7 @@ export default function AdminCitas() {
     setLoading(true);
     try {
       const headers = user ? { Authorization: `Bearer ${user.token}` } : {};
-      const res = await axios.get("http://localhost:8000/citas/", { headers });
-      setCitas(Array.isArray(res.data) ? res.data : []);
+      setCitas(await getTodas("http://localhost:8000/citas/", { headers }));
     } catch (err) {
       console.error(err);
     } finally { setLoading(false); }
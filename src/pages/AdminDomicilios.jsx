@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from "react";
 import axios from "axios";
+import { getTodas } from "../utils/paginacion";
 import { useAuth } from "../context/AuthContext";
 import Swal from "sweetalert2";
 
@@ -23,13 +24,11 @@ export default function AdminDomicilios() {
     setLoading(true);
     try {
       const headers = user ? { Authorization: `Bearer ${user.token}` } : {};
-      const [dRes, nRes] = await Promise.all([
-        axios.get("http://localhost:8000/domicilios/", { headers }),
+      const [rawD, nRes] = await Promise.all([
+        getTodas("http://localhost:8000/domicilios/", { headers }),
         axios.get("http://localhost:8000/notificaciones/", { headers }),
       ]);
 
-      const rawD = Array.isArray(dRes.data) ? dRes.data : [];
-
       const enriched = await Promise.all(
         rawD.map(async (d) => {
           const copy = { ...d };
@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import axios from "axios";
+import { getTodas } from "../utils/paginacion";
 import { useAuth } from "../context/AuthContext";
 import { motion } from "framer-motion";
 
@@ -25,8 +26,7 @@ export default function AdminProducts() {
 
   const fetchProductos = async () => {
     try {
-      const res = await axios.get("http://localhost:8000/productos/");
-      setProductos(Array.isArray(res.data) ? res.data : []);
+      setProductos(await getTodas("http://localhost:8000/productos/"));
     } catch (err) {
       console.error(err);
     }
@@ -34,8 +34,7 @@ export default function AdminProducts() {
 
   const fetchProveedores = async () => {
     try {
-      const res = await axios.get("http://localhost:8000/proveedores/");
-      setProveedores(Array.isArray(res.data) ? res.data : []);
+      setProveedores(await getTodas("http://localhost:8000/proveedores/"));
     } catch (err) {
       console.error(err);
     }
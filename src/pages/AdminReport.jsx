@@ -6,10 +6,11 @@ import { motion } from "framer-motion";
 export default function AdminReport() {
   const { user } = useAuth();
   const [loading, setLoading] = useState(true);
+  const [resumen, setResumen] = useState(null);
   const [productos, setProductos] = useState([]);
   const [servicios, setServicios] = useState([]);
-  const [usuarios, setUsuarios] = useState([]);
-  const [proveedores, setProveedores] = useState([]);
+  // cursores de la siguiente página de cada tabla de detalle (null = no hay más)
+  const [cursors, setCursors] = useState({ productos: null, servicios: null });
 
   useEffect(() => {
     fetchAll();
@@ -18,17 +19,21 @@ export default function AdminReport() {
   const fetchAll = async () => {
     setLoading(true);
     try {
-      const [pRes, sRes, uRes, provRes] = await Promise.all([
-        axios.get("http://localhost:8000/productos/"),
-        axios.get("http://localhost:8000/servicios/"),
-        axios.get("http://localhost:8000/usuarios/"),
-        axios.get("http://localhost:8000/proveedores/"),
+      // los totales llegan ya agregados; las tablas de detalle se piden por páginas
+      const headers = { Authorization: `Bearer ${user?.token}` };
+      const [rRes, pRes, sRes] = await Promise.all([
+        axios.get("http://localhost:8000/reportes/", { headers }),
+        axios.get("http://localhost:8000/reportes/productos", { headers, params: { limit: 50 } }),
+        axios.get("http://localhost:8000/reportes/servicios", { headers, params: { limit: 50 } }),
       ]);
 
+      setResumen(rRes.data);
       setProductos(Array.isArray(pRes.data) ? pRes.data : []);
       setServicios(Array.isArray(sRes.data) ? sRes.data : []);
-      setUsuarios(Array.isArray(uRes.data) ? uRes.data : []);
-      setProveedores(Array.isArray(provRes.data) ? provRes.data : []);
+      setCursors({
+        productos: pRes.headers["x-next-cursor"] || null,
+        servicios: sRes.headers["x-next-cursor"] || null,
+      });
     } catch (err) {
       console.error("Error fetching report data", err);
     } finally {
@@ -36,15 +41,31 @@ export default function AdminReport() {
     }
   };
 
-  // Aggregates
-  const totalProductosActivos = productos.filter(p => p.estado_producto === "en-stock").length;
-  const totalServiciosActivos = servicios.filter(s => (s.estado_servicio || "").toLowerCase() === "activo").length;
-  const totalEmprendedores = usuarios.filter(u => u.id_rol === 2).length;
-  const totalClientes = usuarios.filter(u => u.id_rol === 4).length;
+  const cargarMas = async (tabla) => {
+    if (!cursors[tabla]) return;
+    try {
+      const headers = { Authorization: `Bearer ${user?.token}` };
+      const res = await axios.get(`http://localhost:8000/reportes/${tabla}`, {
+        headers,
+        params: { limit: 50, cursor: cursors[tabla] },
+      });
+      const rows = Array.isArray(res.data) ? res.data : [];
+      if (tabla === "productos") setProductos(prev => [...prev, ...rows]);
+      else setServicios(prev => [...prev, ...rows]);
+      setCursors(prev => ({ ...prev, [tabla]: res.headers["x-next-cursor"] || null }));
+    } catch (err) {
+      console.error(`Error cargando más ${tabla}`, err);
+    }
+  };
 
-  // Helper maps
-  const proveedorMap = Object.fromEntries(proveedores.map(pr => [pr.id_proveedor, pr.nombre_compania]));
-  const usuarioMap = Object.fromEntries(usuarios.map(u => [u.id_usuario, u]));
+  // Aggregates
+  const cantidadPor = (filas, campo, valor) =>
+    (filas || []).filter(f => String(f[campo] || "").toLowerCase() === valor).reduce((acc, f) => acc + f.cantidad, 0);
+  const totalProductosActivos = cantidadPor(resumen?.productos_por_estado, "estado", "en-stock");
+  const totalServiciosActivos = cantidadPor(resumen?.servicios_por_estado, "estado", "activo");
+  const totalEmprendedores = (resumen?.usuarios_por_rol || []).filter(r => r.id_rol === 2).reduce((acc, r) => acc + r.cantidad, 0);
+  const totalClientes = (resumen?.usuarios_por_rol || []).filter(r => r.id_rol === 4).reduce((acc, r) => acc + r.cantidad, 0);
+  const totalPagado = Number(resumen?.ingresos?.total_pagado || 0);
 
   return (
     <section className="min-h-screen bg-[#f5f3ee] py-12 px-6 md:px-16">
@@ -74,6 +95,30 @@ export default function AdminReport() {
           </div>
         </div>
 
+        <div className="grid grid-cols-1 md:grid-cols-3 gap-4 mb-6">
+          <div className="p-4 bg-green-50 rounded shadow-sm">
+            <h4 className="text-sm text-gray-600">Ingresos pagados</h4>
+            <p className="text-2xl font-bold text-[#7a8358]">${totalPagado.toFixed(2)}</p>
+            <p className="text-xs text-gray-500">{resumen?.conteos?.pedidos ?? 0} pedidos • {resumen?.conteos?.recibos ?? 0} recibos</p>
+          </div>
+          <div className="p-4 bg-green-50 rounded shadow-sm">
+            <h4 className="text-sm text-gray-600">Usuarios por región</h4>
+            <ul className="text-sm text-[#4e5932]">
+              {(resumen?.usuarios_por_region || []).map(r => (
+                <li key={r.id_region}>{r.nombre_region}: {r.cantidad}</li>
+              ))}
+            </ul>
+          </div>
+          <div className="p-4 bg-green-50 rounded shadow-sm">
+            <h4 className="text-sm text-gray-600">Usuarios por ciudad</h4>
+            <ul className="text-sm text-[#4e5932]">
+              {(resumen?.usuarios_por_ciudad || []).map(c => (
+                <li key={c.id_ciudad}>{c.nombre_ciudad}: {c.cantidad}</li>
+              ))}
+            </ul>
+          </div>
+        </div>
+
         <hr className="my-6" />
 
         <h2 className="text-xl font-semibold text-[#7a8358] mb-3">2️⃣ Detalle de productos</h2>
@@ -95,11 +140,16 @@ export default function AdminReport() {
                   <td className="px-3 py-2">{p.categoria_producto}</td>
                   <td className="px-3 py-2">${Number(p.precio_producto).toFixed(2)}</td>
                   <td className="px-3 py-2">{p.estado_producto}</td>
-                  <td className="px-3 py-2">{proveedorMap[p.id_proveedor] || '-'}</td>
+                  <td className="px-3 py-2">{p.nombre_compania || '-'}</td>
                 </tr>
               ))}
             </tbody>
           </table>
+          {cursors.productos && (
+            <button onClick={() => cargarMas("productos")} className="mt-3 px-4 py-2 bg-gray-200 rounded-full hover:bg-gray-300">
+              Cargar más
+            </button>
+          )}
         </div>
 
         <hr className="my-6" />
@@ -125,10 +175,10 @@ export default function AdminReport() {
                   <td className="px-3 py-2">${Number(s.precio_servicio || 0).toFixed(2)}</td>
                   <td className="px-3 py-2">{s.estado_servicio}</td>
                   <td className="px-3 py-2">
-                    {usuarioMap[s.id_usuario] ? (
+                    {s.nombre_usuario ? (
                       <div>
-                        <div className="font-semibold">{usuarioMap[s.id_usuario].nombre_usuario} {usuarioMap[s.id_usuario].apellido_usuario}</div>
-                        <div className="text-sm text-gray-600">{usuarioMap[s.id_usuario].correo_usuario} • {usuarioMap[s.id_usuario].telefono_usuario}</div>
+                        <div className="font-semibold">{s.nombre_usuario} {s.apellido_usuario}</div>
+                        <div className="text-sm text-gray-600">{s.correo_usuario} • {s.telefono_usuario}</div>
                       </div>
                     ) : (
                       '-'
@@ -145,6 +195,11 @@ export default function AdminReport() {
               ))}
             </tbody>
           </table>
+          {cursors.servicios && (
+            <button onClick={() => cargarMas("servicios")} className="mt-3 px-4 py-2 bg-gray-200 rounded-full hover:bg-gray-300">
+              Cargar más
+            </button>
+          )}
         </div>
 
       </div>
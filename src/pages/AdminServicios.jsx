@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import axios from "axios";
+import { getTodas } from "../utils/paginacion";
 import { useAuth } from "../context/AuthContext";
 import { motion } from "framer-motion";
 
@@ -13,8 +14,7 @@ export default function AdminServicios() {
 
   const fetchServicios = async () => {
     try {
-      const res = await axios.get("http://localhost:8000/servicios/");
-      setServicios(Array.isArray(res.data) ? res.data : []);
+      setServicios(await getTodas("http://localhost:8000/servicios/"));
     } catch (err) { console.error(err); }
   };
 
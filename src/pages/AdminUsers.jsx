@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import axios from "axios";
+import { getTodas } from "../utils/paginacion";
 import { useAuth } from "../context/AuthContext";
 import { motion } from "framer-motion";
 import { FaEdit, FaExchangeAlt } from "react-icons/fa";
@@ -34,9 +35,9 @@ export default function AdminUsers() {
   });
 
   const fetchUsuarios = () => {
-    axios
-      .get("http://localhost:8000/usuarios")
-      .then((res) => setUsuarios(res.data))
+    // la búsqueda es local: se cargan todas las páginas del listado
+    getTodas("http://localhost:8000/usuarios/")
+      .then(setUsuarios)
       .catch((err) => console.error(err));
   };
 
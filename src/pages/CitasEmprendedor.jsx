@@ -2,6 +2,7 @@ import { useEffect, useState } from "react";
 import axios from "axios";
 import { useAuth } from "../context/AuthContext";
 import Swal from "sweetalert2";
+import { getTodas } from "../utils/paginacion";
 
 export default function CitasEmprendedor() {
   const { user } = useAuth();
@@ -15,8 +16,8 @@ export default function CitasEmprendedor() {
   const fetchCitas = async () => {
     setLoading(true);
     try {
-      const res = await axios.get("http://localhost:8000/citas/owner", { headers: { Authorization: `Bearer ${user?.token}` } });
-      const all = Array.isArray(res.data) ? res.data : [];
+      // el endpoint pagina por fecha: se recorren todas las páginas para no perder las próximas citas
+      const all = await getTodas("http://localhost:8000/citas/owner", { headers: { Authorization: `Bearer ${user?.token}` } });
       setCitas(all);
     } catch (err) {
       console.error(err);
@@ -6,147 +6,148 @@ import { useAlert } from "../context/AlertContext";
 
 const Domiciliary = () => {
   const [pedidos, setPedidos] = useState([]);
-  const [asignados, setAsignados] = useState([]);
   const [loading, setLoading] = useState(false);
   const [selectedPedido, setSelectedPedido] = useState(null);
-  const [modalRequire, setModalRequire] = useState(false);
-  const [modalPaid, setModalPaid] = useState(false);
-  const [modalPaymentType, setModalPaymentType] = useState("Efectivo");
+  const [lugares, setLugares] = useState({ regiones: {}, ciudades: {} });
   const { user } = useAuth();
   const { showAlert } = useAlert();
+  const authHeaders = user?.token ? { Authorization: `Bearer ${user.token}` } : undefined;
 
-  
+  // `pedidos` del domicilio son siempre de este domiciliario (/despacho/mios); `disponible` si está en una ruta
+  const disponibles = (dom) => (dom.disponible ? [dom] : []);
+  const mios = (dom, estado) => (dom.pedidos || []).filter(
+    (p) => (estado ? p.estado_despacho === estado : ["reclamado", "en-ruta"].includes(p.estado_despacho))
+  );
+
+  // nombres de región y ciudad (catálogos pequeños, una vez)
+  useEffect(() => {
+    Promise.all([
+      axios.get("http://localhost:8000/ubicaciones/regiones"),
+      axios.get("http://localhost:8000/ubicaciones/ciudades"),
+    ])
+      .then(([regRes, citiesRes]) => setLugares({
+        regiones: Object.fromEntries((regRes.data || []).map(r => [r.id_region, r.nombre_region])),
+        ciudades: Object.fromEntries((citiesRes.data || []).map(c => [c.id_ciudad, c.nombre_ciudad])),
+      }))
+      .catch((error) => console.error("Error al cargar ubicaciones:", error));
+  }, []);
+
+  // 🟢 Panel desde /despacho: lo asignado a este domiciliario y las paradas libres de las rutas
+  const cargarPanel = async () => {
+    const [miosRes, rutasRes] = await Promise.all([
+      axios.get("http://localhost:8000/despacho/mios", { headers: authHeaders }),
+      axios.get("http://localhost:8000/despacho/rutas", { headers: authHeaders }),
+    ]);
+
+    const porDomicilio = new Map();
+    for (const p of miosRes.data || []) {
+      const dom = porDomicilio.get(p.id_domicilio) || {
+        id_domicilio: p.id_domicilio,
+        id_usuario: p.id_usuario,
+        direccion_completa: p.direccion_completa,
+        codigo_postal: p.codigo_postal,
+        id_ciudad: p.id_ciudad,
+        id_region: p.id_region,
+        pedidos: [],
+      };
+      dom.pedidos.push(p);
+      porDomicilio.set(p.id_domicilio, dom);
+    }
+    for (const ruta of rutasRes.data || []) {
+      for (const parada of ruta.paradas || []) {
+        const dom = porDomicilio.get(parada.id_domicilio);
+        if (dom) {
+          dom.disponible = true;
+        } else {
+          porDomicilio.set(parada.id_domicilio, {
+            ...parada,
+            id_ciudad: ruta.id_ciudad,
+            id_region: ruta.id_region,
+            id_ruta: ruta.id_ruta,
+            disponible: true,
+            pedidos: [],
+          });
+        }
+      }
+    }
+    return [...porDomicilio.values()];
+  };
 
-  // mapa cache para productos por id
-  const productCache = {};
+  // vuelve a leer el panel tras reclamar, recoger, entregar o liberar
+  const refrescarPanel = async () => {
+    const domicilios = await cargarPanel();
+    setPedidos(domicilios);
+    setSelectedPedido((sel) => {
+      if (!sel) return null;
+      const actual = domicilios.find((d) => d.id_domicilio === sel.id_domicilio);
+      return actual ? { ...actual, productos: sel.productos } : null;
+    });
+  };
 
-  // 🟢 Cargar pedidos desde el backend
   useEffect(() => {
     const fetchPedidos = async () => {
       try {
         setLoading(true);
-        const token = user?.token;
-        // ahora listamos domicilios (según nueva petición)
-        const res = await axios.get("http://localhost:8000/domicilios/", {
-          headers: token ? { Authorization: `Bearer ${token}` } : undefined,
-        });
-        const domiciliosRaw = res.data || [];
-
-        // Cargar regiones y ciudades para mostrar nombres
-        const [regRes, citiesRes] = await Promise.all([
-          axios.get("http://localhost:8000/ubicaciones/regiones"),
-          axios.get("http://localhost:8000/ubicaciones/ciudades"),
-        ]);
-        const regionesMap = Object.fromEntries((regRes.data || []).map(r => [r.id_region, r.nombre_region]));
-        const ciudadesMap = Object.fromEntries((citiesRes.data || []).map(c => [c.id_ciudad, c.nombre_ciudad]));
-
-        // enriquecer cada domicilio con el usuario y nombres de region/ciudad
-        const domiciliosEnriquecidos = await Promise.all(
-          domiciliosRaw.map(async (dom) => {
-            let usuario = null;
-            try {
-              const uRes = await axios.get(`http://localhost:8000/usuarios/${dom.id_usuario}`);
-              usuario = uRes.data;
-            } catch (err) {
-              usuario = { nombre_usuario: "Desconocido", apellido_usuario: "", correo_usuario: "-" };
-            }
-
-            return {
-              ...dom,
-              id: dom.id_domicilio || dom.id,
-              usuario,
-              region: regionesMap[dom.id_region] || null,
-              ciudad: ciudadesMap[dom.id_ciudad] || null,
-            };
-          })
-        );
-
-        setPedidos(domiciliosEnriquecidos);
+        setPedidos(await cargarPanel());
       } catch (error) {
         console.error("Error al cargar pedidos:", error);
       } finally {
         setLoading(false);
       }
     };
-    fetchPedidos();
+    if (user?.token) fetchPedidos();
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [user]);
 
-  // Mostrar únicamente pedidos reales obtenidos de la base de datos (creados por usuarios registrados)
-  // Excluir pedidos que ya fueron entregados o cancelados para que no aparezcan en el panel del domiciliario
-  const displayPedidos = (pedidos || []).filter(p => !(p.estado_domicilio === 'Entregado' || p.estado_domicilio === 'Cancelado'));
+  const displayPedidos = pedidos || [];
 
-  const openModal = (pedido) => {
-    setSelectedPedido(pedido);
-    setModalRequire(!!pedido.requiereConfirmacion);
-    setModalPaid(!!pedido.pagado);
-    setModalPaymentType(pedido.tipoPago || "Efectivo");
-    setEstadoDomicilio(pedido.estado_domicilio || pedido.estado || "Pendiente");
+  // los productos solo se piden al abrir el detalle de un domicilio
+  const openModal = async (dom) => {
+    setSelectedPedido(dom);
+    try {
+      const res = await axios.get(`http://localhost:8000/domicilios/${dom.id_domicilio}`, { headers: authHeaders });
+      const productos = (res.data.pedidos || []).flatMap((p) => p.productos || []);
+      setSelectedPedido((sel) => (sel && sel.id_domicilio === dom.id_domicilio ? { ...sel, productos } : sel));
+    } catch (err) {
+      console.error("Error cargando el detalle del domicilio", err);
+    }
   };
 
-  const [estadoDomicilio, setEstadoDomicilio] = useState("Pendiente");
-
-  const updateEstadoDomicilio = async (domicilioId, nuevoEstado) => {
+  // reclamar los pedidos disponibles del domicilio: quedan reservados a este domiciliario
+  const reclamarDomicilio = async (dom) => {
     try {
-      const token = user?.token;
-      const res = await axios.put(
-        `http://localhost:8000/domicilios/${domicilioId}`,
-        { estado_domicilio: nuevoEstado },
-        { headers: token ? { Authorization: `Bearer ${token}` } : undefined }
-      );
-
-      // actualizar estado en la lista y en el modal
-      setPedidos((prev) => prev.map((d) => (d.id_domicilio === domicilioId || d.id === domicilioId ? { ...d, estado_domicilio: nuevoEstado } : d)));
-      setSelectedPedido((s) => ({ ...s, estado_domicilio: nuevoEstado }));
-      try { showAlert({ type: 'success', message: 'Estado del domicilio actualizado' }); } catch(e){}
+      const res = await axios.post("http://localhost:8000/despacho/reclamar", null, {
+        headers: authHeaders,
+        params: { id_domicilio: dom.id_domicilio },
+      });
+      if (!res.data || res.data.length === 0) {
+        try { showAlert({ type: 'error', message: 'Otro domiciliario tomó este domicilio.' }); } catch(e){}
+      } else {
+        try { showAlert({ type: 'success', message: 'Domicilio reclamado' }); } catch(e){}
+      }
+      await refrescarPanel();
     } catch (err) {
-      console.error("Error actualizando estado del domicilio", err);
-      try { showAlert({ type: 'error', message: 'No se pudo actualizar el estado del domicilio.' }); } catch(e){}
+      console.error("Error reclamando el domicilio", err);
+      try { showAlert({ type: 'error', message: err?.response?.data?.detail || 'No se pudo reclamar el domicilio.' }); } catch(e){}
     }
   };
-  const updatePedidoEstado = async (pedidoId, nuevoEstado) => {
-    try {
-      const token = user?.token;
-      await axios.put(
-        `http://localhost:8000/pedidos/${pedidoId}`,
-        { estado_pedido: nuevoEstado },
-        { headers: token ? { Authorization: `Bearer ${token}` } : undefined }
-      );
 
-      // refrescar lista localmente
-      setPedidos((prev) =>
-        prev.map((p) =>
-          (p.id_pedido === pedidoId || p.id === pedidoId)
-            ? { ...p, estado_pedido: nuevoEstado }
-            : p
-        )
-      );
-      if (selectedPedido && (selectedPedido.id_pedido === pedidoId || selectedPedido.id === pedidoId)) {
-        setSelectedPedido((s) => ({ ...s, estado_pedido: nuevoEstado }));
+  // recoger | entregar | liberar los pedidos propios del domicilio que están en `estado`
+  const accionDespacho = async (dom, accion, estado, mensaje) => {
+    try {
+      for (const p of mios(dom, estado)) {
+        await axios.post(`http://localhost:8000/despacho/${p.id_pedido}/${accion}`, null, { headers: authHeaders });
       }
+      try { showAlert({ type: 'success', message: mensaje }); } catch(e){}
+      await refrescarPanel();
     } catch (err) {
-      console.error("Error actualizando estado del pedido", err);
-      try { showAlert({ type: 'error', message: 'No se pudo actualizar el estado del pedido.' }); } catch(e){}
+      console.error(`Error en ${accion}`, err);
+      try { showAlert({ type: 'error', message: err?.response?.data?.detail || 'No se pudo actualizar el domicilio.' }); } catch(e){}
     }
   };
 
-  const handleAceptar = (pedido) => {
-    // Guardar info de pago/aceptación
-    setAsignados([
-      ...asignados,
-      {
-        ...pedido,
-        pagado: modalPaid,
-        tipoPago: modalPaymentType,
-        requiereConfirmacion: modalRequire,
-      },
-    ]);
-
-    // Eliminar pedido aceptado del listado
-    setPedidos((prev) => prev.filter((p) => (p.id_pedido || p.id) !== (pedido.id_pedido || pedido.id)));
-
-    setSelectedPedido(null);
-  };
+  // estado mostrado en tarjeta y modal según el despacho de los pedidos propios
+  const estadoPanel = (dom) => (mios(dom, "en-ruta").length > 0 ? "En-entrega" : "Pendiente");
 
   return (
     <section className="relative min-h-screen overflow-hidden font-[Poppins] text-[#33461e] bg-[#f3f6ef] py-10">
@@ -169,18 +170,10 @@ const Domiciliary = () => {
               {displayPedidos && displayPedidos.length > 0 ? (
                 displayPedidos.map((pedido) => {
                   const display = {
-                    id: pedido.id_pedido || pedido.id,
-                    cliente:
-                      (pedido.usuario && `${pedido.usuario.nombre_usuario || ''} ${pedido.usuario.apellido_usuario || ''}`.trim()) ||
-                      pedido.cliente ||
-                      (pedido.usuario && pedido.usuario.correo_usuario) ||
-                      "Cliente desconocido",
-                    direccion: pedido.direccion_completa || (pedido.domicilio ? `${pedido.domicilio.direccion_completa}` : null) || (pedido.usuario && (pedido.usuario.direccion_usuario || pedido.usuario.correo_usuario)) || pedido.direccion || "-",
-                    productos: (
-                      (pedido.pedidos && pedido.pedidos.flatMap((pp) => (pp.productos || []).map((pr) => pr.nombre_producto || pr.nombre || pr)))
-                      || (pedido.productos ? pedido.productos.map((p) => p.nombre || p) : pedido.productos || [])
-                    ),
-                    estado_domicilio: pedido.estado_domicilio || pedido.estado || null,
+                    id: pedido.id_domicilio,
+                    direccion: pedido.direccion_completa || "-",
+                    productos: pedido.pedidos.length > 0 ? pedido.pedidos.map((p) => `Pedido #${p.id_pedido}`) : null,
+                    estado_domicilio: estadoPanel(pedido),
                   };
 
                   return (
@@ -211,16 +204,14 @@ const Domiciliary = () => {
             <div className="relative bg-white rounded-2xl shadow-2xl p-6 md:p-8 w-full max-w-3xl z-10">
               <div className="flex items-start justify-between gap-4">
                 <div>
-                  <h3 className="text-2xl font-bold text-[#2f4f20]">Detalle Domicilio #{selectedPedido.id_domicilio || selectedPedido.id}</h3>
+                  <h3 className="text-2xl font-bold text-[#2f4f20]">Detalle Domicilio #{selectedPedido.id_domicilio}</h3>
                   <p className="text-sm text-gray-500 mt-1">Información del domicilio y acciones rápidas para domiciliarios.</p>
                 </div>
 
                 <div className="flex items-center gap-3">
-                  {selectedPedido.estado_domicilio && (
-                    <span className={`inline-block px-3 py-1 rounded-full text-sm font-semibold ${selectedPedido.estado_domicilio === 'Entregado' ? 'bg-green-100 text-green-800' : selectedPedido.estado_domicilio === 'En-entrega' ? 'bg-yellow-100 text-yellow-800' : selectedPedido.estado_domicilio === 'Cancelado' ? 'bg-red-100 text-red-800' : 'bg-gray-100 text-gray-800'}`}>
-                      {selectedPedido.estado_domicilio}
-                    </span>
-                  )}
+                  <span className={`inline-block px-3 py-1 rounded-full text-sm font-semibold ${estadoPanel(selectedPedido) === 'En-entrega' ? 'bg-yellow-100 text-yellow-800' : 'bg-gray-100 text-gray-800'}`}>
+                    {estadoPanel(selectedPedido)}
+                  </span>
 
                   <button onClick={() => setSelectedPedido(null)} className="text-gray-600 hover:text-gray-800">Cerrar ✕</button>
                 </div>
@@ -228,14 +219,9 @@ const Domiciliary = () => {
 
               <div className="mt-5 grid grid-cols-1 md:grid-cols-2 gap-6 text-gray-700">
                 <div className="space-y-3">
-                  <div>
-                    <div className="text-xs text-gray-500">Cliente</div>
-                    <div className="font-medium text-gray-800">{(selectedPedido.usuario && `${selectedPedido.usuario.nombre_usuario || ''} ${selectedPedido.usuario.apellido_usuario || ''}`.trim()) || selectedPedido.usuario?.correo_usuario || 'Cliente desconocido'}</div>
-                  </div>
-
                   <div>
                     <div className="text-xs text-gray-500">Dirección</div>
-                    <div className="text-sm text-gray-800">{selectedPedido.direccion_completa || (selectedPedido.domicilio && selectedPedido.domicilio.direccion_completa) || '-'}</div>
+                    <div className="text-sm text-gray-800">{selectedPedido.direccion_completa || '-'}</div>
                   </div>
 
                   <div className="flex gap-4">
@@ -245,7 +231,7 @@ const Domiciliary = () => {
                     </div>
                     <div>
                       <div className="text-xs text-gray-500">Región / Ciudad</div>
-                      <div className="text-sm text-gray-800">{(selectedPedido.region && selectedPedido.region.nombre_region) || selectedPedido.id_region || '-'} / {(selectedPedido.ciudad && selectedPedido.ciudad.nombre_ciudad) || selectedPedido.id_ciudad || '-'}</div>
+                      <div className="text-sm text-gray-800">{lugares.regiones[selectedPedido.id_region] || selectedPedido.id_region || '-'} / {lugares.ciudades[selectedPedido.id_ciudad] || selectedPedido.id_ciudad || '-'}</div>
                     </div>
                   </div>
                 </div>
@@ -254,34 +240,20 @@ const Domiciliary = () => {
                   <div>
                     <div className="text-xs text-gray-500">Productos a entregar</div>
                     <ul className="list-disc list-inside ml-3 mt-2 text-sm text-gray-700 max-h-40 overflow-auto">
-                      {(selectedPedido.pedidos || []).flatMap(p => p.productos || []).map((prod, i) => (
+                      {(selectedPedido.productos || []).map((prod, i) => (
                         <li key={i}>{prod.nombre_producto || prod.nombre || prod}</li>
                       ))}
                     </ul>
                   </div>
 
                   <div>
-                    <div className="text-xs text-gray-500">Estado del domicilio</div>
-                    <div className="mt-2 flex items-center gap-3">
-                      <select
-                        value={estadoDomicilio}
-                        onChange={(e) => setEstadoDomicilio(e.target.value)}
-                        className="border rounded p-2 bg-white"
-                        disabled={user?.id_rol !== 3}
-                      >
-                        <option value="Pendiente">Pendiente</option>
-                        <option value="En-entrega">En-entrega</option>
-                        <option value="Cancelado">Cancelado</option>
-                      </select>
-
-                      {user?.id_rol === 3 && (
-                        <button
-                          onClick={() => updateEstadoDomicilio(selectedPedido.id_domicilio || selectedPedido.id, estadoDomicilio)}
-                          className="px-4 py-2 bg-gradient-to-r from-[#2f8a3a] to-[#276428] text-white rounded-lg hover:from-[#2a7a33] hover:to-[#205522]"
-                        >
-                          Guardar
-                        </button>
-                      )}
+                    <div className="text-xs text-gray-500">Despacho</div>
+                    <div className="mt-2 text-sm text-gray-700">
+                      {mios(selectedPedido, "en-ruta").length > 0
+                        ? "En ruta contigo"
+                        : mios(selectedPedido, "reclamado").length > 0
+                          ? "Reclamado por ti: recógelo antes de que venza la reserva"
+                          : "Disponible"}
                     </div>
                   </div>
                 </div>
@@ -294,14 +266,38 @@ const Domiciliary = () => {
                 >
                   Cerrar
                 </button>
-                {user?.id_rol === 3 && (
+                {user?.id_rol === 3 && mios(selectedPedido).length === 0 && disponibles(selectedPedido).length > 0 && (
                   <button
-                    onClick={() => { handleAceptar(selectedPedido); setSelectedPedido(null); }}
+                    onClick={() => reclamarDomicilio(selectedPedido)}
                     className="px-4 py-2 bg-blue-600 text-white rounded-lg hover:bg-blue-700"
                   >
                     Aceptar pedido
                   </button>
                 )}
+                {user?.id_rol === 3 && mios(selectedPedido, "reclamado").length > 0 && (
+                  <>
+                    <button
+                      onClick={() => accionDespacho(selectedPedido, "liberar", "reclamado", "Domicilio liberado")}
+                      className="px-4 py-2 bg-red-100 text-red-700 rounded-lg hover:bg-red-200"
+                    >
+                      Liberar
+                    </button>
+                    <button
+                      onClick={() => accionDespacho(selectedPedido, "recoger", "reclamado", "Domicilio en entrega")}
+                      className="px-4 py-2 bg-blue-600 text-white rounded-lg hover:bg-blue-700"
+                    >
+                      Recoger
+                    </button>
+                  </>
+                )}
+                {user?.id_rol === 3 && mios(selectedPedido, "en-ruta").length > 0 && (
+                  <button
+                    onClick={() => accionDespacho(selectedPedido, "entregar", "en-ruta", "Domicilio entregado")}
+                    className="px-4 py-2 bg-gradient-to-r from-[#2f8a3a] to-[#276428] text-white rounded-lg hover:from-[#2a7a33] hover:to-[#205522]"
+                  >
+                    Marcar entregado
+                  </button>
+                )}
               </div>
             </div>
           </div>
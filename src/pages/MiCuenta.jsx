@@ -34,7 +34,8 @@ export default function MiCuenta() {
   const [showPetModal, setShowPetModal] = useState(false);
   const [mascotas, setMascotas] = useState([]);
   const [metodosPago, setMetodosPago] = useState([]);
-  const [servicios, setServicios] = useState([]);
+  // cursores de la siguiente página de cada sección de /cuenta/ (null = no hay más)
+  const [cuentaCursors, setCuentaCursors] = useState({ citas: null, pedidos: null });
 
   const [paymentForm, setPaymentForm] = useState({
     tipo_metodo: "",
@@ -178,10 +179,10 @@ export default function MiCuenta() {
     if (!user) return;
     try {
       const headers = { Authorization: `Bearer ${user.token}` };
-      const res = await axios.get("http://localhost:8000/citas/", { headers });
-      // filtrar solo las citas del usuario actual
-      const misCitas = res.data.filter(c => c.id_usuario === user.id_usuario);
-      setCitas(misCitas);
+      // /cuenta/ ya devuelve solo las citas del usuario actual
+      const res = await axios.get("http://localhost:8000/cuenta/?secciones=citas", { headers });
+      setCitas(res.data.citas.items);
+      setCuentaCursors(prev => ({ ...prev, citas: res.data.citas.next_cursor }));
     } catch (err) {
       console.error('Error al cargar citas:', err);
     }
@@ -205,21 +206,12 @@ export default function MiCuenta() {
       setLoading(true);
       try {
         const headers = { Authorization: `Bearer ${user.token}` };
-        const [pedRes, recRes, citasRes, servRes] = await Promise.all([
-          axios.get("http://localhost:8000/pedidos/", { headers }),
-          axios.get("http://localhost:8000/recibos/", { headers }),
-          axios.get("http://localhost:8000/citas/", { headers }),
-          axios.get("http://localhost:8000/servicios/", { headers })
-        ]);
-        setPedidos(Array.isArray(pedRes.data) ? pedRes.data : []);
-        setRecibos(Array.isArray(recRes.data) ? recRes.data : []);
-        setServicios(Array.isArray(servRes.data) ? servRes.data : []);
-        // filtrar solo las citas del usuario actual
-        const misCitas = Array.isArray(citasRes.data) 
-          ? citasRes.data.filter(c => c.id_usuario === user.id_usuario)
-          : [];
-        console.log("Citas cargadas:", misCitas); // Debug
-        setCitas(misCitas);
+        // una sola llamada con las citas, pedidos (con detalles y recibos) y recibos del usuario
+        const res = await axios.get("http://localhost:8000/cuenta/", { headers });
+        setPedidos(res.data.pedidos.items);
+        setRecibos(res.data.recibos.items);
+        setCitas(res.data.citas.items);
+        setCuentaCursors({ citas: res.data.citas.next_cursor, pedidos: res.data.pedidos.next_cursor });
 
         // traer mascotas también
         await fetchMascotas();
@@ -234,6 +226,25 @@ export default function MiCuenta() {
     fetchData();
   }, [user]);
 
+  // Cargar la siguiente página de una sección (citas o pedidos)
+  const cargarMas = async (seccion) => {
+    const cursor = cuentaCursors[seccion];
+    if (!user || !cursor) return;
+    try {
+      const headers = { Authorization: `Bearer ${user.token}` };
+      const res = await axios.get("http://localhost:8000/cuenta/", {
+        headers,
+        params: { secciones: seccion, [`${seccion}_cursor`]: cursor },
+      });
+      const page = res.data[seccion];
+      if (seccion === 'citas') setCitas(prev => [...prev, ...page.items]);
+      else setPedidos(prev => [...prev, ...page.items]);
+      setCuentaCursors(prev => ({ ...prev, [seccion]: page.next_cursor }));
+    } catch (err) {
+      console.error(`Error cargando más ${seccion}:`, err);
+    }
+  };
+
   // Crear método de pago
   const handleCreateMetodoPago = async () => {
     if (!user) { await Swal.fire('Inicia sesión', 'Debes iniciar sesión', 'warning'); return; }
@@ -550,9 +561,6 @@ export default function MiCuenta() {
           ) : (
             <div className="space-y-4">
               {citas.map((cita) => {
-                const mascota = mascotas.find(m => m.id_mascota === cita.id_mascota);
-                const servicio = servicios?.find(s => s.id_servicio === cita.id_servicio);
-                console.log("Cita data:", cita); // Debug
                 return (
                   <div
                     key={cita.id_cita}
@@ -564,10 +572,10 @@ export default function MiCuenta() {
                           Cita #{cita.id_cita}
                         </h3>
                         <p className="text-indigo-700">
-                          Mascota: {mascota?.nombre_mascota || 'No disponible'}
+                          Mascota: {cita.nombre_mascota || 'No disponible'}
                         </p>
                         <p className="text-indigo-700">
-                          Servicio: {servicio?.tipo_servicio || 'No disponible'}
+                          Servicio: {cita.tipo_servicio || 'No disponible'}
                         </p>
                         <p className="text-indigo-700">
                           Fecha: {new Date(cita.fecha_cita).toLocaleDateString()}
@@ -611,6 +619,14 @@ export default function MiCuenta() {
               })}
             </div>
           )}
+          {cuentaCursors.citas && (
+            <button
+              onClick={() => cargarMas('citas')}
+              className="mt-4 px-4 py-2 bg-gray-200 rounded-full hover:bg-gray-300"
+            >
+              Cargar más
+            </button>
+          )}
         </section>
 
         {/* Pedidos */}
@@ -625,7 +641,7 @@ export default function MiCuenta() {
           ) : (
             <div className="space-y-4">
               {pedidos.map((p) => {
-                const pedidoRecibo = recibos.find(
+                const pedidoRecibo = p.recibos?.[0] || recibos.find(
                   (r) => r.id_pedido === p.id_pedido
                 );
                 return (
@@ -651,39 +667,19 @@ export default function MiCuenta() {
                     <div className="flex items-center gap-3">
                       {pedidoRecibo ? (
                         <button
-                          onClick={async () => {
-                            try {
-                              // obtener detalles y productos para mostrar precio por producto
-                              const headers = user ? { Authorization: `Bearer ${user.token}` } : {};
-                              const [detRes, prodRes] = await Promise.all([
-                                axios.get('http://localhost:8000/detalle_pedido/', { headers }),
-                                axios.get('http://localhost:8000/productos/', { headers })
-                              ]);
-                              const detalles = Array.isArray(detRes.data) ? detRes.data : [];
-                              const productos = Array.isArray(prodRes.data) ? prodRes.data : [];
-                              const items = detalles
-                                .filter(d => d.id_pedido === p.id_pedido)
-                                .map(d => {
-                                  const prod = productos.find(x => x.id_producto === d.id_producto) || {};
-                                  return {
-                                    id_detalle: d.id_detalle_pedido,
-                                    id_producto: d.id_producto,
-                                    nombre_producto: prod.nombre_producto || 'Producto',
-                                    precio_unitario: prod.precio_producto ? Number(prod.precio_producto) : (d.subtotal ? Number(d.subtotal) : 0),
-                                    cantidad: d.cantidad,
-                                    subtotal: Number(d.subtotal)
-                                  };
-                                });
-
-                              // attach items to the recibo object for the modal
-                              setSelectedRecibo({ ...pedidoRecibo, items, pedido: p });
-                              setShowReciboModal(true);
-                            } catch (err) {
-                              console.error('Error cargando detalles del recibo', err);
-                              // fallback: mostrar recibo sin detalles
-                              setSelectedRecibo(pedidoRecibo);
-                              setShowReciboModal(true);
-                            }
+                          onClick={() => {
+                            // las líneas del pedido ya vienen en /cuenta/ (con nombre y precio del producto)
+                            const items = (p.detalles || []).map(d => ({
+                              id_detalle: d.id_detalle_pedido,
+                              id_producto: d.id_producto,
+                              nombre_producto: d.nombre_producto || 'Producto',
+                              precio_unitario: d.precio_producto ? Number(d.precio_producto) : (d.subtotal ? Number(d.subtotal) : 0),
+                              cantidad: d.cantidad,
+                              subtotal: Number(d.subtotal)
+                            }));
+                            // attach items to the recibo object for the modal
+                            setSelectedRecibo({ ...pedidoRecibo, items, pedido: p });
+                            setShowReciboModal(true);
                           }}
                           className="px-4 py-2 bg-[#7A8358] text-white rounded-full"
                         >
@@ -700,6 +696,14 @@ export default function MiCuenta() {
               })}
             </div>
           )}
+          {cuentaCursors.pedidos && (
+            <button
+              onClick={() => cargarMas('pedidos')}
+              className="mt-4 px-4 py-2 bg-gray-200 rounded-full hover:bg-gray-300"
+            >
+              Cargar más
+            </button>
+          )}
         </section>
 
         {/* Modal Recibo */}
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from "react";
-import axios from "axios";
+import { getTodas } from "../utils/paginacion";
 import { useAuth } from "../context/AuthContext";
 import { motion } from "framer-motion";
 
@@ -12,9 +12,8 @@ export default function MisEntregas() {
     const fetchEntregas = async () => {
       try {
         setLoading(true);
-        const res = await axios.get("http://localhost:8000/domicilios/");
-        const all = Array.isArray(res.data) ? res.data : [];
-        const entregados = all.filter(d => d.estado_domicilio === 'Entregado');
+        // filtro en el servidor y todas las páginas del listado
+        const entregados = await getTodas("http://localhost:8000/domicilios/", { params: { estado_domicilio: "Entregado" } });
         setEntregas(entregados);
       } catch (err) {
         console.error('Error fetching entregas', err);
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from "react";
-import axios from "axios";
+import { getTodas } from "../utils/paginacion";
 import { useCart } from "../context/CartContext";
 import PaymentModal from "../components/PaymentModal";
 import ReceiptToast from "../components/ReceiptToast";
@@ -309,9 +309,8 @@ const Products = () => {
   useEffect(() => {
     const fetchProductos = async () => {
       try {
-        const res = await axios.get("http://localhost:8000/productos/");
-        console.log("Productos recibidos:", res.data);
-        setProductos(res.data);
+        const todos = await getTodas("http://localhost:8000/productos/");
+        setProductos(todos);
       } catch (err) {
         console.error("Error al cargar productos:", err);
       } finally {
@@ -1,6 +1,7 @@
 import { useEffect, useState, useRef } from "react";
 import { useLocation } from 'react-router-dom';
 import axios from "axios";
+import { getTodas } from "../utils/paginacion";
 import { useAuth } from "../context/AuthContext";
 import { useNavigate } from "react-router-dom";
 
@@ -29,9 +30,9 @@ export default function ProveedorProducts() {
 
   const fetchProductos = async () => {
     try {
-      const res = await axios.get("http://localhost:8000/productos/");
-      const all = Array.isArray(res.data) ? res.data : [];
-      const mine = all.filter(p => p.id_proveedor === user?.id_proveedor);
+      if (!user?.id_proveedor) return setProductos([]);
+      // filtro por proveedor en el servidor y todas las páginas del listado
+      const mine = await getTodas("http://localhost:8000/productos/", { params: { id_proveedor: user.id_proveedor } });
       setProductos(mine);
     } catch (err) {
       console.error(err);
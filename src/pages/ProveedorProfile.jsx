@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import axios from 'axios';
+import { getTodas } from "../utils/paginacion";
 import { useAuth } from '../context/AuthContext';
 
 export default function ProveedorProfile() {
@@ -40,10 +41,10 @@ export default function ProveedorProfile() {
     const fetch = async () => {
       try {
         const headers = { Authorization: `Bearer ${user.token}` };
-        const [provRes, statsRes, prodRes] = await Promise.all([
+        const [provRes, statsRes, mine] = await Promise.all([
           axios.get(`http://localhost:8000/proveedores/${user.id_proveedor}`, { headers }),
           axios.get(`http://localhost:8000/proveedores/${user.id_proveedor}/stats`, { headers }),
-          axios.get('http://localhost:8000/productos/', { headers })
+          getTodas('http://localhost:8000/productos/', { headers, params: { id_proveedor: user.id_proveedor } })
         ]);
         setProvider(provRes.data);
         setForm({
@@ -52,8 +53,6 @@ export default function ProveedorProfile() {
           correo_proveedor: provRes.data.correo_proveedor || '',
           direccion_contacto: provRes.data.direccion_contacto || ''
         });
-  const all = Array.isArray(prodRes.data) ? prodRes.data : [];
-  const mine = all.filter(p => p.id_proveedor === user.id_proveedor);
   setProviderProducts(mine);
   setProductCount(statsRes.data.total_products || mine.length);
   setActiveCount(statsRes.data.active_products || mine.filter(p => p.estado_producto !== 'retirado').length);
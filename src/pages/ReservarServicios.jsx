@@ -1,5 +1,7 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import axios from "axios";
+import { getTodas } from "../utils/paginacion";
+import { nuevaClaveIdempotencia } from "../utils/idempotencia";
 import { useAuth } from "../context/AuthContext";
 import { useAlert } from "../context/AlertContext";
 import Swal from "sweetalert2";
@@ -8,6 +10,8 @@ import { useNavigate } from "react-router-dom";
 export default function ReservarServicios() {
   const { user } = useAuth();
   const navigate = useNavigate();
+  // misma Idempotency-Key mientras se reintenta una reserva sin respuesta (timeout, red caída)
+  const idempotencyKey = useRef(null);
   const [servicios, setServicios] = useState([]);
   const [mascotas, setMascotas] = useState([]);
   const [metodos, setMetodos] = useState([]);
@@ -43,8 +47,7 @@ export default function ReservarServicios() {
 
   const fetchServicios = async () => {
     try {
-      const res = await axios.get("http://localhost:8000/servicios/");
-      setServicios(Array.isArray(res.data) ? res.data : []);
+      setServicios(await getTodas("http://localhost:8000/servicios/"));
     } catch (err) {
       console.error(err);
     }
@@ -53,10 +56,9 @@ export default function ReservarServicios() {
   const fetchDomicilios = async () => {
     try {
       const headers = user ? { Authorization: `Bearer ${user.token}` } : {};
-      const res = await axios.get("http://localhost:8000/domicilios/", { headers });
-      const all = Array.isArray(res.data) ? res.data : [];
-      // filtrar por el usuario actual
-      const mine = all.filter(d => user && d.id_usuario === user.id_usuario);
+      if (!user) return setDomicilios([]);
+      // domicilios del usuario actual (filtro en el servidor)
+      const mine = await getTodas("http://localhost:8000/domicilios/", { headers, params: { id_usuario: user.id_usuario } });
       setDomicilios(mine);
     } catch (err) {
       console.error('Error cargando domicilios:', err);
@@ -126,11 +128,14 @@ export default function ReservarServicios() {
         id_mascota: Number(booking.id_mascota),
         id_servicio: Number(booking.id_servicio),
       };
-      await axios.post('http://localhost:8000/citas/', payload, { headers });
+      if (!idempotencyKey.current) idempotencyKey.current = nuevaClaveIdempotencia();
+      await axios.post('http://localhost:8000/citas/', payload, { headers: { ...headers, 'Idempotency-Key': idempotencyKey.current } });
+      idempotencyKey.current = null;
       showAlert({ type: 'success', message: 'Tu cita ha sido creada. Revisa Mi Cuenta para ver el recibo.' });
       navigate('/mi-cuenta');
     } catch (err) {
       console.error(err);
+      if (err.response) idempotencyKey.current = null;
       showAlert({ type: 'error', message: err.response?.data?.detail || 'No se pudo crear la cita' });
     } finally {
       setLoading(false);
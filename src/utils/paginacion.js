@@ -0,0 +1,18 @@
+import axios from "axios";
+
+// Página máxima que acepta el backend (MAX_PAGE_SIZE en backend/utils/pagination.py)
+const PAGE_SIZE = 500;
+
+// GET de un listado paginado por cursor: sigue la cabecera X-Next-Cursor hasta la última página
+// y devuelve todas las filas en un solo array. `config.params` (filtros) se envía en cada página.
+export async function getTodas(url, config = {}) {
+  const filas = [];
+  let cursor = null;
+  do {
+    const params = { limit: PAGE_SIZE, ...(config.params || {}), ...(cursor ? { cursor } : {}) };
+    const res = await axios.get(url, { ...config, params });
+    if (Array.isArray(res.data)) filas.push(...res.data);
+    cursor = res.headers["x-next-cursor"] || null;
+  } while (cursor);
+  return filas;
+}